@@ -1,120 +1,317 @@
 import json
 import time
+import queue
+import random
 from datetime import datetime
-import os
+from collections import OrderedDict, deque
 import requests
-from threading import Thread, Lock
+from requests.adapters import HTTPAdapter
+from threading import Thread, Lock, Event
 
 class AlertManager:
-    def __init__(self, node_server_url='http://localhost:3000'):
+    def __init__(self, node_server_url='http://localhost:3000', batch_size=50,
+                 flush_interval=1.0, max_queue=10000, max_retained=1000,
+                 retention_seconds=3600, max_retries=5, backoff_base=0.5, backoff_max=30.0,
+                 dedup_window=60, max_fingerprints=10000, max_samples=5):
         self.node_server_url = node_server_url
-        self.alerts = []
+        self.alerts = OrderedDict() # Alert id -> alert, oldest first
         self.lock = Lock()
         self.active = False
         self.alert_thread = None
         self.alert_count = 0
         self.alert_threshold = 0.8 # Alert threshold
-    
+
+        # Delivery
+        self.batch_size = batch_size # Send as soon as this many alerts are queued...
+        self.flush_interval = flush_interval # ...or this many seconds after the first one
+        self.outbox = queue.Queue(maxsize=max_queue)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stop_event = Event()
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        # Retention of delivered (or abandoned) alerts
+        self.max_retained = max_retained
+        self.retention_seconds = retention_seconds
+        self.finished = deque() # (finish time, alert id), oldest first
+
+        # Suppression of repeated alerts
+        self.dedup_window = dedup_window # Seconds repeats fold into the first alert; 0 disables
+        self.max_fingerprints = max_fingerprints
+        self.max_samples = max_samples # Log ids kept per coalesced alert
+        self.open_alerts = OrderedDict() # Fingerprint -> [window end, alert, count delivered]
+        self.open_by_id = {} # Alert id -> the same entry
+
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
+        self.suppressed_count = 0
+        self.send_seconds = None # Histogram once instrumented
+
+    def instrument(self, registry):
+        """Expose alert counters, outbox depth and delivery latency"""
+        registry.counter('alerts_created_total', 'Alerts raised', func=lambda: self.alert_count)
+        registry.counter('alerts_sent_total', 'Alerts delivered to the server',
+                         func=lambda: self.sent_count)
+        registry.counter('alerts_failed_total', 'Alerts given up on after retries',
+                         func=lambda: self.failed_count)
+        registry.counter('alerts_dropped_total', 'Alerts dropped because the outbox was full',
+                         func=lambda: self.dropped_count)
+        registry.counter('alerts_suppressed_total', 'Repeats folded into an open alert',
+                         func=lambda: self.suppressed_count)
+        registry.gauge('alert_queue_depth', 'Alerts waiting for delivery', func=self.outbox.qsize)
+        self.send_seconds = registry.histogram('alert_send_seconds', 'Time per alert batch POST')
+
     def start(self):
         """Start the alert manager background thread"""
         if self.active:
             return
         self.active = True
-        self.alert_thread = Thread(target=self._alert_worker)
+        self.stop_event.clear()
+        self.alert_thread = Thread(target=self._alert_worker, name='alert-sender', daemon=True)
         self.alert_thread.start()
         print("Alert manager started")
-        
+
     def stop(self):
-        """Stop the alert manager background thread"""
+        """Stop the alert manager background thread, flushing queued alerts"""
         self.active = False
+        self.stop_event.set()
         if self.alert_thread:
-            self.alert_thread.join(tiemout=2.0)
+            self.alert_thread.join(timeout=2.0)
+        self.session.close()
         print("Alert manager stopped")
-    
-    def add_alert(self, log_id, analysis_result):
+
+    def add_alert(self, log_id, analysis_result, source=None):
         """
         Add a potential alert based on the analysis results
-        
+
+        Never blocks on the network: the alert is queued for the sender thread.
+        Repeats of an alert within dedup_window are folded into it instead.
+
         Args:
         log_id (str): ID of the log entry
         analysis_result (dict): Analysis result from LogAnalyzer
+        source (str): Source of the log entry
         """
         # Check if this analysis result warrants an alert
         if not analysis_result.get('anomaly_detected', False):
             return
-        
+
         anomaly_score = analysis_result.get('anomaly_score', 0)
         if anomaly_score < self.alert_threshold:
             return
-        
-        # Create alert
-        alert = {
-            'id': f"alert_{self.alert_count}",
-            'timestamp': datetime.now().isoformat(),
-            'log_id': log_id,
-            'severity': 'high' if anomaly_score > 0.9 else 'medium',
-            'anomaly_score': anomaly_score,
-            'description': f"Anomaly detected in log {log_id}",
-            'resons': analysis_result.get('reasons', []),
-            'acknowledged': False
-        }
-        
-        # ALert to alerts list
+
+        severity = 'high' if anomaly_score > 0.9 else 'medium'
+        fingerprint = self._fingerprint(analysis_result, source)
+        now = time.monotonic()
+        timestamp = datetime.now().isoformat()
+
         with self.lock:
-            self.alerts.append(alert)
+            self._expire_open_alerts(now)
+
+            entry = self.open_alerts.get(fingerprint) if self.dedup_window > 0 else None
+            if entry is not None:
+                # Coalesce the repeat into the open alert
+                alert = entry[1]
+                alert['count'] += 1
+                alert['last_seen'] = timestamp
+                if anomaly_score > alert['anomaly_score']:
+                    alert['anomaly_score'] = anomaly_score
+                    alert['severity'] = severity
+                if len(alert['sample_log_ids']) < self.max_samples:
+                    alert['sample_log_ids'].append(log_id)
+                self.suppressed_count += 1
+                return
+
+            # Create alert
+            alert = {
+                'id': f"alert_{self.alert_count}",
+                'timestamp': timestamp,
+                'log_id': log_id,
+                'source': source,
+                'severity': severity,
+                'anomaly_score': anomaly_score,
+                'description': f"Anomaly detected in log {log_id}",
+                'reasons': analysis_result.get('reasons', []),
+                'count': 1,
+                'first_seen': timestamp,
+                'last_seen': timestamp,
+                'sample_log_ids': [log_id],
+                'acknowledged': False,
+                'sent': False
+            }
+            self.alerts[alert['id']] = alert
             self.alert_count += 1
-        
-        # Try to send immediately
-        self._send_alert(alert)
-        
+            if self.dedup_window > 0:
+                entry = [now + self.dedup_window, alert, 0]
+                self.open_alerts[fingerprint] = entry
+                self.open_by_id[alert['id']] = entry
+                if len(self.open_alerts) > self.max_fingerprints:
+                    self._close_open_alert(*self.open_alerts.popitem(last=False))
+
+        self._enqueue(alert)
+
+    def _fingerprint(self, analysis_result, source):
+        """Identity of an alert for deduplication: source, message shape and log severity"""
+        template_id = analysis_result.get('template_id')
+        if template_id is not None and template_id >= 0:
+            shape = ('template', template_id)
+        else:
+            shape = ('keywords', tuple(sorted(analysis_result.get('keywords', []))))
+        return (source, shape, analysis_result.get('severity'))
+
+    def _expire_open_alerts(self, now):
+        """Close suppression windows that have ended (lock held)"""
+        while self.open_alerts:
+            fingerprint, entry = next(iter(self.open_alerts.items()))
+            if entry[0] > now:
+                break
+            del self.open_alerts[fingerprint]
+            self._close_open_alert(fingerprint, entry)
+
+    def _close_open_alert(self, fingerprint, entry):
+        """Re-send an alert whose count grew after it was delivered (lock held)"""
+        _, alert, delivered_count = entry
+        del self.open_by_id[alert['id']]
+        # Undelivered alerts are still queued and will carry the final count
+        if alert['sent'] and alert['count'] > delivered_count:
+            alert['description'] = (
+                f"{alert['count']} similar anomalies from {alert['source'] or 'unknown source'} "
+                f"between {alert['first_seen']} and {alert['last_seen']}"
+            )
+            try:
+                self.outbox.put_nowait(alert)
+            except queue.Full:
+                self.dropped_count += 1
+
+    def _enqueue(self, alert):
+        """Queue an alert for delivery, dropping it if the outbox is full"""
+        try:
+            self.outbox.put_nowait(alert)
+        except queue.Full:
+            with self.lock:
+                self.dropped_count += 1
+                self._finish(alert['id'])
+            print(f"Alert outbox full, dropping alert {alert['id']}")
+
     def _alert_worker(self):
-        """Background worker to process alerts"""
-        while self.active:
-            # Check for unsent alerts
+        """Background worker that delivers queued alerts in batches"""
+        while True:
             with self.lock:
-                unsent =[a for a in self.alerts if a.get('sent', False)]
-            # Try to senf each unsent alert
-            for alert in unsent:
-                self._send_alert(alert)
-            
-            # Sleep for a bit
-            time.sleep(5)
-        
-    def _send_alert(self, alert):
-        """Send alert to the node.js server"""
+                self._expire_open_alerts(float('inf') if self.stop_event.is_set() else time.monotonic())
+            batch = self._next_batch()
+            if batch:
+                self._deliver(batch)
+            elif self.stop_event.is_set():
+                break
+            self._evict_finished()
+
+    def _next_batch(self):
+        """Collect up to batch_size alerts, waiting at most flush_interval after the first"""
+        try:
+            batch = [self.outbox.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.stop_event.is_set():
+                break
+            try:
+                batch.append(self.outbox.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch):
+        """Send a batch, retrying with exponential backoff and full jitter"""
+        for attempt in range(self.max_retries + 1):
+            if self._send_alerts(batch):
+                return
+            if self.stop_event.is_set() or attempt == self.max_retries:
+                break
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            self.stop_event.wait(random.uniform(0, delay))
+
+        with self.lock:
+            for alert in batch:
+                self.failed_count += 1
+                self._finish(alert['id'])
+        print(f"Giving up on {len(batch)} alerts after {self.max_retries + 1} attempts")
+
+    def _send_alerts(self, batch):
+        """
+        Send a batch of alerts to the node.js server
+
+        Returns:
+            bool: True if the server accepted the batch
+        """
+        # Repeats may be folded into these alerts concurrently
+        with self.lock:
+            payload = json.dumps(batch, default=str)
+            counts = [alert['count'] for alert in batch]
+
+        started = time.perf_counter()
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.node_server_url}/api/alerts",
-                json=alert,
-                headers={'Content-Type': 'application/json'},
-                tiemout=5
+                data=payload,
+                timeout=5
             )
-            
-            if response.status_code == 200:
-                with self.lock:
-                    # Mark as sent
-                    for a in self.alerts:
-                        if a['id'] == alert['id']:
-                            a['sent'] = True
-                            print(f"Alert {alert['id']} sent successfully")
-                            break
-            else:
-                print(f"Failed to senfd alert {alert['id']}: HTTP {response.status_code}")
-        except exception as e:
-            print(f"Error sending alert {alert['id']} : {str(e)}")
-    
+        except requests.exceptions.RequestException as e:
+            print(f"Error sending {len(batch)} alerts: {str(e)}")
+            return False
+        finally:
+            if self.send_seconds:
+                self.send_seconds.observe(time.perf_counter() - started)
+
+        if response.status_code != 200:
+            print(f"Failed to send {len(batch)} alerts: HTTP {response.status_code}")
+            return False
+
+        with self.lock:
+            for alert, count in zip(batch, counts):
+                # Mark as sent
+                alert['sent'] = True
+                entry = self.open_by_id.get(alert['id'])
+                if entry is not None:
+                    entry[2] = count
+                if alert['id'] in self.alerts:
+                    self._finish(alert['id'])
+            self.sent_count += len(batch)
+        return True
+
+    def _finish(self, alert_id):
+        """Record that an alert needs no more delivery attempts (lock held)"""
+        self.finished.append((time.monotonic(), alert_id))
+
+    def _evict_finished(self):
+        """Forget delivered alerts past the retention count or age"""
+        cutoff = time.monotonic() - self.retention_seconds
+        with self.lock:
+            while self.finished and (
+                    len(self.alerts) > self.max_retained or self.finished[0][0] < cutoff):
+                _, alert_id = self.finished.popleft()
+                self.alerts.pop(alert_id, None)
+
     def get_alerts(self, count=10):
         """Get recent alerts"""
         with self.lock:
-            return self.alerts[-count:]
-        
+            alerts = list(self.alerts.values())
+        return alerts[-count:]
+
     def acknowledge_alert(self, alert_id):
         """Mark an alert as acknowledged"""
         with self.lock:
-            for allert in self.alerts:
-                if alert['id'] == alert_id:
-                    alert['acknowledged'] = True
-                    alert['acknowledged_at'] = datetime.now().isoformat()
-                    print(f"Alert {alert_id} acknowledged")
-                    return True
-        return False
\ No newline at end of file
+            alert = self.alerts.get(alert_id)
+            if alert is None:
+                return False
+            alert['acknowledged'] = True
+            alert['acknowledged_at'] = datetime.now().isoformat()
+        print(f"Alert {alert_id} acknowledged")
+        return True
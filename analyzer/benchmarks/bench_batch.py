@@ -0,0 +1,41 @@
+"""
+Per-log cost of LogAnalyzer.process_log in a loop versus process_batch.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_batch --sizes 1000 10000 100000
+"""
+import time
+import argparse
+from models.log_analyzer import LogAnalyzer
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def time_per_log(func, logs):
+    """Return the mean time per log in microseconds"""
+    start = time.perf_counter()
+    func(logs)
+    return (time.perf_counter() - start) / len(logs) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'batch size':>10} {'process_log':>14} {'process_batch':>14} {'speedup':>8}")
+    for size in args.sizes:
+        logs = SyntheticLogGenerator(seed=args.seed).generate(size)
+
+        analyzer = LogAnalyzer()
+        per_log = time_per_log(lambda batch: [analyzer.process_log(log) for log in batch], logs)
+
+        analyzer = LogAnalyzer()
+        batched = time_per_log(analyzer.process_batch, logs)
+
+        print(f"{size:>10} {per_log:>12.1f}us {batched:>12.1f}us {per_log / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Memory used by LogAnalyzer history: list of feature dicts versus HistoryStore.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_history --entries 100000 1000000
+"""
+import gc
+import time
+import argparse
+import tracemalloc
+from models.feature_matcher import FeatureMatcher
+from models.history_store import HistoryStore
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def measure(build):
+    """Return (bytes allocated, gc-tracked objects added, seconds) for build()"""
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    objects = len(gc.get_objects()) - objects_before
+    del result
+    return allocated, objects, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    # A pool of realistic feature dicts to draw entries from
+    matcher = FeatureMatcher()
+    logs = SyntheticLogGenerator(seed=args.seed).generate(2000)
+    samples = [(log, matcher.extract(log['message'])) for log in logs]
+    anomalies = {'score': 0.5, 'detected': False, 'reasons': ['Error pattern detected']}
+
+    def legacy(count):
+        history = []
+        for i in range(count):
+            log, features = samples[i % len(samples)]
+            history.append({
+                'timestamp': log['timestamp'],
+                'features': dict(features, keyword_counts=features['keyword_counts'].copy()),
+                'anomalies': dict(anomalies, reasons=list(anomalies['reasons']))
+            })
+        return history
+
+    def ring(count):
+        store = HistoryStore(capacity=count)
+        for i in range(count):
+            log, features = samples[i % len(samples)]
+            store.append(store.make_record(log['timestamp'], features, anomalies, log['source']))
+        return store
+
+    print(f"{'entries':>9} {'layout':<14} {'MiB':>9} {'bytes/entry':>12} {'objects':>10} {'seconds':>8}")
+    for count in args.entries:
+        for name, build in (('list of dicts', legacy), ('HistoryStore', ring)):
+            allocated, objects, elapsed = measure(lambda: build(count))
+            print(f"{count:>9} {name:<14} {allocated / 2**20:>9.1f} {allocated / count:>12.1f} "
+                  f"{objects:>10} {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
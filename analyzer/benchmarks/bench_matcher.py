@@ -0,0 +1,145 @@
+"""
+Feature extraction cost of the compiled FeatureMatcher versus the NLTK path.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_matcher --count 20000
+
+The NLTK comparison needs the 'punkt' and 'stopwords' resources; without
+them only the matcher is timed. Classifications are compared on the
+synthetic messages, on key=value style messages and on the sample logs the
+server wrote to data/logs and logs/combined.log.
+"""
+import os
+import re
+import glob
+import json
+import time
+import argparse
+from collections import Counter
+from models.feature_matcher import (
+    FeatureMatcher, DEFAULT_ERROR_PATTERNS, DEFAULT_NEGATIVE_WORDS, DEFAULT_POSITIVE_WORDS
+)
+from benchmarks.synthetic import SyntheticLogGenerator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SAMPLE_LOG_DIR = os.path.join(REPO_ROOT, 'data', 'logs')
+SERVER_LOG = os.path.join(REPO_ROOT, 'logs', 'combined.log')
+
+# Structured messages, where the two tokenizers part ways most easily
+KEY_VALUE_MESSAGES = [
+    'status=error code=500 path=/api/orders',
+    'result=success duration_ms=12',
+    'exception=timeout upstream=payment-gateway',
+    'user=bob,status=error',
+    'level=warn msg=retrying attempt=3',
+    'request finished status=ok result=success',
+    'columns a|error|b',
+    'failed to open c:\\temp\\error.log',
+    'path\\error not found'
+]
+
+
+def sample_messages():
+    """Messages of the sample logs in data/logs and logs/combined.log, where present"""
+    logs = []
+    for path in sorted(glob.glob(os.path.join(SAMPLE_LOG_DIR, '*.json'))):
+        with open(path) as f:
+            try:
+                logs.append(json.load(f))
+            except ValueError:
+                continue
+    if os.path.exists(SERVER_LOG):
+        with open(SERVER_LOG) as f:
+            for line in f:
+                try:
+                    logs.append(json.loads(line))
+                except ValueError:
+                    continue
+    return [log['message'] for log in logs
+            if isinstance(log, dict) and isinstance(log.get('message'), str)]
+
+
+def legacy_extract(message, stop_words, word_tokenize):
+    """The NLTK based extraction LogAnalyzer used before FeatureMatcher"""
+    tokens = word_tokenize(message.lower())
+    filtered_tokens = [w for w in tokens if w not in stop_words]
+    keywords = [word for word in filtered_tokens if word.isalpha() and len(word) > 2]
+    keyword_counts = Counter(keywords)
+
+    severity = 'info'
+    for pattern in DEFAULT_ERROR_PATTERNS:
+        if re.search(pattern, message, re.IGNORECASE):
+            severity = 'error'
+            break
+
+    neg_count = sum(1 for w in filtered_tokens if w in DEFAULT_NEGATIVE_WORDS)
+    pos_count = sum(1 for w in filtered_tokens if w in DEFAULT_POSITIVE_WORDS)
+    sentiment = 'neutral'
+    if neg_count > pos_count:
+        sentiment = 'negative'
+    elif pos_count > neg_count:
+        sentiment = 'positive'
+
+    return {
+        'severity': severity,
+        'keywords': [item[0] for item in keyword_counts.most_common(5)],
+        'sentiment': sentiment
+    }
+
+
+def load_legacy():
+    """Return a legacy extractor, or None when NLTK resources are missing"""
+    try:
+        from nltk.tokenize import word_tokenize
+        from nltk.corpus import stopwords
+        stop_words = set(stopwords.words('english'))
+        word_tokenize('probe')
+    except (ImportError, LookupError):
+        return None
+    return lambda message: legacy_extract(message, stop_words, word_tokenize)
+
+
+def time_per_message(func, messages):
+    """Return the mean time per message in microseconds"""
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    generator = SyntheticLogGenerator(seed=args.seed)
+    messages = [log['message'] for log in generator.generate(args.count)]
+    messages += [generator.generate_anomalous_log()['message'] for _ in range(args.count // 100)]
+
+    matcher = FeatureMatcher()
+    matcher_us = time_per_message(matcher.extract, messages)
+    print(f"FeatureMatcher  {matcher_us:8.2f} us/message")
+
+    legacy = load_legacy()
+    if legacy is None:
+        print("NLTK resources not available, skipping the legacy comparison")
+        return
+
+    legacy_us = time_per_message(legacy, messages)
+    print(f"NLTK (legacy)   {legacy_us:8.2f} us/message  ({legacy_us / matcher_us:.1f}x slower)")
+
+    for corpus, corpus_messages in (('synthetic', messages), ('key=value', KEY_VALUE_MESSAGES),
+                                    ('sample logs', sample_messages())):
+        mismatches = 0
+        for message in corpus_messages:
+            expected = legacy(message)
+            actual = matcher.extract(message)
+            if any(expected[key] != actual[key] for key in ('severity', 'keywords', 'sentiment')):
+                mismatches += 1
+        print(f"Classification mismatches ({corpus}): {mismatches} of {len(corpus_messages)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Cost of the optional anomaly model: batch scoring latency and retraining.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_model --samples 1000 20000 --batch-sizes 1 100 1000
+"""
+import sys
+import time
+import argparse
+from models.log_analyzer import LogAnalyzer
+from models.anomaly_model import AnomalyModel
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def throughput(analyzer, logs, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(logs), batch_size):
+        analyzer.process_batch(logs[i:i + batch_size])
+    return len(logs) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, nargs='+', default=[1000, 20000],
+                        help='history rows trained on')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--logs', type=int, default=20000, help='logs per throughput run')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    generator = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000)
+    history_size = max(args.samples)
+    warm_logs = generator.generate(history_size)
+    logs = generator.generate(args.logs)
+
+    print(f"{'trained on':>10} {'train s':>8}")
+    analyzer = LogAnalyzer(history_size=history_size)
+    analyzer.process_batch(warm_logs)
+    model = None
+    for samples in args.samples:
+        model = AnomalyModel(max_samples=samples)
+        model.observe(analyzer.history)
+        model.trainer.join()
+        print(f"{samples:>10} {model.train_seconds:>8.2f}")
+
+    rows = analyzer.history.tail()
+    print(f"\n{'batch':>6} {'ms/batch':>9} {'us/log':>8}")
+    for size in args.batch_sizes:
+        batch = rows[:size]
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            model.outliers(batch)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{size:>6} {elapsed * 1000:>9.3f} {elapsed / size * 1e6:>8.1f}")
+
+    # End-to-end cost, and what a training running in the background costs the loop
+    batch_size = max(args.batch_sizes)
+    plain = LogAnalyzer(history_size=history_size)
+    plain.process_batch(warm_logs)
+    scored = LogAnalyzer(history_size=history_size, anomaly_model=True)
+    scored.model.model = model.model
+    scored.model.training_enabled = False
+    scored.process_batch(warm_logs)
+    training = LogAnalyzer(history_size=history_size, anomaly_model=True)
+    training.process_batch(warm_logs)
+    training.model.retrain_every = batch_size
+    training.model.max_samples = max(args.samples)
+
+    print(f"\n{'analyzer':<24} {'logs/s':>9}")
+    for name, candidate in (('rules only', plain), ('with model', scored),
+                            ('retraining every batch', training)):
+        rate = throughput(candidate, logs, batch_size)
+        print(f"{name:<24} {rate:>9.0f}")
+    if training.model.trainer:
+        training.model.trainer.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Batch counting and error search through liblogprocessor versus pure Python.
+
+Build the library first (cd processor && make), then run from the analyzer
+directory:
+
+    python -m benchmarks.bench_native --batch-sizes 100 1000 10000
+"""
+import sys
+import time
+import argparse
+from models.log_analyzer import LogAnalyzer
+from models.feature_matcher import DEFAULT_ERROR_PATTERNS
+from native.log_processor import (
+    NativeLogProcessor, PythonLogProcessor, DEFAULT_LIBRARY, log_level_code
+)
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--library', default=DEFAULT_LIBRARY)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--logs', type=int, default=20000, help='logs per throughput run')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    native = NativeLogProcessor.load(args.library, min_batch=0)
+    if not native.native:
+        print(f"{args.library} could not be loaded; build it with make in processor/")
+        return 1
+    python = PythonLogProcessor()
+
+    logs = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01).generate(max(args.batch_sizes + [args.logs]))
+    print(f"{'batch':>6} {'native ms':>10} {'python ms':>10} {'speedup':>8}")
+    for size in args.batch_sizes:
+        batch = logs[:size]
+        columns = ([log['message'] for log in batch], [log.get('source') for log in batch],
+                   [log_level_code(log) for log in batch], DEFAULT_ERROR_PATTERNS)
+        native_seconds = per_call(lambda: native.scan(*columns), args.repeat)
+        python_seconds = per_call(lambda: python.scan(*columns), args.repeat)
+        print(f"{size:>6} {native_seconds * 1000:>10.3f} {python_seconds * 1000:>10.3f} "
+              f"{python_seconds / native_seconds:>7.2f}x")
+
+    print(f"\n{'process_batch':<14} {'batch':>6} {'logs/s':>9}")
+    for size in args.batch_sizes:
+        for name, library in (('native', args.library), ('python', None)):
+            analyzer = LogAnalyzer(native_library=library)
+            stream = logs[:args.logs]
+            start = time.perf_counter()
+            for i in range(0, len(stream), size):
+                analyzer.process_batch(stream[i:i + size])
+            rate = len(stream) / (time.perf_counter() - start)
+            print(f"{name:<14} {size:>6} {rate:>9.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Latency of error and warning logs during an ingest burst, with and without load shedding.
+
+Logs arrive faster than the analyzer can keep up for --seconds, stamped
+with their arrival time, and go through the same intake loop as the
+service. Run from the analyzer directory:
+
+    python -m benchmarks.bench_overload --overload 3 --seconds 10 --lag-target 2
+"""
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+from models.log_analyzer import LogAnalyzer
+from ingestion.admission import AdmissionController
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def measure_throughput(logs, batch_size):
+    analyzer = LogAnalyzer()
+    start = time.perf_counter()
+    for i in range(0, len(logs), batch_size):
+        analyzer.process_batch(logs[i:i + batch_size])
+    return len(logs) / (time.perf_counter() - start)
+
+
+def burst_logs(count, priority_share, seed):
+    """Synthetic logs where `priority_share` of them are errors or warnings"""
+    generator = SyntheticLogGenerator(seed=seed, anomaly_rate=0.01)
+    intake = AdmissionController()
+    chooser = random.Random(seed)
+    lanes = {True: [], False: []}
+    logs = []
+    while len(logs) < count:
+        lane = chooser.random() < priority_share
+        while not lanes[lane]:
+            log = generator.generate_log()
+            lanes[intake.is_priority(log)].append(log)
+        logs.append(lanes[lane].pop())
+    return logs
+
+
+def run(intake, logs, rate, seconds, batch_size):
+    """
+    Feed logs at `rate` per second for `seconds`, then drain
+
+    Returns:
+        tuple: (latencies of analyzed priority logs, of analyzed info logs, logs shed, seconds to drain)
+    """
+    analyzer = LogAnalyzer()
+    arrivals = iter(logs)
+    priority, info = [], []
+    shed_count = 0
+    start = time.time()
+    sent = 0
+    while True:
+        now = time.time()
+        due = min(int((now - start) * rate), int(seconds * rate)) - sent
+        if due > 0:
+            stamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            arrived = []
+            for log in (next(arrivals) for _ in range(due)):
+                log['timestamp'] = stamp
+                arrived.append(log)
+            sent += due
+            shed_count += len(intake.admit(arrived))
+
+        batch, shed = intake.next_batch(batch_size)
+        shed_count += len(shed)
+        if batch:
+            analyzer.process_batch(batch)
+            done = time.time()
+            for log in batch:
+                latency = done - datetime.fromisoformat(log['timestamp']).timestamp()
+                (priority if intake.is_priority(log) else info).append(latency)
+        elif sent >= int(seconds * rate):
+            break
+    return priority, info, shed_count, time.time() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--overload', type=float, default=3.0,
+                        help='arrival rate as a multiple of measured analysis throughput')
+    parser.add_argument('--seconds', type=float, default=10.0, help='length of the burst')
+    parser.add_argument('--priority-share', type=float, default=0.1,
+                        help='share of error and warning logs in the burst')
+    parser.add_argument('--lag-target', type=float, default=2.0)
+    parser.add_argument('--sample-rate', type=float, default=0.1)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    capacity = measure_throughput(burst_logs(10000, args.priority_share, args.seed), args.batch_size)
+    rate = capacity * args.overload
+    total = int(rate * args.seconds) + 1
+    print(f"analysis {capacity:.0f} logs/s, arrivals {rate:.0f} logs/s for {args.seconds:.0f}s")
+
+    print(f"\n{'intake':<10} {'p50 ms':>8} {'p99 ms':>8} {'info p99 ms':>11} {'shed':>7} {'drained s':>9}")
+    policies = (
+        ('fifo', AdmissionController(max_pending=total, lag_target=float('inf'), high_watermark=1.0)),
+        ('shedding', AdmissionController(max_pending=total, lag_target=args.lag_target,
+                                         info_sample_rate=args.sample_rate))
+    )
+    for name, intake in policies:
+        logs = burst_logs(total, args.priority_share, args.seed)
+        priority, info, shed, elapsed = run(intake, logs, rate, args.seconds, args.batch_size)
+        p50, p99 = np.percentile(priority, [50, 99]) * 1000
+        info_p99 = np.percentile(info, 99) * 1000 if info else 0.0
+        print(f"{name:<10} {p50:>8.0f} {p99:>8.0f} {info_p99:>11.0f} {shed:>7} {elapsed:>9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
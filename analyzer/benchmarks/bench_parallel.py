@@ -0,0 +1,51 @@
+"""
+Throughput of ShardedAnalyzer from 1 to N worker processes.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_parallel --logs 200000 --workers 1 2 4 8
+"""
+import time
+import argparse
+import multiprocessing
+from models.log_analyzer import LogAnalyzer
+from workers.pool import ShardedAnalyzer
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def throughput(process_batch, logs, batch_size):
+    """Return logs per second for feeding logs in batches"""
+    start = time.perf_counter()
+    for i in range(0, len(logs), batch_size):
+        process_batch(logs[i:i + batch_size])
+    return len(logs) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logs', type=int, default=200000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, multiprocessing.cpu_count()}))
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--sources', type=int, default=64,
+                        help='distinct sources to spread the synthetic logs over')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    # The generator only knows a handful of services; fan them out so shards stay balanced
+    logs = SyntheticLogGenerator(seed=args.seed).generate(args.logs)
+    for i, log in enumerate(logs):
+        log['source'] = f"{log['source']}-{i % args.sources}"
+
+    baseline = throughput(LogAnalyzer().process_batch, logs, args.batch_size)
+    print(f"{multiprocessing.cpu_count()} cores, {args.logs} logs, batches of {args.batch_size}")
+    print(f"{'workers':>8} {'logs/s':>10} {'speedup':>8}")
+    print(f"{'inline':>8} {baseline:>10.0f} {1.0:>7.2f}x")
+    for workers in args.workers:
+        with ShardedAnalyzer(workers=workers) as analyzer:
+            rate = throughput(analyzer.process_batch, logs, args.batch_size)
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
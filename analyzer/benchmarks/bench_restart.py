@@ -0,0 +1,73 @@
+"""
+Startup to first scored log, cold versus restored from a checkpoint.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_restart --history 1000 100000 1000000 --target-ms 250
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from models.log_analyzer import LogAnalyzer
+from models.checkpoint import Checkpointer
+from benchmarks.synthetic import SyntheticLogGenerator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--history', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--warm-logs', type=int, default=20000,
+                        help='logs analyzed before the checkpoint (history is padded to capacity)')
+    parser.add_argument('--target-ms', type=float, default=250.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    generator = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000)
+    warm_logs = generator.generate(args.warm_logs)
+    first_log = generator.generate_log()
+
+    print(f"{'history':>9} {'file MiB':>9} {'pause ms':>9} {'cold ms':>8} {'warm ms':>8} {'target':>7}")
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for capacity in args.history:
+            path = os.path.join(directory, f'{capacity}.ckpt')
+            analyzer = LogAnalyzer(history_size=capacity)
+            analyzer.process_batch(warm_logs)
+            # Fill the ring buffer so the checkpoint is full size
+            rows = analyzer.history.tail()
+            while len(analyzer.history) < capacity:
+                analyzer.history.extend(rows[:capacity - len(analyzer.history)])
+            # Checkpoint as the service does, between batches of new logs
+            checkpointer = Checkpointer(path, interval=0)
+            pause = 0.0
+            while checkpointer.saved_count == 0:
+                analyzer.process_batch(generator.generate(100))
+                started = time.perf_counter()
+                checkpointer.maybe_capture(analyzer, lambda: {'cursor': None})
+                pause = max(pause, time.perf_counter() - started)
+                if checkpointer.writer:
+                    checkpointer.writer.join()
+            del analyzer
+
+            start = time.perf_counter()
+            LogAnalyzer(history_size=capacity).process_log(first_log)
+            cold = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            analyzer = LogAnalyzer(history_size=capacity)
+            Checkpointer(path).restore(analyzer)
+            analyzer.process_log(first_log)
+            warm = (time.perf_counter() - start) * 1000
+
+            ok = warm <= args.target_ms
+            failed |= not ok
+            print(f"{capacity:>9} {os.path.getsize(path) / 2**20:>9.1f} "
+                  f"{pause * 1000:>9.1f} {cold:>8.1f} {warm:>8.1f} "
+                  f"{'ok' if ok else 'MISSED':>7}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
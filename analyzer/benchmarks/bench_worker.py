@@ -0,0 +1,81 @@
+"""
+Per-log latency of a fresh `main.py <json>` process versus a persistent worker.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.bench_worker --count 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+from benchmarks.synthetic import SyntheticLogGenerator
+
+ANALYZER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(ANALYZER_DIR, 'main.py')
+
+
+def summarize(name, latencies):
+    """Print latency percentiles in milliseconds"""
+    ms = np.array(latencies) * 1000
+    print(f"{name:<28} n={len(ms):<6} mean={ms.mean():9.2f}ms "
+          f"p50={np.percentile(ms, 50):9.2f}ms p95={np.percentile(ms, 95):9.2f}ms")
+
+
+def bench_process_per_log(logs):
+    """One interpreter per log, as server/ingestion/processor.js used to do"""
+    latencies = []
+    for log in logs:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_SCRIPT, json.dumps(log)],
+                       cwd=ANALYZER_DIR, capture_output=True, check=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_worker(logs, batch_size=1):
+    """A single long-lived worker fed over stdin"""
+    proc = subprocess.Popen([sys.executable, MAIN_SCRIPT, '--worker'], cwd=ANALYZER_DIR,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, bufsize=1)
+    try:
+        # Warm up so interpreter start-up is not counted
+        proc.stdin.write(json.dumps({'id': 'warmup', 'log': logs[0]}) + '\n')
+        proc.stdout.readline()
+
+        latencies = []
+        for i in range(0, len(logs), batch_size):
+            batch = logs[i:i + batch_size]
+            request = {'id': str(i), 'logs': batch} if batch_size > 1 else {'id': str(i), 'log': batch[0]}
+            start = time.perf_counter()
+            proc.stdin.write(json.dumps(request) + '\n')
+            response = json.loads(proc.stdout.readline())
+            elapsed = time.perf_counter() - start
+            assert response['id'] == str(i), response
+            latencies.extend([elapsed / len(batch)] * len(batch))
+        return latencies
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=20, help='Logs for the process-per-log run')
+    parser.add_argument('--worker-count', type=int, default=2000, help='Logs for the worker runs')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    generator = SyntheticLogGenerator(seed=args.seed)
+    logs = generator.generate(max(args.count, args.worker_count))
+
+    summarize('process per log (before)', bench_process_per_log(logs[:args.count]))
+    summarize('worker, 1 log/request', bench_worker(logs[:args.worker_count]))
+    summarize('worker, 100 logs/request', bench_worker(logs[:args.worker_count], batch_size=100))
+
+
+if __name__ == '__main__':
+    main()
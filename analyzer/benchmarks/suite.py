@@ -0,0 +1,353 @@
+"""
+Benchmark suite for the analyzer with JSON results and regression checks.
+
+Run from the analyzer directory:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output new.json --compare results.json --tolerance 0.1
+    python -m benchmarks.suite --only process_log alerts --quick
+"""
+import os
+import sys
+import gc
+import json
+import time
+import logging
+import argparse
+import platform
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from models.log_analyzer import LogAnalyzer
+from alerts.alert_manager import AlertManager
+from benchmarks.synthetic import SyntheticLogGenerator
+from monitoring.metrics import MetricsRegistry, MetricsServer
+from monitoring.profiler import SamplingProfiler
+
+HIGHER = 'higher'
+LOWER = 'lower'
+
+
+def metric(value, unit, better):
+    return {'value': round(float(value), 3), 'unit': unit, 'better': better}
+
+
+def percentiles(samples, prefix, unit='us'):
+    """p50/p95/p99 of latency samples in seconds, reported in microseconds"""
+    values = np.percentile(np.asarray(samples) * 1e6, [50, 95, 99])
+    return {f'{prefix}_p{p}': metric(v, unit, LOWER) for p, v in zip((50, 95, 99), values)}
+
+
+def rss_bytes():
+    """Current resident set size, or peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class StubServer:
+    """Local HTTP server standing in for the Node.js API"""
+
+    def __init__(self, logs=None):
+        # Numbered like the Node.js server does on arrival
+        self.logs = [dict(log, seq=seq) for seq, log in enumerate(logs or [], 1)]
+        self.alerts_received = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/api/query/recent':
+                    return self._reply(404, {'error': 'Not found'})
+                params = parse_qs(url.query)
+                limit = int(params.get('limit', ['10'])[0])
+                start = int(params.get('after_seq', ['0'])[0])
+                page = stub.logs[start:start + limit]
+                self._reply(200, {'success': True, 'count': len(page), 'epoch': 'stub', 'logs': page})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.alerts_received += len(body) if isinstance(body, list) else 1
+                self._reply(200, {'success': True})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_process_log(args):
+    """Throughput and latency of LogAnalyzer.process_log, one log at a time"""
+    logs = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000).generate(args.logs)
+    analyzer = LogAnalyzer()
+    for log in logs[:1000]:
+        analyzer.process_log(log)
+
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for log in logs:
+        before = clock()
+        analyzer.process_log(log)
+        latencies.append(clock() - before)
+    elapsed = clock() - start
+
+    results = {'process_log_throughput': metric(len(logs) / elapsed, 'logs/s', HIGHER)}
+    results.update(percentiles(latencies, 'process_log_latency'))
+    return results
+
+
+def bench_process_batch(args):
+    """Throughput of LogAnalyzer.process_batch"""
+    logs = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000).generate(args.logs)
+    analyzer = LogAnalyzer()
+    start = time.perf_counter()
+    for i in range(0, len(logs), 1000):
+        analyzer.process_batch(logs[i:i + 1000])
+    elapsed = time.perf_counter() - start
+    return {'process_batch_throughput': metric(len(logs) / elapsed, 'logs/s', HIGHER)}
+
+
+def bench_instrumentation(args):
+    """process_batch throughput with the metrics server, scrapes and the sampling profiler on versus off"""
+    logs = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000).generate(args.logs)
+
+    def run(instrumented):
+        analyzer = LogAnalyzer()
+        server = profiler = None
+        stop = threading.Event()
+        if instrumented:
+            registry = MetricsRegistry()
+            analyzer.instrument(registry)
+            profiler = SamplingProfiler()
+            server = MetricsServer(registry, port=0, profiler=profiler)
+            server.start()
+            profiler.start()
+            url = f"http://127.0.0.1:{server.port}/metrics"
+
+            def scrape():
+                # Far more often than Prometheus would, so the cost shows up in short runs
+                while not stop.wait(0.2):
+                    urlopen(url).read()
+            threading.Thread(target=scrape, daemon=True).start()
+        start = time.perf_counter()
+        for i in range(0, len(logs), 1000):
+            analyzer.process_batch(logs[i:i + 1000])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        if instrumented:
+            profiler.stop()
+            server.stop()
+        return len(logs) / elapsed
+
+    # Alternate the two and keep the best of each, the machine being noisy
+    plain, instrumented = 0.0, 0.0
+    for _ in range(3):
+        plain = max(plain, run(False))
+        instrumented = max(instrumented, run(True))
+    return {
+        'instrumented_batch_throughput': metric(instrumented, 'logs/s', HIGHER),
+        'instrumentation_slowdown': metric(plain / instrumented, 'x', LOWER)
+    }
+
+
+def bench_memory(args):
+    """Resident memory growth while analyzing a long stream"""
+    generator = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000)
+    analyzer = LogAnalyzer()
+    stream = generator.stream(args.memory_logs)
+    batch = []
+
+    def feed(limit):
+        fed = 0
+        for log in stream:
+            batch.append(log)
+            if len(batch) == 1000:
+                analyzer.process_batch(batch)
+                fed += len(batch)
+                batch.clear()
+                if fed >= limit:
+                    break
+        if batch:
+            analyzer.process_batch(batch)
+            fed += len(batch)
+            batch.clear()
+        return fed
+
+    # Warm up until history, caches and baselines have filled
+    warm = feed(min(50000, args.memory_logs // 10))
+    gc.collect()
+    before = rss_bytes()
+    fed = feed(args.memory_logs - warm)
+    gc.collect()
+    growth = max(rss_bytes() - before, 0)
+    return {
+        'memory_growth': metric(growth / 2**20, 'MiB', LOWER),
+        'memory_growth_per_log': metric(growth / max(fed, 1), 'bytes', LOWER)
+    }
+
+
+def bench_alerts(args):
+    """AlertManager enqueue latency and delivery rate against a stub server"""
+    result = {'anomaly_detected': True, 'anomaly_score': 0.95, 'severity': 'error',
+              'template_id': -1, 'keywords': [], 'reasons': ['Error pattern detected']}
+    with StubServer() as stub:
+        manager = AlertManager(node_server_url=stub.url, flush_interval=0.05, dedup_window=0,
+                               max_queue=args.alerts)
+        manager.start()
+        latencies = []
+        clock = time.perf_counter
+        start = clock()
+        for i in range(args.alerts):
+            before = clock()
+            manager.add_alert(f'log-{i}', result, 'bench')
+            latencies.append(clock() - before)
+        while manager.sent_count + manager.failed_count < args.alerts and clock() - start < 60:
+            time.sleep(0.005)
+        elapsed = clock() - start
+        manager.stop()
+
+    results = percentiles(latencies, 'alert_enqueue_latency')
+    results['alert_delivery_rate'] = metric(manager.sent_count / elapsed, 'alerts/s', HIGHER)
+    return results
+
+
+def bench_service(args):
+    """End-to-end LogAnalyzerService throughput against a stub /api/query/recent"""
+    logs = SyntheticLogGenerator(seed=args.seed, anomaly_rate=0.01, burst_every=2000).generate(args.logs)
+    with StubServer(logs) as stub:
+        os.environ['NODE_SERVER_URL'] = stub.url
+        os.environ['CHECKPOINT_INTERVAL'] = '0'
+        os.environ.setdefault('METRICS_PORT', '0')
+        os.environ.setdefault('FETCH_LIMIT', '500')
+        os.environ.setdefault('POLL_INTERVAL', '1')
+        import main
+
+        service = main.LogAnalyzerService()
+        service.alert_manager.start()
+        start = time.perf_counter()
+        service.fetcher.start()
+        # The service loop (fetch, intake, admission), minus the wait for new logs once the stub is drained
+        handled = 0
+        while handled < len(logs) and time.perf_counter() - start < 300:
+            handled += service._process_next()
+        elapsed = time.perf_counter() - start
+        shed = sum(service.intake.shed_counts.values())
+        service._cleanup()
+
+    return {
+        'service_throughput': metric(service.processed_count / elapsed, 'logs/s', HIGHER),
+        'service_shed': metric(shed, 'logs', LOWER)
+    }
+
+
+BENCHMARKS = {
+    'process_log': bench_process_log,
+    'process_batch': bench_process_batch,
+    'instrumentation': bench_instrumentation,
+    'memory': bench_memory,
+    'alerts': bench_alerts,
+    'service': bench_service
+}
+
+
+def compare(current, baseline, tolerance):
+    """
+    Compare metrics against a baseline run
+
+    Returns:
+        list: (name, baseline value, current value, relative change, regressed)
+    """
+    rows = []
+    for name, entry in current['metrics'].items():
+        old = baseline.get('metrics', {}).get(name)
+        if old is None or old['value'] == 0:
+            continue
+        change = (entry['value'] - old['value']) / abs(old['value'])
+        worse = -change if entry['better'] == HIGHER else change
+        rows.append((name, old['value'], entry['value'], change, worse > tolerance))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='benchmarks to run')
+    parser.add_argument('--logs', type=int, default=20000, help='logs per throughput benchmark')
+    parser.add_argument('--memory-logs', type=int, default=1000000)
+    parser.add_argument('--alerts', type=int, default=5000)
+    parser.add_argument('--quick', action='store_true', help='small sizes for a smoke run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', metavar='FILE', help='write results as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='baseline results to check against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative change counted as a regression (default 0.1)')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.logs, args.memory_logs, args.alerts = 2000, 20000, 500
+
+    logging.basicConfig(level=logging.WARNING)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'metrics': {}
+    }
+    for name in args.only or BENCHMARKS:
+        started = time.perf_counter()
+        metrics = BENCHMARKS[name](args)
+        results['metrics'].update(metrics)
+        print(f"{name} ({time.perf_counter() - started:.1f}s)")
+        for key, entry in metrics.items():
+            print(f"  {key:<32} {entry['value']:>12.3f} {entry['unit']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print(f"\n{'metric':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+        for name, old, new, change, regressed in compare(results, baseline, args.tolerance):
+            regressions += regressed
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{name:<32} {old:>12.3f} {new:>12.3f} {change:>+7.1%}{flag}")
+        if regressions:
+            print(f"\n{regressions} metrics regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+# Mirrors the message sets in tools/log-generator.js
+LOG_TYPES = ['info', 'warning', 'error']
+LOG_SOURCES = ['web-server', 'database', 'auth-service', 'payment-gateway', 'user-service']
+ERROR_MESSAGES = [
+    'Connection timeout',
+    'Database query failed',
+    'Authentication failed',
+    'Invalid input received',
+    'Memory allocation error',
+    'Segmentation fault detected',
+    'Deadlock detected in transaction',
+    'File not found',
+    'Permission denied',
+    'Service unavailable'
+]
+INFO_MESSAGES = [
+    'User login successful',
+    'Transaction completed',
+    'Data backup completed',
+    'Service started successfully',
+    'Configuration loaded',
+    'Cache refreshed',
+    'Task scheduled',
+    'Message sent successfully',
+    'File uploaded successfully',
+    'API request completed'
+]
+
+
+class SyntheticLogGenerator:
+    """
+    Seeded generator producing logs shaped like tools/log-generator.js
+
+    With burst_every set, every burst_every logs are followed by an error
+    burst: burst_length copies of one error message from one source, like
+    an incident flooding the pipeline. anomaly_rate mixes in the long,
+    repetitive logs of generateAnomalousLog.
+    """
+
+    def __init__(self, seed=42, start=None, interval_ms=200, anomaly_rate=0.0,
+                 burst_every=0, burst_length=50):
+        self.random = random.Random(seed)
+        self.clock = start or datetime(2025, 3, 28, 8, 0, 0)
+        self.interval = timedelta(milliseconds=interval_ms)
+        self.anomaly_rate = anomaly_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+
+    def _next_timestamp(self):
+        self.clock += self.interval
+        return self.clock.isoformat(timespec='milliseconds') + 'Z'
+
+    def _uuid(self):
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def generate_log(self):
+        """Generate a random log entry"""
+        log_type = self.random.choice(LOG_TYPES)
+        source = self.random.choice(LOG_SOURCES)
+
+        if log_type == 'error':
+            message = self.random.choice(ERROR_MESSAGES)
+        else:
+            message = self.random.choice(INFO_MESSAGES)
+
+        return {
+            'id': self._uuid(),
+            'timestamp': self._next_timestamp(),
+            'source': source,
+            'type': log_type,
+            'message': f"{message} (ID: {self.random.randrange(1000)})",
+            'user': f"user-{self.random.randrange(100)}",
+            'requestId': self._uuid()
+        }
+
+    def generate_anomalous_log(self):
+        """Generate a very long, repetitive error log"""
+        log = self.generate_log()
+        log['type'] = 'error'
+        log['message'] = f"{self.random.choice(ERROR_MESSAGES)} " * 30
+        return log
+
+    def generate_burst(self):
+        """Generate an error burst: one error repeated from one source"""
+        source = self.random.choice(LOG_SOURCES)
+        message = self.random.choice(ERROR_MESSAGES)
+        burst = []
+        for _ in range(self.burst_length):
+            log = self.generate_log()
+            log.update(source=source, type='error',
+                       message=f"{message} (ID: {self.random.randrange(1000)})")
+            burst.append(log)
+        return burst
+
+    def stream(self, count):
+        """Yield count log entries, including configured anomalies and bursts"""
+        produced = 0
+        since_burst = 0
+        while produced < count:
+            if self.burst_every and since_burst >= self.burst_every:
+                since_burst = 0
+                for log in self.generate_burst()[:count - produced]:
+                    produced += 1
+                    yield log
+                continue
+            if self.anomaly_rate and self.random.random() < self.anomaly_rate:
+                yield self.generate_anomalous_log()
+            else:
+                yield self.generate_log()
+            produced += 1
+            since_burst += 1
+
+    def generate(self, count):
+        """Generate a list of random log entries"""
+        if not (self.anomaly_rate or self.burst_every):
+            return [self.generate_log() for _ in range(count)]
+        return list(self.stream(count))
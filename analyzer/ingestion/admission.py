@@ -0,0 +1,198 @@
+import re
+import json
+import math
+import time
+import logging
+from collections import deque
+from models.feature_matcher import DEFAULT_ERROR_PATTERNS
+from models.history_store import parse_timestamp
+
+logger = logging.getLogger('log_analyzer.admission')
+
+PRIORITY_LEVELS = frozenset({'error', 'warning', 'warn', 'critical', 'fatal'})
+
+
+class AdmissionController:
+    """
+    Bounded intake queue between the fetcher and the analyzer.
+
+    Fetched logs wait here, split into a priority lane (error and warning
+    logs, or error-looking messages when a log has no level) and an info
+    lane. Queueing delay is measured from when a log was admitted, on the
+    monotonic clock, so old backlogs and clients with skewed clocks do not
+    count as falling behind. Lag by log timestamp is only reported.
+
+    While queueing delay stays under `lag_target` and the queue under its high
+    watermark, logs are analyzed in arrival order. Past either limit the
+    service is degraded: priority logs go first and are always fully
+    analyzed, and only one info log in `1 / info_sample_rate` is analyzed.
+    The others are shed, which costs next to nothing, so the backlog drains
+    and priority latency stays bounded. Info logs are also shed, oldest
+    first, when the queue is full. Priority logs are never shed: once they
+    alone fill the queue, has_room() turns False and the service stops
+    pulling from the fetcher until analysis catches up.
+
+    Shed logs are counted by reason, their ids kept in a bounded window and,
+    if `shed_path` is set, appended to that file as JSON lines so they can
+    be replayed later with `main.py --backfill`.
+    """
+
+    def __init__(self, max_pending=20000, lag_target=30.0, info_sample_rate=0.1,
+                 high_watermark=0.8, shed_path=None, recent_shed=1000):
+        if max_pending < 1:
+            raise ValueError("Intake queue size must be at least 1")
+        self.max_pending = max_pending
+        self.lag_target = lag_target # Seconds queued before degrading
+        self.info_sample_rate = info_sample_rate
+        self.high_watermark = int(max_pending * high_watermark)
+        self.error_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in DEFAULT_ERROR_PATTERNS), re.IGNORECASE
+        )
+
+        self.priority = deque() # (arrival sequence, admitted at, log time, log, is priority)
+        self.info = deque()
+        self.sequence = 0
+        self.sample_credit = 0.0 # Info logs owed to analysis while degraded
+        self.degraded = False
+        self.delay = 0.0 # Time the oldest log in the last batch spent queued
+        self.lag = 0.0 # Age by log timestamp of the oldest log in the last batch
+        self.priority_lag = 0.0
+
+        self.shed_counts = {'sampled': 0, 'queue_full': 0}
+        self.recent_shed = deque(maxlen=recent_shed)
+        self.shed_path = shed_path
+        self.shed_file = None
+
+    def __len__(self):
+        return len(self.priority) + len(self.info)
+
+    def instrument(self, registry):
+        """Expose queue depth, lag, degradation and shed counts"""
+        registry.gauge('intake_depth', 'Logs waiting for analysis', func=self.__len__)
+        registry.gauge('intake_priority_depth', 'Error and warning logs waiting for analysis',
+                       func=lambda: len(self.priority))
+        registry.gauge('intake_delay_seconds', 'Time the oldest log in the last batch spent queued',
+                       func=lambda: self.delay)
+        registry.gauge('intake_lag_seconds', 'Age by log timestamp of the oldest log in the last batch',
+                       func=lambda: self.lag)
+        registry.gauge('intake_priority_lag_seconds',
+                       'Age by log timestamp of the oldest error or warning log in the last batch',
+                       func=lambda: self.priority_lag)
+        registry.gauge('intake_degraded', '1 while info logs are being sampled',
+                       func=lambda: int(self.degraded))
+        for reason in self.shed_counts:
+            registry.counter('shed_logs_total', 'Info logs skipped under overload', {'reason': reason},
+                             func=lambda reason=reason: self.shed_counts[reason])
+
+    def is_priority(self, log):
+        """Whether a log is an error or warning that must always be analyzed"""
+        level = log.get('level', log.get('type'))
+        if level:
+            return str(level).lower() in PRIORITY_LEVELS
+        message = log.get('message')
+        return isinstance(message, str) and self.error_regex.search(message) is not None
+
+    def has_room(self):
+        return len(self) < self.max_pending
+
+    def admit(self, logs):
+        """
+        Queue fetched logs
+
+        Returns:
+            list: Info logs shed to stay within the queue bound
+        """
+        admitted = time.monotonic()
+        for log in logs:
+            if not isinstance(log, dict):
+                # Invalid entries go through so the analyzer reports them
+                priority, timestamp = True, math.nan
+            else:
+                priority, timestamp = self.is_priority(log), parse_timestamp(log.get('timestamp'))
+            (self.priority if priority else self.info).append(
+                (self.sequence, admitted, timestamp, log, priority)
+            )
+            self.sequence += 1
+
+        shed = []
+        while len(self) > self.max_pending and self.info:
+            shed.append(self.info.popleft()[3])
+        self._record_shed(shed, 'queue_full')
+        return shed
+
+    def next_batch(self, size):
+        """
+        Take the next logs to analyze
+
+        Returns:
+            tuple: (logs to analyze in arrival order, info logs shed while degraded)
+        """
+        now = time.monotonic()
+        self.degraded = (len(self) > self.high_watermark
+                         or self._delay(self.priority, now) > self.lag_target
+                         or self._delay(self.info, now) > self.lag_target)
+        if not self.degraded:
+            self.sample_credit = 0.0
+            taken = []
+            while len(taken) < size and (self.priority or self.info):
+                if not self.info or (self.priority and self.priority[0][0] < self.info[0][0]):
+                    taken.append(self.priority.popleft())
+                else:
+                    taken.append(self.info.popleft())
+            shed = []
+        else:
+            taken = [self.priority.popleft() for _ in range(min(size, len(self.priority)))]
+            shed = []
+            # Sample info logs into the remaining space; skipping the rest is
+            # what lets the backlog drain, so look at a bounded number per batch
+            budget = int((size - len(taken)) / max(self.info_sample_rate, 1e-6))
+            while self.info and len(taken) < size and budget > 0:
+                item = self.info.popleft()
+                budget -= 1
+                self.sample_credit += self.info_sample_rate
+                if self.sample_credit >= 1.0:
+                    self.sample_credit -= 1.0
+                    taken.append(item)
+                else:
+                    shed.append(item[3])
+            taken.sort(key=lambda item: item[0])
+            self._record_shed(shed, 'sampled')
+
+        if taken:
+            self.delay = max(now - min(item[1] for item in taken), 0.0)
+            wall = time.time()
+            self.lag = self._lag(taken, wall)
+            self.priority_lag = self._lag([item for item in taken if item[4]], wall)
+        return [item[3] for item in taken], shed
+
+    def oldest_pending(self):
+        """The first admitted log still waiting, for resuming after a restart"""
+        heads = [lane[0] for lane in (self.priority, self.info) if lane]
+        return min(heads, key=lambda item: item[0])[3] if heads else None
+
+    def _delay(self, lane, now):
+        """Time the oldest log in a lane has been queued"""
+        return max(now - lane[0][1], 0.0) if lane else 0.0
+
+    def _lag(self, items, now):
+        timestamps = [item[2] for item in items if not math.isnan(item[2])]
+        return max(now - min(timestamps), 0.0) if timestamps else 0.0
+
+    def _record_shed(self, logs, reason):
+        if not logs:
+            return
+        self.shed_counts[reason] += len(logs)
+        self.recent_shed.extend(log.get('id') for log in logs)
+        if not self.shed_path:
+            return
+        try:
+            if self.shed_file is None:
+                self.shed_file = open(self.shed_path, 'a', encoding='utf-8')
+            self.shed_file.write(''.join(json.dumps(log, default=str) + '\n' for log in logs))
+        except OSError as e:
+            logger.error(f"Failed to record shed logs in {self.shed_path}: {str(e)}")
+
+    def close(self):
+        if self.shed_file:
+            self.shed_file.close()
+            self.shed_file = None
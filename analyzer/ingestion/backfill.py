@@ -0,0 +1,246 @@
+import os
+import json
+import math
+import mmap
+import time
+import heapq
+import logging
+import tempfile
+import multiprocessing
+from itertools import islice
+from models.history_store import parse_timestamp
+
+logger = logging.getLogger('log_analyzer.backfill')
+
+FILES_PER_CHUNK = 2000 # Pretty-printed JSON files parsed per task
+BYTES_PER_CHUNK = 8 << 20 # JSON-lines bytes parsed per task
+MAX_OPEN_RUNS = 256 # Sorted runs merged at once
+
+
+def timestamp_key(log):
+    """Sort key of a log: epoch seconds, with missing or bad timestamps last"""
+    value = log.get('timestamp')
+    if value is None:
+        return math.inf
+    key = parse_timestamp(value)
+    return math.inf if math.isnan(key) else key
+
+
+def normalize(log):
+    """Fill in `source` for server logs that only carry `service`"""
+    if 'source' not in log and 'service' in log:
+        log['source'] = log['service']
+    return log
+
+
+def discover(paths):
+    """
+    Yield parse tasks for files and directories, streaming directory listings
+
+    Directories contribute their *.json files (one log per file) in chunks
+    of FILES_PER_CHUNK; *.log and *.jsonl files are split into newline
+    aligned byte ranges of about BYTES_PER_CHUNK.
+    """
+    batch = []
+    for path in paths:
+        if os.path.isdir(path):
+            stack = [path]
+            while stack:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.endswith('.json'):
+                            batch.append(entry.path)
+                            if len(batch) >= FILES_PER_CHUNK:
+                                yield ('json', batch)
+                                batch = []
+                        elif entry.name.endswith(('.log', '.jsonl')):
+                            yield from _line_ranges(entry.path)
+        elif path.endswith('.json'):
+            batch.append(path)
+        else:
+            yield from _line_ranges(path)
+    if batch:
+        yield ('json', batch)
+
+
+def _line_ranges(path):
+    """Split a JSON-lines file into newline aligned byte ranges"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', min(start + BYTES_PER_CHUNK, size - 1))
+            end = size if end < 0 else end + 1
+            yield ('lines', (path, start, end))
+            start = end
+
+
+def _parse_chunk(task, run_dir):
+    """
+    Parse one task into a sorted run file
+
+    Each run line is "<sort key>\\t<compact JSON log>", so merging only
+    has to read the key.
+
+    Returns:
+        tuple: (run path, logs written, lines that failed to parse)
+    """
+    kind, spec = task
+    logs = []
+    errors = 0
+
+    if kind == 'json':
+        for path in spec:
+            try:
+                with open(path, 'rb') as f:
+                    log = json.loads(f.read())
+            except (OSError, ValueError):
+                errors += 1
+                continue
+            if isinstance(log, dict):
+                logs.append(normalize(log))
+            else:
+                errors += 1
+    else:
+        path, start, end = spec
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = mm[start:end].splitlines()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                log = json.loads(line)
+            except ValueError:
+                errors += 1
+                continue
+            if isinstance(log, dict):
+                logs.append(normalize(log))
+            else:
+                errors += 1
+
+    keyed = sorted(((timestamp_key(log), log) for log in logs), key=lambda item: item[0])
+    fd, run_path = tempfile.mkstemp(dir=run_dir, suffix='.run')
+    with os.fdopen(fd, 'w', encoding='utf-8', buffering=1 << 20) as out:
+        for key, log in keyed:
+            out.write(f"{key!r}\t{json.dumps(log, separators=(',', ':'), default=str)}\n")
+    return run_path, len(keyed), errors
+
+
+def _parse_chunk_star(args):
+    return _parse_chunk(*args)
+
+
+def _read_run(path):
+    """Yield (key, line) pairs of a run file"""
+    with open(path, 'r', encoding='utf-8', buffering=1 << 20) as f:
+        for line in f:
+            key, _, payload = line.partition('\t')
+            yield float(key), payload
+
+
+def _merge_runs(run_paths, run_dir):
+    """Merge run files down to at most MAX_OPEN_RUNS, returning the remaining paths"""
+    while len(run_paths) > MAX_OPEN_RUNS:
+        merged = []
+        for i in range(0, len(run_paths), MAX_OPEN_RUNS):
+            group = run_paths[i:i + MAX_OPEN_RUNS]
+            fd, path = tempfile.mkstemp(dir=run_dir, suffix='.run')
+            with os.fdopen(fd, 'w', encoding='utf-8', buffering=1 << 20) as out:
+                for key, payload in heapq.merge(*map(_read_run, group), key=lambda item: item[0]):
+                    out.write(f"{key!r}\t{payload}")
+            for old in group:
+                os.remove(old)
+            merged.append(path)
+        run_paths = merged
+    return run_paths
+
+
+def compact_result(log, result):
+    """Small per-log record for the result file"""
+    record = {
+        'id': log.get('id'),
+        'timestamp': log.get('timestamp'),
+        'source': log.get('source'),
+        'score': round(result.get('anomaly_score', 0.0), 4),
+        'detected': result.get('anomaly_detected', False)
+    }
+    if record['detected']:
+        record['reasons'] = result.get('reasons', [])
+    if 'error' in result:
+        record['error'] = result['error']
+    return record
+
+
+def backfill(paths, log_analyzer, output=None, parse_workers=None, batch_size=1000,
+             anomalies_only=False):
+    """
+    Replay stored logs through a LogAnalyzer in timestamp order
+
+    Inputs are parsed in parallel chunks, each written as a sorted run to a
+    temporary directory, and the runs are k-way merged while batches are fed
+    to the analyzer, so memory stays bounded by the chunk and batch sizes
+    rather than the size of the history.
+
+    Args:
+        paths (list): Directories of JSON log files and/or JSON-lines files
+        log_analyzer: LogAnalyzer (or ShardedAnalyzer) to feed
+        output (str): Path of the JSON-lines result file, or None for none
+        parse_workers (int): Parser processes, defaults to the CPU count
+        batch_size (int): Logs per process_batch call
+        anomalies_only (bool): Only write detected anomalies to the output
+
+    Returns:
+        dict: Summary statistics
+    """
+    started = time.perf_counter()
+    summary = {'logs': 0, 'parse_errors': 0, 'runs': 0, 'anomalies': 0, 'by_source': {}}
+
+    with tempfile.TemporaryDirectory(prefix='backfill-') as run_dir:
+        run_paths = []
+        tasks = ((task, run_dir) for task in discover(paths))
+        with multiprocessing.Pool(parse_workers) as pool:
+            for run_path, count, errors in pool.imap_unordered(_parse_chunk_star, tasks):
+                run_paths.append(run_path)
+                summary['parse_errors'] += errors
+        summary['runs'] = len(run_paths)
+        summary['parse_seconds'] = round(time.perf_counter() - started, 3)
+
+        run_paths = _merge_runs(run_paths, run_dir)
+        merged = heapq.merge(*map(_read_run, run_paths), key=lambda item: item[0])
+
+        analysis_started = time.perf_counter()
+        out = open(output, 'w', encoding='utf-8', buffering=1 << 20) if output else None
+        try:
+            while True:
+                logs = [json.loads(payload) for _, payload in islice(merged, batch_size)]
+                if not logs:
+                    break
+                results = log_analyzer.process_batch(logs)
+                for log, result in zip(logs, results):
+                    source = log.get('source')
+                    summary['by_source'][source] = summary['by_source'].get(source, 0) + 1
+                    if result.get('anomaly_detected', False):
+                        summary['anomalies'] += 1
+                    elif anomalies_only:
+                        continue
+                    if out:
+                        out.write(json.dumps(compact_result(log, result), separators=(',', ':')))
+                        out.write('\n')
+                summary['logs'] += len(logs)
+        finally:
+            if out:
+                out.close()
+
+    elapsed = time.perf_counter() - started
+    summary['analysis_seconds'] = round(time.perf_counter() - analysis_started, 3)
+    summary['seconds'] = round(elapsed, 3)
+    summary['logs_per_second'] = round(summary['logs'] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(
+        f"Replayed {summary['logs']} logs in {elapsed:.1f}s ({summary['logs_per_second']} logs/s), "
+        f"{summary['anomalies']} anomalies, {summary['parse_errors']} unparseable entries"
+    )
+    return summary
@@ -0,0 +1,198 @@
+import time
+import queue
+import logging
+from collections import deque
+from threading import Thread, Event
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('log_analyzer.fetcher')
+
+
+class SeenIdWindow:
+    """Bounded set of the most recently seen log ids"""
+
+    def __init__(self, size=10000):
+        self.size = size
+        self.order = deque()
+        self.ids = set()
+
+    def add(self, log_id):
+        """
+        Remember a log id
+
+        Returns:
+            bool: True if the id was not seen before
+        """
+        if log_id is None:
+            return True
+        if log_id in self.ids:
+            return False
+        self.ids.add(log_id)
+        self.order.append(log_id)
+        if len(self.order) > self.size:
+            self.ids.discard(self.order.popleft())
+        return True
+
+    def __len__(self):
+        return len(self.order)
+
+
+class LogFetcher:
+    """
+    Background producer that pages logs from the Node.js server.
+
+    Pages are requested in arrival order from a cursor over one pooled
+    keep-alive session and handed to the consumer through a bounded queue,
+    so fetching the next page overlaps with analyzing the current one. Full
+    pages are followed immediately to drain a backlog; when the server runs
+    dry the poll delay doubles up to `poll_interval`.
+
+    The cursor is the highest server sequence number read so far, sent as
+    `after_seq`. The server numbers logs as they arrive, so a log stamped
+    earlier by a slow or skewed client is still fetched. Timestamps only
+    order logs inside the analysis windows. When the server's epoch
+    changes, it restarted and numbers logs from 1 again, so paging starts
+    over. Logs that come back anyway, such as after a restore, are caught
+    by a window of recently seen ids.
+    """
+
+    def __init__(self, server_url, headers=None, page_size=100, max_queue=10,
+                 poll_interval=5, min_poll_interval=0.1, timeout=10, seen_window=10000):
+        self.url = f"{server_url}/api/query/recent"
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.min_poll_interval = min_poll_interval
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.cursor = None # Highest server sequence number read
+        self.epoch = None # Server run the sequence numbers belong to
+        self.seen = SeenIdWindow(seen_window)
+        self.fetched_count = 0
+        self.stop_event = Event()
+        self.thread = None
+        self.fetch_seconds = None # Histogram once instrumented
+
+    def instrument(self, registry):
+        """Expose fetch counters, queue depth and request latency"""
+        registry.counter('fetched_logs_total', 'New logs fetched from the server',
+                         func=lambda: self.fetched_count)
+        registry.gauge('fetch_queue_depth', 'Fetched batches waiting for analysis',
+                       func=self.queue.qsize)
+        self.fetch_seconds = registry.histogram('fetch_seconds', 'Time per /api/query/recent request')
+
+    def start(self):
+        """Start the producer thread"""
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = Thread(target=self._run, name='log-fetcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the producer thread and close the session"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.timeout + 1)
+            self.thread = None
+        self.session.close()
+
+    def restore(self, cursor, epoch=None, seen_ids=()):
+        """Resume after a saved sequence number, skipping ids already handled past it"""
+        self.cursor = cursor
+        self.epoch = epoch
+        for log_id in seen_ids:
+            self.seen.add(log_id)
+
+    def get_batch(self, timeout=1.0):
+        """Next batch of new logs, or None if nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _fetch_page(self):
+        """Fetch the page of logs following the cursor"""
+        payload = self._request()
+        if payload is None:
+            return None
+        epoch = payload.get('epoch')
+        if epoch != self.epoch:
+            restarted = self.epoch is not None and self.cursor is not None
+            self.epoch = epoch
+            if restarted:
+                logger.warning("Log server restarted, paging again from its first log")
+                self.cursor = None
+                payload = self._request()
+                if payload is None:
+                    return None
+        return payload.get('logs', [])
+
+    def _request(self):
+        params = {'limit': self.page_size, 'after_seq': self.cursor or 0}
+        started = time.perf_counter()
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        if self.fetch_seconds:
+            self.fetch_seconds.observe(time.perf_counter() - started)
+        if response.status_code != 200:
+            logger.warning(f"Failed to get logs: HTTP {response.status_code}")
+            return None
+        return response.json()
+
+    def _run(self):
+        """Producer loop"""
+        delay = self.min_poll_interval
+        while not self.stop_event.is_set():
+            try:
+                logs = self._fetch_page()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Network error: {str(e)}")
+                self.stop_event.wait(self.poll_interval * 2)
+                continue
+            except ValueError as e:
+                logger.error(f"Invalid JSON response: {str(e)}")
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            if logs is None:
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            self._advance(logs)
+            new_logs = [log for log in logs if self.seen.add(log.get('id'))]
+            if new_logs:
+                self.fetched_count += len(new_logs)
+                self._put(new_logs)
+
+            if len(logs) >= self.page_size:
+                # Backlog: fetch the next page right away
+                delay = self.min_poll_interval
+                continue
+            if new_logs:
+                delay = self.min_poll_interval
+            else:
+                delay = min(delay * 2, self.poll_interval)
+            self.stop_event.wait(delay)
+
+    def _advance(self, logs):
+        """Move the cursor past a page"""
+        sequences = [log.get('seq') for log in logs]
+        newest = max((seq for seq in sequences if isinstance(seq, int)), default=None)
+        if newest is not None and (self.cursor is None or newest > self.cursor):
+            self.cursor = newest
+
+    def _put(self, logs):
+        """Queue a batch, waiting while the consumer is behind"""
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(logs, timeout=0.5)
+                return
+            except queue.Full:
+                continue
@@ -3,11 +3,21 @@ import sys
 import json
 import time
 import logging
+import argparse
 from datetime import datetime
 import traceback
-import requests
+from collections import deque
 from models.log_analyzer import LogAnalyzer
 from alerts.alert_manager import AlertManager
+from workers.worker import AnalyzerWorker
+from workers.pool import ShardedAnalyzer
+from native.log_processor import DEFAULT_LIBRARY
+from ingestion.log_fetcher import LogFetcher
+from ingestion.admission import AdmissionController
+from ingestion.backfill import backfill
+from monitoring.metrics import MetricsRegistry, MetricsServer
+from monitoring.profiler import SamplingProfiler
+from models.checkpoint import Checkpointer
 
 # Configure logging
 logging.basicConfig(
@@ -22,17 +32,94 @@ NODE_SERVER_URL = os.environ.get('NODE_SERVER_URL', 'http://localhost:3000')
 POLL_INTERVAL = int(os.environ.get('POLL_INTERVAL', '5'))  # seconds
 API_KEY = os.environ.get('API_KEY', '')
 USERNAME = os.environ.get('USERNAME', 'megafemworld')
+HISTORY_SIZE = int(os.environ.get('HISTORY_SIZE', '1000'))  # analyzed logs kept in memory
+FETCH_LIMIT = int(os.environ.get('FETCH_LIMIT', '100'))  # logs per page
+FETCH_QUEUE_SIZE = int(os.environ.get('FETCH_QUEUE_SIZE', '10'))  # pages buffered ahead of analysis
+STATS_INTERVAL = int(os.environ.get('STATS_INTERVAL', '30'))  # seconds between throughput reports
+ALERT_BATCH_SIZE = int(os.environ.get('ALERT_BATCH_SIZE', '50'))  # alerts per POST
+ALERT_FLUSH_INTERVAL = float(os.environ.get('ALERT_FLUSH_INTERVAL', '1.0'))  # max seconds an alert waits for a batch
+ALERT_QUEUE_SIZE = int(os.environ.get('ALERT_QUEUE_SIZE', '10000'))  # undelivered alerts before new ones are dropped
+ANALYZER_WORKERS = int(os.environ.get('ANALYZER_WORKERS', '1'))  # analysis processes, sharded by source
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9464'))  # Prometheus endpoint, 0 disables
+PROFILE_FILE = os.environ.get('PROFILE_FILE', '')  # sample stacks for the whole run and write them here
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', '0.01'))  # seconds between stack samples
+CHECKPOINT_PATH = os.environ.get('CHECKPOINT_PATH',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state', 'analyzer.ckpt'))
+CHECKPOINT_INTERVAL = int(os.environ.get('CHECKPOINT_INTERVAL', '60'))  # seconds between snapshots, 0 disables
+INTAKE_SIZE = int(os.environ.get('INTAKE_SIZE', '20000'))  # fetched logs waiting for analysis
+ANALYSIS_BATCH_SIZE = int(os.environ.get('ANALYSIS_BATCH_SIZE', '500'))  # logs analyzed per batch
+LAG_TARGET = float(os.environ.get('LAG_TARGET', '30'))  # seconds a log may wait in the intake before info logs are sampled
+INFO_SAMPLE_RATE = float(os.environ.get('INFO_SAMPLE_RATE', '0.1'))  # share of info logs analyzed while behind
+SHED_FILE = os.environ.get('SHED_FILE', '')  # append skipped info logs here as JSON lines
+ANOMALY_MODEL = os.environ.get('ANOMALY_MODEL', '0') == '1'  # add IsolationForest scoring to the rules
+MODEL_PATH = os.environ.get('MODEL_PATH',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state', 'model.npz'))
+NATIVE_PROCESSOR = os.environ.get('NATIVE_PROCESSOR', '0') == '1'  # batch counting and search in liblogprocessor
+LOG_PROCESSOR_LIB = os.environ.get('LOG_PROCESSOR_LIB', DEFAULT_LIBRARY)
+NATIVE_LIBRARY = LOG_PROCESSOR_LIB if NATIVE_PROCESSOR else None
 
 class LogAnalyzerService:
     def __init__(self):
-        self.log_analyzer = LogAnalyzer()
-        self.alert_manager = AlertManager(node_server_url=NODE_SERVER_URL)
-        self.last_processed_id = None
+        if ANALYZER_WORKERS > 1:
+            # Each shard trains its own model in memory
+            self.log_analyzer = ShardedAnalyzer(workers=ANALYZER_WORKERS, history_size=HISTORY_SIZE,
+                                                anomaly_model=ANOMALY_MODEL, native_library=NATIVE_LIBRARY)
+        else:
+            self.log_analyzer = LogAnalyzer(history_size=HISTORY_SIZE, anomaly_model=ANOMALY_MODEL,
+                                            model_path=MODEL_PATH, native_library=NATIVE_LIBRARY)
+        self.alert_manager = AlertManager(
+            node_server_url=NODE_SERVER_URL,
+            batch_size=ALERT_BATCH_SIZE,
+            flush_interval=ALERT_FLUSH_INTERVAL,
+            max_queue=ALERT_QUEUE_SIZE
+        )
         self.headers = {
             'Content-Type': 'application/json',
             'User-Agent': f'LogAnalyzer/2.0 ({USERNAME})',
             'X-API-Key': API_KEY
         }
+        self.fetcher = LogFetcher(
+            NODE_SERVER_URL,
+            headers=self.headers,
+            page_size=FETCH_LIMIT,
+            max_queue=FETCH_QUEUE_SIZE,
+            poll_interval=POLL_INTERVAL,
+            seen_window=max(2 * INTAKE_SIZE, 10000)
+        )
+        # Bounded intake with priority load shedding
+        self.intake = AdmissionController(
+            max_pending=INTAKE_SIZE,
+            lag_target=LAG_TARGET,
+            info_sample_rate=INFO_SAMPLE_RATE,
+            shed_path=SHED_FILE or None
+        )
+        self.processed_count = 0
+        self.alert_count = 0
+        self.stats_started = time.monotonic()
+        self.stats_processed = 0
+
+        # Instrumentation
+        self.metrics = MetricsRegistry()
+        self.log_analyzer.instrument(self.metrics)
+        self.alert_manager.instrument(self.metrics)
+        self.fetcher.instrument(self.metrics)
+        self.intake.instrument(self.metrics)
+        self.metrics.counter('processed_logs_total', 'Logs analyzed and checked for alerts',
+                             func=lambda: self.processed_count)
+        self.batch_seconds = self.metrics.histogram('batch_seconds', 'Time to analyze one fetched batch')
+        self.profiler = SamplingProfiler(interval=PROFILE_INTERVAL)
+        self.metrics_server = None
+
+        # Warm restarts (single-process analysis only)
+        self.checkpointer = None
+        if CHECKPOINT_INTERVAL and isinstance(self.log_analyzer, LogAnalyzer):
+            self.checkpointer = Checkpointer(CHECKPOINT_PATH, interval=CHECKPOINT_INTERVAL)
+        self.processed_cursor = None # Highest server sequence number analyzed or shed
+        # (sequence number, id) of recently analyzed or shed logs, so a resume
+        # from an older cursor skips the ones already handled
+        self.handled = deque(maxlen=max(2 * INTAKE_SIZE, 10000))
+        self.started_at = None
         
     def start(self):
         """Start the log analyzer service"""
@@ -40,8 +127,26 @@ class LogAnalyzerService:
         logger.info(f"User: {USERNAME}")
         logger.info(f"Connecting to server: {NODE_SERVER_URL}")
         
+        self.started_at = time.perf_counter()
+        self._restore_state()
+
         # Start alert manager
         self.alert_manager.start()
+
+        # Expose metrics and, if asked for, profile the whole run
+        if METRICS_PORT:
+            try:
+                self.metrics_server = MetricsServer(
+                    self.metrics, host=METRICS_HOST, port=METRICS_PORT, profiler=self.profiler
+                )
+                self.metrics_server.start()
+            except OSError as e:
+                logger.warning(f"Metrics endpoint disabled: {str(e)}")
+        if PROFILE_FILE:
+            self.profiler.start()
+        
+        # Start fetching logs in the background
+        self.fetcher.start()
         
         try:
             self._run_processing_loop()
@@ -57,88 +162,228 @@ class LogAnalyzerService:
         """Main processing loop"""
         while True:
             try:
-                self._process_batch()
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Network error: {str(e)}")
-                time.sleep(POLL_INTERVAL * 2)
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON response: {str(e)}")
-                time.sleep(POLL_INTERVAL)
+                self._process_next()
+                self._report_throughput()
             except Exception as e:
                 logger.error(f"Unexpected error: {str(e)}")
                 logger.error(traceback.format_exc())
-                time.sleep(POLL_INTERVAL * 2)
+                time.sleep(POLL_INTERVAL)
                 
-    def _process_batch(self):
+    def _process_next(self):
+        """
+        Pull fetched pages into the intake, then analyze or shed the next batch
+
+        Returns:
+            int: Logs analyzed or shed
+        """
+        self._fill_intake()
+        logs, shed = self.intake.next_batch(ANALYSIS_BATCH_SIZE)
+        if shed:
+            self._advance_cursor(shed)
+        if logs:
+            self._process_batch(logs)
+        if (logs or shed) and self.checkpointer:
+            self.checkpointer.maybe_capture(self.log_analyzer, self._checkpoint_state)
+        return len(logs) + len(shed)
+
+    def _fill_intake(self):
+        """Move fetched pages into the intake queue while it has room"""
+        timeout = 0 if len(self.intake) else 1.0
+        while self.intake.has_room():
+            logs = self.fetcher.get_batch(timeout=timeout)
+            if not logs:
+                break
+            shed = self.intake.admit(logs)
+            if shed:
+                self._advance_cursor(shed)
+            timeout = 0
+
+    def _process_batch(self, logs):
         """Process a batch of logs"""
-        # Get logs to process
-        response = self._fetch_logs()
-        
-        if response.status_code != 200:
-            logger.warning(f"Failed to get logs: HTTP {response.status_code}")
-            time.sleep(POLL_INTERVAL)
-            return
-        
-        logs_data = response.json()
-        logs = logs_data.get('logs', [])
-        
-        if not logs:
-            logger.debug("No logs to process")
-            time.sleep(POLL_INTERVAL)
-            return
-        
-        logger.info(f"Processing {len(logs)} logs")
+        logger.debug(f"Processing {len(logs)} logs")
         
-        processed_count = 0
         alert_count = 0
         
-        # Process each log
-        for log in logs:
-            # Skip if we've already processed this log
-            if self.last_processed_id == log.get('id'):
-                continue
-            
-            # Process the log
-            analysis_result = self.log_analyzer.process_log(log)
-            processed_count += 1
-            
+        # Process the whole batch at once
+        started = time.perf_counter()
+        analysis_results = self.log_analyzer.process_batch(logs)
+        self.batch_seconds.observe(time.perf_counter() - started)
+        
+        for log, analysis_result in zip(logs, analysis_results):
             # Check if an alert should be generated
             if analysis_result.get('anomaly_detected', False):
-                self.alert_manager.add_alert(log.get('id'), analysis_result)
+                self.alert_manager.add_alert(log.get('id'), analysis_result, log.get('source'))
                 alert_count += 1
-            
-            # Update last processed ID
-            self.last_processed_id = log.get('id')
         
-        if processed_count > 0:
-            logger.info(f"Processed {processed_count} logs, generated {alert_count} alerts")
-                
-        # Sleep between polling
-        time.sleep(POLL_INTERVAL)
-            
-    def _fetch_logs(self):
-        """Fetch logs from the server"""
-        params = {'limit': 10}
-        if self.last_processed_id:
-            params['after_id'] = self.last_processed_id
+        self.processed_count += len(logs)
+        self.alert_count += alert_count
+        self._advance_cursor(logs)
+
+        if self.started_at is not None:
+            logger.info(f"First batch scored {(time.perf_counter() - self.started_at) * 1000:.0f} ms after startup")
+            self.started_at = None
+
+    def _advance_cursor(self, logs):
+        """Remember how far analysis got and which logs were handled, for checkpoints"""
+        for log in logs:
+            if not isinstance(log, dict) or not isinstance(log.get('seq'), int):
+                continue
+            seq = log['seq']
+            self.handled.append((seq, log.get('id')))
+            if self.processed_cursor is None or seq > self.processed_cursor:
+                self.processed_cursor = seq
+
+    def _restore_state(self):
+        """Warm up from the last checkpoint, if there is one"""
+        if not self.checkpointer:
+            return
+        started = time.perf_counter()
+        extra = self.checkpointer.restore(self.log_analyzer)
+        if extra is None:
+            return
+        cursor = extra.get('cursor')
+        if isinstance(cursor, int):
+            handled = [(seq, log_id) for seq, log_id in extra.get('handled', [])]
+            self.processed_cursor = cursor
+            self.handled.extend(handled)
+            self.fetcher.restore(cursor, extra.get('epoch'), [log_id for _, log_id in handled])
+        logger.info(
+            f"Restored {len(self.log_analyzer.history)} history entries and baselines from "
+            f"{self.checkpointer.path} in {(time.perf_counter() - started) * 1000:.1f} ms, "
+            f"resuming at {self.processed_cursor}"
+        )
+
+    def _checkpoint_state(self):
+        """Service state saved alongside the analyzer's"""
+        # Logs still queued are fetched again after a restart; ones already
+        # handled past the resume point are skipped by id
+        cursor = self.processed_cursor
+        pending = self.intake.oldest_pending()
+        seq = pending.get('seq') if isinstance(pending, dict) else None
+        if isinstance(seq, int) and cursor is not None and seq <= cursor:
+            cursor = seq - 1
+        handled = [[seq, log_id] for seq, log_id in self.handled
+                   if log_id is not None and cursor is not None and seq > cursor]
+        return {'cursor': cursor, 'epoch': self.fetcher.epoch, 'handled': handled}
         
-        return requests.get(
-            f"{NODE_SERVER_URL}/api/query/recent",
-            params=params,
-            headers=self.headers,
-            timeout=10
+    def _report_throughput(self):
+        """Log throughput every STATS_INTERVAL seconds"""
+        elapsed = time.monotonic() - self.stats_started
+        if elapsed < STATS_INTERVAL:
+            return
+        
+        processed = self.processed_count - self.stats_processed
+        logger.info(
+            f"Processed {processed} logs in {elapsed:.0f}s ({processed / elapsed:.1f} logs/s), "
+            f"{self.alert_count} alerts total, fetch queue depth {self.fetcher.queue.qsize()}, "
+            f"intake {len(self.intake)} logs, queued {self.intake.delay:.1f}s, lag {self.intake.lag:.1f}s"
         )
+        if self.intake.degraded:
+            logger.warning(
+                f"Logs queued for {self.intake.delay:.0f}s: sampling info logs, "
+                f"{sum(self.intake.shed_counts.values())} shed so far"
+            )
+        self.stats_started = time.monotonic()
+        self.stats_processed = self.processed_count
             
     def _cleanup(self):
         """Clean up resources"""
+        if self.profiler.running:
+            self.profiler.stop()
+            self.profiler.write(PROFILE_FILE)
+            logger.info(f"Wrote {self.profiler.samples} stack samples to {PROFILE_FILE}")
+        if self.metrics_server:
+            self.metrics_server.stop()
+        logger.info("Stopping log fetcher...")
+        self.fetcher.stop()
+        self.intake.close()
+        if self.checkpointer and self.processed_cursor is not None:
+            logger.info("Saving checkpoint...")
+            self.checkpointer.capture(self.log_analyzer, self._checkpoint_state(), wait=True)
         logger.info("Shutting down alert manager...")
         self.alert_manager.stop()
+        if isinstance(self.log_analyzer, ShardedAnalyzer):
+            logger.info("Stopping analyzer processes...")
+            self.log_analyzer.close()
         logger.info("Log Analyzer Service stopped")
         
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Log Analyzer service')
+    parser.add_argument('log_json', nargs='?',
+                        help='Analyze a single JSON encoded log, print the result and exit')
+    parser.add_argument('--worker', action='store_true',
+                        help='Run as a long-lived worker answering newline-delimited JSON requests')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='Serve worker requests on a Unix domain socket instead of stdin/stdout')
+    parser.add_argument('--backfill', nargs='+', metavar='PATH',
+                        help='Replay stored logs (directories of JSON files, JSON-lines files) and exit')
+    parser.add_argument('--output', metavar='FILE',
+                        help='With --backfill, write one compact JSON result per log to FILE')
+    parser.add_argument('--anomalies-only', action='store_true',
+                        help='With --output, only write detected anomalies')
+    parser.add_argument('--parse-workers', type=int,
+                        help='With --backfill, processes used to parse input (default: CPU count)')
+    return parser.parse_args(argv)
+
+def analyze_once(log_json):
+    """Analyze a single log passed on the command line"""
+    try:
+        log = json.loads(log_json)
+    except json.JSONDecodeError as e:
+        print(json.dumps({'error': f'Invalid JSON: {str(e)}'}))
+        return 1
+
+    result = LogAnalyzer().process_log(log)
+    print(json.dumps(result, default=str))
+    return 0
+
+def run_backfill(args):
+    """Replay stored logs through a fresh analyzer and print summary stats"""
+    if ANALYZER_WORKERS > 1:
+        log_analyzer = ShardedAnalyzer(workers=ANALYZER_WORKERS, history_size=HISTORY_SIZE,
+                                       anomaly_model=ANOMALY_MODEL, native_library=NATIVE_LIBRARY)
+    else:
+        # Trains from scratch without replacing the live service's saved model
+        log_analyzer = LogAnalyzer(history_size=HISTORY_SIZE, anomaly_model=ANOMALY_MODEL,
+                                   native_library=NATIVE_LIBRARY)
+    try:
+        summary = backfill(
+            args.backfill,
+            log_analyzer,
+            output=args.output,
+            parse_workers=args.parse_workers,
+            anomalies_only=args.anomalies_only
+        )
+    finally:
+        if isinstance(log_analyzer, ShardedAnalyzer):
+            log_analyzer.close()
+    print(json.dumps(summary, indent=2))
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.backfill:
+        return run_backfill(args)
+
+    if args.worker or args.socket:
+        # Each pool worker sees only its share of sources, so its model stays in memory
+        worker = AnalyzerWorker(LogAnalyzer(history_size=HISTORY_SIZE, anomaly_model=ANOMALY_MODEL,
+                                            native_library=NATIVE_LIBRARY))
+        if args.socket:
+            worker.serve_socket(args.socket)
+        else:
+            worker.serve_stdio()
+        return 0
+
+    if args.log_json:
+        return analyze_once(args.log_json)
+
     service = LogAnalyzerService()
     service.start()
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,303 @@
+import os
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger('log_analyzer.model')
+
+# Model inputs, computed from history rows so training and scoring see the same values
+FEATURES = (
+    'log_message_length',
+    'log_token_count',
+    'severity',
+    'sentiment',
+    'keyword_count',
+    'max_keyword_hits'
+)
+
+
+def feature_matrix(rows):
+    """
+    Model inputs of some history rows
+
+    The anomaly score and detection flag are left out so the model never
+    learns from the rule-based verdicts.
+
+    Args:
+        rows (numpy.ndarray): Rows of HISTORY_DTYPE
+
+    Returns:
+        numpy.ndarray: float32 matrix, one row per log and one column per FEATURES entry
+    """
+    matrix = np.empty((len(rows), len(FEATURES)), dtype=np.float32)
+    matrix[:, 0] = np.log1p(rows['message_length'])
+    matrix[:, 1] = np.log1p(rows['token_count'])
+    matrix[:, 2] = rows['severity']
+    matrix[:, 3] = rows['sentiment']
+    matrix[:, 4] = (rows['keyword_ids'] >= 0).sum(axis=1)
+    matrix[:, 5] = rows['keyword_hits'].max(axis=1) if len(rows) else 0
+    return matrix
+
+
+def average_path_length(samples):
+    """Expected path length of an unsuccessful search in a binary tree of `samples` nodes"""
+    samples = np.asarray(samples, dtype=np.float64)
+    lengths = np.zeros_like(samples)
+    lengths[samples == 2] = 1.0
+    large = samples > 2
+    n = samples[large]
+    lengths[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return lengths
+
+
+class IsolationForestModel:
+    """
+    A trained isolation forest flattened into NumPy arrays.
+
+    All trees are stored as one node table. Leaves point back at themselves,
+    so every log walks every tree for a fixed number of steps and a whole
+    batch is scored with a handful of array operations per tree level, with
+    no per-call overhead from scikit-learn. Scores equal
+    IsolationForest.score_samples up to sign: 1.0 is most anomalous, and
+    normal logs score around 0.5 or below.
+
+    Instances are never modified after construction, so a scorer can swap
+    one in for another with a single assignment.
+    """
+
+    def __init__(self, feature, threshold, children, leaf_value, roots, depth, normalizer,
+                 samples=0, trained_at=0.0):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children # Left and right child of node i at 2i and 2i+1
+        self.leaf_value = leaf_value # Depth plus expected remaining path length, 0 for inner nodes
+        self.roots = roots
+        self.depth = depth
+        self.normalizer = normalizer
+        self.samples = samples
+        self.trained_at = trained_at
+
+    @classmethod
+    def from_sklearn(cls, forest, samples=0):
+        """Flatten a fitted sklearn.ensemble.IsolationForest"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator, used_features in zip(forest.estimators_, forest.estimators_features_):
+            tree = estimator.tree_
+            nodes = tree.node_count
+            node_depth = np.zeros(nodes)
+            # Children always come after their parent
+            for node in range(nodes):
+                for child in (tree.children_left[node], tree.children_right[node]):
+                    if child != -1:
+                        node_depth[child] = node_depth[node] + 1
+            leaf = tree.children_left == -1
+            index = np.arange(nodes) + offset
+            pairs = np.empty(2 * nodes, dtype=np.int64)
+            pairs[0::2] = np.where(leaf, index, tree.children_left + offset)
+            pairs[1::2] = np.where(leaf, index, tree.children_right + offset)
+
+            features.append(np.where(leaf, 0, np.asarray(used_features)[np.maximum(tree.feature, 0)]))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            children.append(pairs)
+            values.append(np.where(leaf, node_depth + average_path_length(tree.n_node_samples), 0.0))
+            roots.append(offset)
+            offset += nodes
+            depth = max(depth, int(node_depth.max()))
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children).astype(np.intp),
+            leaf_value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.intp),
+            depth=depth,
+            normalizer=len(roots) * float(average_path_length([forest.max_samples_])[0]),
+            samples=samples,
+            trained_at=time.time()
+        )
+
+    def score(self, matrix):
+        """
+        Anomaly scores of a feature matrix
+
+        Identical rows are scored once, which makes batches of repetitive
+        logs much cheaper.
+
+        Returns:
+            numpy.ndarray: One score in (0, 1] per row
+        """
+        if len(matrix) == 0:
+            return np.zeros(0)
+        if len(matrix) > 1:
+            matrix, inverse = np.unique(matrix, axis=0, return_inverse=True)
+        else:
+            inverse = None
+
+        count, width = matrix.shape
+        values = matrix.ravel()
+        row_start = (np.arange(count, dtype=np.intp) * width)[:, None]
+        nodes = np.broadcast_to(self.roots, (count, len(self.roots))).copy()
+        for _ in range(self.depth):
+            right = values.take(row_start + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + right)
+        scores = 2.0 ** (-self.leaf_value.take(nodes).sum(axis=1) / self.normalizer)
+        return scores if inverse is None else scores[inverse.ravel()]
+
+    def save(self, path):
+        """Atomically write the model as an .npz file"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(
+                f,
+                features=np.array(FEATURES),
+                feature=self.feature,
+                threshold=self.threshold,
+                children=self.children,
+                leaf_value=self.leaf_value,
+                roots=self.roots,
+                meta=np.array([self.depth, self.normalizer, self.samples, self.trained_at])
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a model written by save()
+
+        Raises:
+            ValueError: If the file was trained on different features
+        """
+        with np.load(path) as data:
+            if tuple(data['features'].tolist()) != FEATURES:
+                raise ValueError("Saved model was trained on different features")
+            depth, normalizer, samples, trained_at = data['meta'].tolist()
+            return cls(
+                feature=data['feature'].astype(np.intp),
+                threshold=data['threshold'],
+                children=data['children'].astype(np.intp),
+                leaf_value=data['leaf_value'],
+                roots=data['roots'].astype(np.intp),
+                depth=int(depth),
+                normalizer=normalizer,
+                samples=int(samples),
+                trained_at=trained_at
+            )
+
+
+class AnomalyModel:
+    """
+    Model-based anomaly scorer that retrains itself in the background.
+
+    Once enough logs have been analyzed, the feature columns of the recent
+    history are copied and an IsolationForest is fitted on a background
+    thread. The fitted forest is flattened into an IsolationForestModel,
+    written to `path` and swapped in with one assignment, so scoring always
+    uses a complete model and never waits for training, saving or loading.
+    A model saved by an earlier run is loaded in the background at startup.
+
+    Scoring needs only NumPy; training needs scikit-learn.
+    """
+
+    def __init__(self, path=None, threshold=0.6, weight=0.3, retrain_every=20000,
+                 min_samples=500, max_samples=20000, n_estimators=50, seed=0):
+        self.path = path
+        self.threshold = threshold # Model score above which a log counts as an outlier
+        self.weight = weight # Added to the anomaly score of outliers
+        self.retrain_every = retrain_every # Logs analyzed between trainings
+        self.min_samples = min_samples
+        self.max_samples = max_samples # Most recent history rows trained on
+        self.n_estimators = n_estimators
+        self.seed = seed
+        self.model = None
+        self.trainer = None
+        self.trained_total = None # history.total at the last training
+        self.train_count = 0
+        self.train_seconds = 0.0
+        self.training_enabled = True
+        if path and os.path.exists(path):
+            self._start(self._load)
+
+    def _start(self, target, *args):
+        self.trainer = threading.Thread(target=target, args=args, name='model-trainer', daemon=True)
+        self.trainer.start()
+
+    def busy(self):
+        return bool(self.trainer and self.trainer.is_alive())
+
+    def instrument(self, registry):
+        """Expose training counts and cost in a MetricsRegistry"""
+        registry.counter('model_trainings_total', 'Anomaly model trainings',
+                         func=lambda: self.train_count)
+        registry.gauge('model_train_seconds', 'Duration of the last anomaly model training',
+                       func=lambda: self.train_seconds)
+        registry.gauge('model_samples', 'Logs the live anomaly model was trained on',
+                       func=lambda: self.model.samples if self.model else 0)
+
+    def outliers(self, rows):
+        """
+        Flag model outliers among history rows
+
+        Returns:
+            numpy.ndarray: Boolean mask, all False until a model is available
+        """
+        model = self.model
+        if model is None:
+            return np.zeros(len(rows), dtype=bool)
+        return model.score(feature_matrix(rows)) > self.threshold
+
+    def observe(self, history):
+        """Start a background training if enough new logs have been analyzed; call after each batch"""
+        if not self.training_enabled or self.busy() or len(history) < self.min_samples:
+            return
+        if self.trained_total is not None and history.total - self.trained_total < self.retrain_every:
+            return
+        if self.trained_total is None and self.model is not None:
+            # Warm-started: wait a full interval before replacing the saved model
+            self.trained_total = history.total
+            return
+        self.trained_total = history.total
+        self._start(self._train, feature_matrix(history.tail(self.max_samples)))
+
+    def _train(self, matrix):
+        try:
+            from sklearn.ensemble import IsolationForest
+        except ImportError:
+            logger.warning("scikit-learn is not installed; anomaly model training disabled")
+            self.training_enabled = False
+            return
+
+        started = time.perf_counter()
+        forest = IsolationForest(
+            n_estimators=self.n_estimators,
+            max_samples=min(256, len(matrix)),
+            random_state=self.seed
+        ).fit(matrix)
+        model = IsolationForestModel.from_sklearn(forest, samples=len(matrix))
+        self.model = model
+        self.train_seconds = time.perf_counter() - started
+        self.train_count += 1
+        logger.info(f"Trained anomaly model on {len(matrix)} logs in {self.train_seconds:.2f}s")
+
+        if self.path:
+            try:
+                model.save(self.path)
+            except OSError as e:
+                logger.error(f"Failed to save anomaly model to {self.path}: {str(e)}")
+
+    def _load(self):
+        try:
+            model = IsolationForestModel.load(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring saved anomaly model {self.path}: {str(e)}")
+            return
+        # A model trained meanwhile is newer than the saved one
+        if self.model is None:
+            self.model = model
+            logger.info(f"Loaded anomaly model trained on {model.samples} logs from {self.path}")
@@ -0,0 +1,243 @@
+import os
+import json
+import mmap
+import time
+import pickle
+import struct
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger('log_analyzer.checkpoint')
+
+MAGIC = b'LACKPT01'
+VERSION = 2
+ALIGNMENT = 64
+
+
+class CheckpointError(Exception):
+    """A checkpoint file is missing, corrupt or from an incompatible version"""
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_checkpoint(path, arrays, state):
+    """
+    Atomically write arrays and a state blob to a checkpoint file
+
+    Layout: magic, a length-prefixed JSON header, then each array's raw bytes
+    at a 64-byte aligned offset, then the pickled state. The file is written
+    next to its destination, fsynced and renamed over it, so readers see
+    either the old checkpoint or the new one, never a partial file.
+
+    Args:
+        path (str): Destination path
+        arrays (dict): Name -> contiguous NumPy array
+        state (bytes): Pickled object state
+    """
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {
+            'offset': offset,
+            'dtype': np.lib.format.dtype_to_descr(array.dtype),
+            'shape': list(array.shape)
+        }
+        offset = _aligned(offset + array.nbytes)
+    header = {
+        'version': VERSION,
+        'created': time.time(),
+        'arrays': entries,
+        'state_offset': offset,
+        'state_length': len(state)
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 4 + len(header_bytes))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]['offset'])
+            f.write(np.ascontiguousarray(array).data)
+        f.seek(data_start + offset)
+        f.write(state)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Map a checkpoint file back in
+
+    Arrays are copy-on-write views of the file, so nothing is read until it
+    is touched and writing to them never changes the file.
+
+    Returns:
+        tuple: (dict of name -> array, state bytes, header dict)
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        raise CheckpointError(f"No checkpoint at {path}")
+
+    with f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except ValueError:
+            raise CheckpointError(f"Empty checkpoint at {path}")
+
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise CheckpointError(f"{path} is not a checkpoint")
+    (header_length,) = struct.unpack_from('<I', mapped, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    try:
+        header = json.loads(mapped[header_start:header_start + header_length])
+    except ValueError:
+        raise CheckpointError(f"Corrupt checkpoint header in {path}")
+    if header.get('version') != VERSION:
+        raise CheckpointError(f"Unsupported checkpoint version {header.get('version')}")
+
+    data_start = _aligned(header_start + header_length)
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.lib.format.descr_to_dtype(entry['dtype'])
+        count = int(np.prod(entry['shape'])) if entry['shape'] else 1
+        array = np.frombuffer(mapped, dtype=dtype, count=count,
+                              offset=data_start + entry['offset'])
+        arrays[name] = array.reshape(entry['shape'])
+
+    state_start = data_start + header['state_offset']
+    state = mapped[state_start:state_start + header['state_length']]
+    if len(state) != header['state_length']:
+        raise CheckpointError(f"Truncated checkpoint {path}")
+    return arrays, state, header
+
+
+class Checkpointer:
+    """
+    Periodic background snapshots of analyzer and fetch state
+
+    A snapshot is taken in two steps so the processing thread never waits
+    on a large copy or on the disk. First the history buffer is copied on a
+    background thread in chunks while analysis carries on. Then, at the next
+    batch boundary, the rows written in the meantime are copied again and
+    the rest of the state is pickled, which takes a few milliseconds.
+    Writing and fsyncing also happen in the background.
+    """
+
+    COPY_CHUNK = 1 << 16 # History rows copied per step
+
+    def __init__(self, path, interval=60):
+        self.path = path
+        self.interval = interval
+        self.last_capture = time.monotonic()
+        self.copier = None
+        self.copy = None # (buffer, marker) once a background copy is under way
+        self.writer = None
+        self.saved_count = 0
+        self.capture_seconds = 0.0 # Processing-thread pause of the last capture
+        self.write_seconds = 0.0
+
+    def _busy(self):
+        return bool(self.writer and self.writer.is_alive())
+
+    def due(self):
+        return time.monotonic() - self.last_capture >= self.interval and not self._busy()
+
+    def maybe_capture(self, log_analyzer, extra_state):
+        """
+        Advance the periodic checkpoint; call between batches
+
+        Args:
+            log_analyzer (LogAnalyzer): Analyzer to snapshot
+            extra_state (callable): Returns more picklable state, such as the fetch cursor
+        """
+        if self.copy is None:
+            if self.due():
+                self._start_copy(log_analyzer.history)
+            return
+        if self.copier.is_alive():
+            return
+        self._capture(log_analyzer, extra_state(), self.copy)
+        self.copy = None
+
+    def _start_copy(self, history):
+        data = history.data
+        buffer = np.empty_like(data)
+        self.copy = (buffer, history.copy_marker())
+
+        def copy_rows():
+            for start in range(0, len(data), self.COPY_CHUNK):
+                buffer[start:start + self.COPY_CHUNK] = data[start:start + self.COPY_CHUNK]
+
+        self.copier = threading.Thread(target=copy_rows, name='checkpoint-copy', daemon=True)
+        self.copier.start()
+
+    def capture(self, log_analyzer, extra_state=None, wait=False):
+        """
+        Snapshot state right now, copying the history on this thread
+
+        Args:
+            log_analyzer (LogAnalyzer): Analyzer to snapshot
+            extra_state (dict): More picklable state, such as the fetch cursor
+            wait (bool): Block until the file is written (used at shutdown)
+        """
+        if self.copier and self.copier.is_alive():
+            self.copier.join()
+        self.copy = None
+        if self._busy():
+            self.writer.join()
+        self._capture(log_analyzer, extra_state or {}, None)
+        if wait:
+            self.writer.join()
+
+    def _capture(self, log_analyzer, extra_state, copy):
+        started = time.perf_counter()
+        arrays, state = log_analyzer.snapshot(copy)
+        state['extra'] = extra_state
+        blob = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        self.capture_seconds = time.perf_counter() - started
+        self.last_capture = time.monotonic()
+
+        self.writer = threading.Thread(target=self._write, args=(arrays, blob),
+                                       name='checkpoint-writer', daemon=True)
+        self.writer.start()
+
+    def _write(self, arrays, blob):
+        started = time.perf_counter()
+        try:
+            save_checkpoint(self.path, arrays, blob)
+        except OSError as e:
+            logger.error(f"Failed to write checkpoint {self.path}: {str(e)}")
+            return
+        self.write_seconds = time.perf_counter() - started
+        self.saved_count += 1
+        logger.debug(f"Checkpoint written in {self.write_seconds * 1000:.1f} ms "
+                     f"(capture {self.capture_seconds * 1000:.1f} ms)")
+
+    def restore(self, log_analyzer):
+        """
+        Load the last checkpoint into an analyzer
+
+        Returns:
+            dict: The extra state saved with it, or None if there was no usable checkpoint
+        """
+        try:
+            arrays, blob, _ = load_checkpoint(self.path)
+            state = pickle.loads(blob)
+            log_analyzer.restore(arrays, state)
+        except CheckpointError as e:
+            logger.info(f"Starting cold: {str(e)}")
+            return None
+        except (pickle.UnpicklingError, KeyError, TypeError, ValueError, EOFError, AttributeError) as e:
+            logger.warning(f"Ignoring unusable checkpoint {self.path}: {str(e)}")
+            return None
+        return state.get('extra', {})
@@ -0,0 +1,175 @@
+import re
+from collections import Counter
+
+DEFAULT_ERROR_PATTERNS = [
+    r'error', r'exception', r'fail', r'crash', r'critical',
+    r'undefined', r'null', r'segmentation fault', r'memory leak',
+    r'timeout', r'deadlock', r'race condition'
+]
+DEFAULT_NEGATIVE_WORDS = ['error', 'fail', 'crash', 'issue', 'bug', 'problem',
+                          'exception', 'warning', 'critical']
+DEFAULT_POSITIVE_WORDS = ['success', 'completed', 'resolved', 'fixed', 'working']
+
+# NLTK's English stop word list, bundled so tokenizing needs no corpus download
+ENGLISH_STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your yours
+yourself yourselves he him his himself she she's her hers herself it it's its
+itself they them their theirs themselves what which who whom this that that'll
+these those am is are was were be been being have has had having do does did
+doing a an the and but if or because as until while of at by for with about
+against between into through during before after above below to from up down
+in out on off over under again further then once here there when where why how
+all any both each few more most other some such no nor not only own same so
+than too very s t can will just don don't should should've now d ll m o re ve
+y ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn
+hasn't haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't
+shan shan't shouldn shouldn't wasn wasn't weren weren't won won't wouldn
+wouldn't
+""".split())
+
+# Treebank style tokens: "n't" and "'s" style clitics are split off, words may
+# contain inner hyphens, dots, slashes, backslashes, pipes and equals signs,
+# so "status=error", "a|error|b" and "path\error" stay one token as they do
+# with NLTK's word_tokenize, which the analyzer used before. Other punctuation
+# stands alone, which is not what NLTK does everywhere: ":" and "," between
+# word characters ("10:30:00", "1,000"), runs such as "--" and "..." and
+# joiners followed by more punctuation ("path=/api") are one token there and
+# split here, and NLTK keeps the period on words it takes for abbreviations.
+# Keywords, sentiment and token_count follow from the tokens, so bump
+# checkpoint.VERSION and retrain saved models when changing this.
+TOKEN_PATTERN = (
+    r"\w+(?=n't\b)|n't\b|'(?:s|re|ve|ll|d|m)\b"
+    r"|/?\w+(?:[-./=|\\]\w+)*"
+    r"|[^\w\s]"
+)
+
+# Words the Treebank tokenizer splits in two
+SPLIT_WORDS = {'cannot': ('can', 'not')}
+
+# Token classes
+STOP_WORD = 1
+NEGATIVE = 2
+POSITIVE = 4
+KEYWORD = 8
+NUMBER = 16
+SPECIAL = 32
+
+
+class FeatureMatcher:
+    """
+    Compiled matcher for severity, sentiment and keyword extraction.
+
+    Built once per LogAnalyzer: the error patterns are folded into a single
+    alternation, the message is tokenized with one regex scan, and every
+    token is classified with a single dict lookup instead of membership tests
+    against several word lists.
+    """
+
+    def __init__(self, error_patterns=None, negative_words=None, positive_words=None,
+                 stop_words=None, min_keyword_length=3, top_keywords=5, cache_size=100000):
+        self.error_patterns = list(error_patterns or DEFAULT_ERROR_PATTERNS)
+        self.negative_words = frozenset(negative_words or DEFAULT_NEGATIVE_WORDS)
+        self.positive_words = frozenset(positive_words or DEFAULT_POSITIVE_WORDS)
+        self.stop_words = frozenset(stop_words if stop_words is not None else ENGLISH_STOP_WORDS)
+        self.min_keyword_length = min_keyword_length
+        self.top_keywords = top_keywords
+        self.cache_size = cache_size
+
+        self.error_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.error_patterns), re.IGNORECASE
+        )
+        self.token_regex = re.compile(TOKEN_PATTERN)
+        self._token_classes = {}
+
+    def classify_token(self, token):
+        """Return the class bit set of a lowercased token"""
+        classes = self._token_classes.get(token)
+        if classes is not None:
+            return classes
+
+        classes = 0
+        if token in self.stop_words:
+            classes |= STOP_WORD
+        else:
+            if token in self.negative_words:
+                classes |= NEGATIVE
+            if token in self.positive_words:
+                classes |= POSITIVE
+            if token.isalpha() and len(token) >= self.min_keyword_length:
+                classes |= KEYWORD
+        if not token.isalnum():
+            classes |= SPECIAL
+        elif token.isdigit():
+            classes |= NUMBER
+
+        # Keep the cache bounded when messages carry many unique tokens
+        if len(self._token_classes) >= self.cache_size:
+            self._token_classes.clear()
+        self._token_classes[token] = classes
+        return classes
+
+    def tokenize(self, message):
+        """Split a lowercased message into tokens"""
+        tokens = self.token_regex.findall(message)
+        if any(word in message for word in SPLIT_WORDS):
+            split = []
+            for token in tokens:
+                split.extend(SPLIT_WORDS.get(token, (token,)))
+            tokens = split
+        return tokens
+
+    def is_error(self, message):
+        """Check a message against the error patterns"""
+        return self.error_regex.search(message) is not None
+
+    def extract(self, message):
+        """
+        Extract all features of a message
+
+        Args:
+            message (str): Raw log message
+
+        Returns:
+            dict: Severity, keyword, sentiment and size features
+        """
+        features = {'severity': 'error' if self.is_error(message) else 'info'}
+        features.update(self.extract_token_features(message.lower()))
+        features['message_length'] = len(message)
+        return features
+
+    def extract_token_features(self, message):
+        """Extract the token based features of a lowercased message"""
+        tokens = self.tokenize(message)
+
+        keywords = []
+        sentiment_score = 0
+        seen_classes = 0
+        token_classes = self._token_classes
+        for token in tokens:
+            classes = token_classes.get(token)
+            if classes is None:
+                classes = self.classify_token(token)
+            seen_classes |= classes
+            if classes & KEYWORD:
+                keywords.append(token)
+            if classes & NEGATIVE:
+                sentiment_score -= 1
+            if classes & POSITIVE:
+                sentiment_score += 1
+
+        keyword_counts = Counter(keywords)
+
+        sentiment = 'neutral'
+        if sentiment_score < 0:
+            sentiment = 'negative'
+        elif sentiment_score > 0:
+            sentiment = 'positive'
+
+        return {
+            'keyword_counts': keyword_counts,
+            'keywords': [item[0] for item in keyword_counts.most_common(self.top_keywords)],
+            'sentiment': sentiment,
+            'token_count': len(tokens),
+            'has_numbers': bool(seen_classes & NUMBER),
+            'has_special_chars': bool(seen_classes & SPECIAL)
+        }
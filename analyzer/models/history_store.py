@@ -0,0 +1,252 @@
+import math
+import time
+from datetime import datetime
+import numpy as np
+
+TOP_KEYWORDS = 5
+
+SEVERITY_CODES = {'info': 0, 'error': 1}
+SENTIMENT_CODES = {'negative': -1, 'neutral': 0, 'positive': 1}
+
+# One fixed-size row per analyzed log
+HISTORY_DTYPE = np.dtype([
+    ('timestamp', 'f8'),                        # Log time, epoch seconds (NaN if unparseable)
+    ('message_length', 'i4'),
+    ('token_count', 'i4'),
+    ('severity', 'i1'),                         # SEVERITY_CODES
+    ('sentiment', 'i1'),                        # SENTIMENT_CODES
+    ('detected', '?'),
+    ('score', 'f4'),
+    ('source_id', 'i4'),                        # Interned source, -1 if missing
+    ('template_id', 'i4'),                      # TemplateMiner id, -1 if unknown
+    ('keyword_ids', 'i4', (TOP_KEYWORDS,)),     # Interned top keywords, -1 padded
+    ('keyword_hits', 'i2', (TOP_KEYWORDS,))
+])
+
+
+def parse_timestamp(value):
+    """Convert a log timestamp to epoch seconds"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return math.nan
+
+
+class Interner:
+    """Maps strings to dense integer ids and back"""
+
+    def __init__(self, max_size=1 << 20):
+        self.max_size = max_size
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        """Id of value, -1 for missing values or once the table is full"""
+        if value is None:
+            return -1
+        value_id = self.ids.get(value)
+        if value_id is None:
+            if len(self.values) >= self.max_size:
+                return -1
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def restore(self, values):
+        """Reload the table from a saved list of values"""
+        self.values = list(values)
+        self.ids = {value: value_id for value_id, value in enumerate(self.values)}
+
+    def lookup(self, value_id):
+        return self.values[value_id] if 0 <= value_id < len(self.values) else None
+
+    def __len__(self):
+        return len(self.values)
+
+
+class HistoryStore:
+    """
+    Fixed-capacity ring buffer of analyzed logs.
+
+    Rows live in one preallocated NumPy structured array (HISTORY_DTYPE), so
+    appending is O(1), nothing is copied when the buffer wraps, and a million
+    entries cost a few dozen megabytes instead of a few million Python
+    objects. Keywords and sources are stored as interned ids.
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self.keywords = Interner()
+        self.sources = Interner()
+        self.head = 0 # Next slot to write
+        self.size = 0
+        self.total = 0 # Rows ever appended
+
+    def __len__(self):
+        return self.size
+
+    def make_record(self, timestamp, features, anomalies, source=None):
+        """Build one row from a log's features and anomaly result"""
+        ids, hits = self.encode_keywords(features)
+        return (
+            parse_timestamp(timestamp),
+            features['message_length'],
+            features['token_count'],
+            SEVERITY_CODES.get(features['severity'], 0),
+            SENTIMENT_CODES.get(features['sentiment'], 0),
+            anomalies['detected'],
+            anomalies['score'],
+            self.sources.intern(source),
+            features.get('template_id', -1),
+            ids,
+            hits
+        )
+
+    def encode_keywords(self, features):
+        """Interned ids and counts of a log's top keywords, -1/0 padded"""
+        ids = [-1] * TOP_KEYWORDS
+        hits = [0] * TOP_KEYWORDS
+        counts = features['keyword_counts']
+        for i, keyword in enumerate(features['keywords'][:TOP_KEYWORDS]):
+            ids[i] = self.keywords.intern(keyword)
+            hits[i] = min(counts[keyword], 32767)
+        return ids, hits
+
+    def append(self, record):
+        """Add one row, overwriting the oldest once full"""
+        self.data[self.head] = record
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, records):
+        """Add many rows with at most two slice copies"""
+        count = len(records)
+        if count >= self.capacity:
+            records = records[-self.capacity:]
+            self.data[:] = records
+            self.head = 0
+            self.size = self.capacity
+            self.total += count
+            return
+
+        first = min(count, self.capacity - self.head)
+        self.data[self.head:self.head + first] = records[:first]
+        self.data[:count - first] = records[first:]
+        self.head = (self.head + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        self.total += count
+
+    def views(self, count=None):
+        """
+        Zero-copy views of the newest rows, oldest first
+
+        Returns:
+            list: One view, or two when the window wraps around the buffer
+        """
+        count = self.size if count is None else min(count, self.size)
+        if count == 0:
+            return []
+        start = (self.head - count) % self.capacity
+        if start + count <= self.capacity:
+            return [self.data[start:start + count]]
+        return [self.data[start:], self.data[:self.head]]
+
+    def tail(self, count=None):
+        """Newest rows as one array; a view unless the window wraps"""
+        views = self.views(count)
+        if not views:
+            return self.data[:0]
+        if len(views) == 1:
+            return views[0]
+        return np.concatenate(views)
+
+    def column(self, name, count=None):
+        """One field of the newest rows, oldest first"""
+        return self.tail(count)[name]
+
+    def copy_marker(self):
+        """Position to pass to snapshot() for a buffer copied from now on"""
+        return self.head, self.total
+
+    def snapshot(self, copy=None):
+        """
+        Copy of the buffer and the state needed to restore it
+
+        The buffer is copied as laid out rather than reordered oldest first.
+        `copy` may be a (buffer, marker) pair where buffer was filled from
+        self.data, possibly on another thread, after copy_marker() returned
+        marker; only the rows written since are then copied again. Rows are
+        only ever written at the head, so those are the only rows a
+        concurrent copy can have caught half-updated.
+
+        Returns:
+            tuple: (buffer array, dict of ring position, interner tables and counters)
+        """
+        if copy is None:
+            buffer = self.data.copy()
+        else:
+            buffer, (head, total) = copy
+            changed = self.total - total
+            if changed >= self.capacity or len(buffer) != self.capacity:
+                buffer = self.data.copy()
+            else:
+                first = min(changed, self.capacity - head)
+                buffer[head:head + first] = self.data[head:head + first]
+                buffer[:changed - first] = self.data[:changed - first]
+        return buffer, {
+            'head': self.head,
+            'size': self.size,
+            'total': self.total,
+            'keywords': list(self.keywords.values),
+            'sources': list(self.sources.values)
+        }
+
+    def restore(self, data, state):
+        """
+        Load a buffer saved by snapshot()
+
+        A buffer of the same capacity is used in place, so a memory-mapped
+        checkpoint is not copied at startup. The interners are replaced,
+        not refilled, so a shallow copy can be restored without touching
+        the original.
+        """
+        if data.dtype != self.data.dtype:
+            raise ValueError("Saved history rows have a different layout")
+        keywords, sources = Interner(self.keywords.max_size), Interner(self.sources.max_size)
+        keywords.restore(state['keywords'])
+        sources.restore(state['sources'])
+        total = state['total']
+        if len(data) == self.capacity and data.flags.writeable:
+            self.data = data
+            self.head = state['head']
+            self.size = state['size']
+        else:
+            # Different capacity: keep the newest rows, oldest first
+            size, head = state['size'], state['head']
+            start = (head - size) % len(data)
+            rows = np.concatenate([data[start:], data[:start]])[len(data) - size:] \
+                if size == len(data) else data[start:start + size]
+            count = min(size, self.capacity)
+            self.data = np.zeros(self.capacity, dtype=HISTORY_DTYPE)
+            self.data[:count] = rows[size - count:]
+            self.head = count % self.capacity
+            self.size = count
+        self.keywords, self.sources = keywords, sources
+        self.total = total
+
+    def keyword_totals(self, rows):
+        """Total hits per keyword over some rows, in first-seen order"""
+        totals = {}
+        for ids, hits in zip(rows['keyword_ids'].tolist(), rows['keyword_hits'].tolist()):
+            for keyword_id, count in zip(ids, hits):
+                if keyword_id >= 0:
+                    totals[keyword_id] = totals.get(keyword_id, 0) + count
+        return {self.keywords.lookup(keyword_id): count for keyword_id, count in totals.items()}
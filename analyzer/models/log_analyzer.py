@@ -1,212 +1,569 @@
 import pandas as pandas
 import numpy as np
 from datetime import datetime, timedelta
-from collections import Counter
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 import re
 import json
 import os
+import copy
+import gc
+import time
+from models.feature_matcher import (
+    FeatureMatcher, DEFAULT_ERROR_PATTERNS, DEFAULT_NEGATIVE_WORDS, DEFAULT_POSITIVE_WORDS
+)
+from models.streaming_stats import BaselineTracker
+from models.template_miner import TemplateMiner
+from models.history_store import HistoryStore, SENTIMENT_CODES, parse_timestamp
+from models.pattern_engine import PatternEngine
+from models.anomaly_model import AnomalyModel
+from native.log_processor import NativeLogProcessor, PythonLogProcessor, log_level_code, empty_stats
+
+
+def is_valid_log(log_data):
+    """Whether a log entry can be analyzed: a dict with a string 'message'"""
+    return isinstance(log_data, dict) and isinstance(log_data.get('message'), str)
+
 
-# Download NLTK resources if not already present
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-    
 class LogAnalyzer:
-    def __init__(self, threshold=0.75):
+    def __init__(self, threshold=0.75, error_patterns=None, negative_words=None,
+                 positive_words=None, stop_words=None, baseline_windows=None,
+                 baseline_min_samples=30, max_sources=1024, history_size=1000,
+                 max_templates=5000, template_cache_size=10000, anomaly_model=False,
+                 model_path=None, native_library=None):
         self.threshold = threshold
-        self.stop_words = set(stopwords.words('english'))
-        self.error_patterns = [
-            r'error', r'exception', r'fail', r'crash', r'critical',
-            r'undefined', r'null', r'segmentation fault', r'memory leak',
-            r'timeout', r'deadlock', r'race condition'
-        ]
-        self.history = [] # To store recent log patterns
-        self.baseline = {} # For anomaly detection
-    
+        self.error_patterns = list(error_patterns or DEFAULT_ERROR_PATTERNS)
+        self.negative_words = list(negative_words or DEFAULT_NEGATIVE_WORDS)
+        self.positive_words = list(positive_words or DEFAULT_POSITIVE_WORDS)
+        # Compiled once, used for every log
+        self.matcher = FeatureMatcher(
+            error_patterns=self.error_patterns,
+            negative_words=self.negative_words,
+            positive_words=self.positive_words,
+            stop_words=stop_words
+        )
+        # Message shapes, with their token features cached per shape
+        self.templates = TemplateMiner(
+            self.matcher.extract_token_features,
+            max_templates=max_templates,
+            cache_size=template_cache_size
+        )
+        # Batch level counts, source tracking and error prefiltering, in C if native_library loads
+        self.batch_processor = (NativeLogProcessor.load(native_library) if native_library
+                                else PythonLogProcessor())
+        # Plain-word error patterns can be searched as substrings instead of a regex
+        literal = all(re.fullmatch(r'[\w\s-]+', pattern) for pattern in self.error_patterns)
+        self.error_literals = self.error_patterns if literal else None
+        self.level_counts = {'error': 0, 'warning': 0, 'info': 0} # Logs by declared level
+        self.batch_stats = empty_stats() # Counts of the last batch
+        self.history = HistoryStore(capacity=history_size) # To store recent log patterns
+        # Rolling windows and heavy-hitter keywords, on log time
+        self.patterns = PatternEngine()
+        # Streaming per-source and per-level baselines for anomaly detection
+        self.baseline = BaselineTracker(
+            windows=baseline_windows,
+            min_samples=baseline_min_samples,
+            max_sources=max_sources
+        )
+        # Optional IsolationForest scorer, retrained in the background
+        self.model = AnomalyModel(path=model_path) if anomaly_model else None
+        self.score_window = 'slow' # Window logs are scored against
+        self.rate_window = 'fast' # Window used to spot error rate spikes
+        self.error_rate_spike = 0.3
+        self.processed_count = 0
+        self.stage_timings = None # StageTimings once instrumented
+        self.timing_sample_mask = 15 # process_log times one log in 16 to keep overhead low
+
+    def snapshot(self, history_copy=None):
+        """
+        Capture the learned state for a checkpoint
+
+        Args:
+            history_copy (tuple): Optional pre-copied history buffer, see HistoryStore.snapshot
+
+        Returns:
+            tuple: (dict of NumPy arrays, dict of picklable state)
+        """
+        rows, history_state = self.history.snapshot(history_copy)
+        state = {
+            'processed_count': self.processed_count,
+            'history': history_state,
+            'baseline': self.baseline.snapshot(),
+            'templates': self.templates.snapshot(),
+            'patterns': self.patterns
+        }
+        # Live objects, not copies: pickle them before analyzing more logs
+        return {'history': rows}, state
+
+    def restore(self, arrays, state):
+        """
+        Load state captured by snapshot()
+
+        Every part is restored into a copy first and swapped in only once
+        all of them loaded, so a bad checkpoint leaves the analyzer as it was.
+        """
+        history, baseline = copy.copy(self.history), copy.copy(self.baseline)
+        templates = copy.copy(self.templates)
+        history.restore(arrays['history'], state['history'])
+        baseline.restore(state['baseline'])
+        templates.restore(state['templates'])
+        patterns, processed_count = state['patterns'], int(state['processed_count'])
+        if not isinstance(patterns, PatternEngine):
+            raise ValueError("Saved pattern state is not a PatternEngine")
+        self.history, self.baseline, self.templates = history, baseline, templates
+        self.patterns, self.processed_count = patterns, processed_count
+
+    def instrument(self, registry):
+        """Record per-stage processing time in a MetricsRegistry"""
+        from monitoring.metrics import StageTimings
+        self.stage_timings = StageTimings(
+            registry, 'stage_seconds',
+            'Time spent per analysis stage (per batch, or per sampled log for process_log)',
+            ('extract_features', 'detect_anomalies', 'update_baseline', 'detect_patterns')
+        )
+        registry.counter('analyzed_logs_total', 'Logs analyzed', func=lambda: self.processed_count)
+        registry.gauge('templates', 'Log templates known', func=lambda: len(self.templates.templates))
+        for level in self.level_counts:
+            registry.counter('logs_by_level_total', 'Analyzed logs by declared level', {'level': level},
+                             func=lambda level=level: self.level_counts[level])
+        registry.gauge('batch_unique_sources', 'Distinct sources in the last batch',
+                       func=lambda: self.batch_stats['unique_sources'])
+        registry.gauge('batch_avg_message_length', 'Mean message length in the last batch',
+                       func=lambda: self.batch_stats['avg_message_length'])
+        registry.gauge('native_processor', '1 if batch counting and search run in liblogprocessor',
+                       func=lambda: int(self.batch_processor.native))
+        if self.model:
+            self.model.instrument(registry)
+
     def process_log(self, log_data):
         """
         Process a single log entry and detect anomalies
-        
+
         Args:
             log_data (dict): Log entry with at minium 'message and 'timestamp'
-        
+
         Returns:
             dict: Analysis results
         """
-        if not isinstance(log_data, dict) or 'message' not in log_data:
+        if not is_valid_log(log_data):
             return {'error': 'Invalid log format'}
-        
+
+        timings = self.stage_timings
+        if timings and self.processed_count & self.timing_sample_mask:
+            timings = None
+        started = time.perf_counter() if timings else 0.0
+
         # Extract features from the log
         features = self._extract_features(log_data)
-        
-        # Detect anomalies
+        if timings:
+            extracted = time.perf_counter()
+            timings.record('extract_features', extracted - started)
+
+        # Detect anomalies (baseline scoring is timed as part of this stage here)
         anomalies = self._detect_anomalies(features, log_data)
-        
+        if timings:
+            detected = time.perf_counter()
+            timings.record('detect_anomalies', detected - extracted)
+
         # Add to history for pattern analysis
-        self.history.append({
-            'timestamp': log_data.get('timestamp', datetime.now().isoformat()),
-            'features': features,
-            'anomalies': anomalies
-        })
-        
-        # Trim history if it gets too large
-        if len(self.history) > 1000:
-            self.history = self.history[-1000:]
-        
-        # Update baseline periodically
-        if len(self.history) % 100 == 0:
-            self._update_baseline()
-        
+        record = self.history.make_record(
+            log_data.get('timestamp'), features, anomalies, log_data.get('source')
+        )
+        self.history.append(record)
+        self.processed_count += 1
+        self._count_level(log_level_code(log_data))
+        if self.model:
+            self.model.observe(self.history)
+        patterns = self._detect_patterns(record[0], log_data, features)
+        if timings:
+            timings.record('detect_patterns', time.perf_counter() - detected)
+
         return {
             'analysis_timestamp': datetime.now().isoformat(),
             'severity': features['severity'],
             'anomaly_score': anomalies['score'],
             'anomaly_detected': anomalies['detected'],
+            'reasons': anomalies['reasons'],
             'keywords': features['keywords'],
             'sentiment': features['sentiment'],
-            'patterns': self._detect_patterns()
+            'template_id': features['template_id'],
+            'patterns': patterns
         }
-        
-        def _extract_features(self, log_data):
-            """Extract features from a log entry"""
-            message = log_data.get('message', '')
-            
-            # Tokenize message
-            tokens = word_tokenize(message.lower())
-            
-            # Remove stop words
-            filtered_tokens = [w for w in tokens if w not in self.stop_words]
-            
-            # Extract keywords (terms that aren't stop words)
-            keywords = [word for word in filtered_tokens
-                        if word.isalpha() and len(word) > 2]
-            
-            # Count keyword
-            keyword_counts = Counter(keywords)
-            top_keywords = [item[0] for item in keyword_counts.most_common(5)]
-            
-            # Determine severity based on error patterns
-            severity = 'info'
-            for pattern in self.error_patterns:
-                if re.search(pattern, message, re.IGNORECASE):
-                    severity = 'error'
-                    break
-            
-            # Simple sentiment analysis based on keyword presence
-            negative_words = ['error', 'fail', 'crash', 'issue', 'bug', 'problem',
-                              'exception', 'warning', 'critical']
-            positive_words = ['success', 'completed', 'resolved', 'fixed', 'working']
-            
-            sentiment = 'neutral'
-            neg_count = sum(1 for w in filtered_tokens if w in negative_words)
-            pos_count = sum(1 for w in filtered_tokens if w in positive_words)
-            
-            if neg_count > pos_count:
-                sentiment = 'negative'
-            elif pos_count > neg_count:
-                sentiment = 'positive'
-            
-            return {
-                'severity': severity,
-                'keyword_counts': keyword_counts,
-                'keywords': top_keywords,
-                'sentiment': sentiment,
-                'message_length': len(message),
-                'token_count': len(tokens),
-                'has_numbers': any(token.isdgit() for token in tokens),
-                'has_special_chars': any(not token.isalnum() for token in tokens)
+
+    def process_batch(self, logs):
+        """
+        Process a batch of log entries and detect anomalies
+
+        Features are gathered into columnar NumPy arrays and scored for the
+        whole batch at once. Results match calling process_log on each entry
+        in order, up to float rounding in the baseline statistics, and share
+        one analysis timestamp.
+
+        Args:
+            logs (list): Log entries, each with at minimum 'message'
+
+        Returns:
+            list: Analysis results in input order, an error result for each invalid entry
+        """
+        results = [{'error': 'Invalid log format'}] * len(logs)
+        valid = [i for i, log in enumerate(logs) if is_valid_log(log)]
+        if not valid:
+            return results
+
+        # A batch allocates a few containers per log, none of them cyclic, so the
+        # cyclic collector is paused instead of rescanning them as they pile up
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            self._process_valid_batch([logs[i] for i in valid], valid, results)
+        finally:
+            if collecting:
+                gc.enable()
+        return results
+
+    def _process_valid_batch(self, batch, valid, results):
+        """Analyze the valid logs of a batch, filling in their results at the given positions"""
+        clock = time.perf_counter
+        stage_started = clock()
+
+        features, columns = self._extract_batch_features(batch)
+        count = len(batch)
+        stage_times = [clock()]
+
+        # Score the whole batch, then add the baseline scores; the baselines are
+        # replayed so each log is still compared with one that includes the logs before it
+        records = self._batch_records(batch, features, columns)
+        raw_scores = self._score_batch(columns)
+        outliers = self.model.outliers(records) if self.model else None
+        if outliers is not None:
+            raw_scores += np.where(outliers, self.model.weight, 0.0)
+        stage_times.append(clock())
+        sources = [log.get('source') for log in batch]
+        levels = [self._log_level(log) for log in batch]
+        baseline_scores, baseline_reasons = self._score_baseline_batch(columns, sources, levels)
+        stage_times.append(clock())
+        raw_scores += baseline_scores
+        scores = np.minimum(raw_scores, 1.0)
+        detected = raw_scores >= self.threshold
+
+        # Add the batch to history in one go
+        records['score'] = scores
+        records['detected'] = detected
+        patterns = self.patterns.observe_batch(
+            records['timestamp'].tolist(),
+            sources,
+            [level or feature['severity'] for level, feature in zip(levels, features)],
+            columns['is_error'].tolist(),
+            columns['template_id'].tolist(),
+            [[(keyword, feature['keyword_counts'][keyword]) for keyword in feature['keywords']]
+             for feature in features]
+        )
+        self.history.extend(records)
+        self.processed_count += count
+        if self.model:
+            self.model.observe(self.history)
+        stage_times.append(clock())
+
+        if self.stage_timings:
+            previous = stage_started
+            for stage, finished in zip(
+                    ('extract_features', 'detect_anomalies', 'update_baseline', 'detect_patterns'),
+                    stage_times):
+                self.stage_timings.record(stage, finished - previous)
+                previous = finished
+
+        analyzed_at = datetime.now().isoformat()
+        reasons = self._batch_reasons(columns, outliers, baseline_reasons)
+        for index, feature, score, flagged, log_reasons, pattern in zip(
+                valid, features, scores.tolist(), detected.tolist(), reasons, patterns):
+            results[index] = {
+                'analysis_timestamp': analyzed_at,
+                'severity': feature['severity'],
+                'anomaly_score': score,
+                'anomaly_detected': flagged,
+                'reasons': log_reasons,
+                'keywords': feature['keywords'],
+                'sentiment': feature['sentiment'],
+                'template_id': feature['template_id'],
+                'patterns': pattern
             }
-            
-            def _detect_anomalies(self, features, log_data):
-                """Detect anomalies in the log entry"""
-                anomaly_score = 0.0
-                reasons = []
-                
-                # Check for known error patterns
-                if features['severity'] == 'error':
-                    anomaly_score += 0.5
-                    reasons.APPEND('Error pattern detected')
-                    
-                # Check message length (unusually long messages might indicate problems)
-                if features['message_length'] > 500:
-                    anomaly_score += 0.2
-                    reasons.append('Unusual message length')
-                
-                # Check for unusual frequency of keywords
-                if len(features['keywords']) == 1 and list(features['keyword_counts'].values())[0] > 10:
-                    anomaly_score += 0.2
-                    reasons.append('Unusual keyword repetition')
-                    
-                # Compare with baseline if available
-                if 'message_length' in self.baseline:
-                    # Check if message length deviates significantly from baseline
-                    mean_length = self.baseline['message_length']['mean']
-                    std_length = self.baseline['message_length']['std']
-                    
-                    if std_length > 0:
-                        z_score = abs(features['message_length'] - mean_length) / std_length
-                        if z_score > 3:
-                            anomaly_score += 3
-                            reasons.append('Message length statistical anomaly')
-                return {
-                    'score': min(anomaly_score, 1.0),
-                    'detected': anomaly_score >= self.threshold,
-                    'reasons': reasons
-                }
-                
-            def _update_baseline(self):
-                """Updat baseline statistics for anomaly detection"""
-                if not self.history:
-                    return
-                
-                # Extract features for statistical analysis
-                message_length = [h['features']['message_length'] for h in self.history]
-                token_counts = [h['features']['token_count'] for h in self.history]
-                
-                # Update baseline
-                self.baseline = {
-                    'message_length': {
-                        'mean': np.mean(message_length),
-                        'std': np.std(message_length),
-                        'min': min(message_length),
-                        'max': max(message_length)
-                    },
-                    'token_count': {
-                        'mean': np.mean(token_counts),
-                        'std': np.std(token_counts),
-                        'min': min(token_counts),
-                        'max': max(token_count)
-                    }
-                }
-                
-            def _detect_patterns(self):
-                """Detect pattern in recent logs"""
-                if len(self.history) < 10:
-                    return {'detected': False}
-                
-                # Look at the last 10 logs
-                recent = self.history[-10:]
-                
-                #check for repeated erorrs
-                error_count = sum(1 for h in recent if h['features']['severity'] == 'error')
-                if error_count >= 5: # 50% or more are errors
-                    return {
-                        'detected': True,
-                        'type': 'error_burst',
-                        'description': f'Keyword "{most_common[0][0]}" appears {most_common[0][1]} times in recent logs'
-                    }
-                    
-                    return {'detected': False}
-                
-                
-                
-                
\ No newline at end of file
+
+    def _extract_batch_features(self, logs):
+        """
+        Extract features for a batch of log entries
+
+        Returns:
+            tuple: Per-log feature dicts and a dict of columnar NumPy arrays
+        """
+        message_list = [log['message'] for log in logs]
+        messages = pandas.Series(message_list, dtype=object)
+        message_length = messages.str.len().to_numpy(dtype=np.int64)
+        levels = [log_level_code(log) for log in logs]
+        sources = [log.get('source') for log in logs]
+
+        # Level and source counts, plus the error check as a substring search when possible
+        if self.error_literals:
+            stats, is_error = self.batch_processor.scan(message_list, sources, levels, self.error_literals)
+        else:
+            stats, _ = self.batch_processor.scan(message_list, sources, levels, [])
+            is_error = messages.str.contains(self.matcher.error_regex, regex=True).to_numpy(dtype=bool)
+        self.batch_stats = stats
+        self.level_counts['error'] += stats['error_count']
+        self.level_counts['warning'] += stats['warning_count']
+        self.level_counts['info'] += stats['info_count']
+
+        # Repeated message shapes come straight from the template feature cache
+        lowered = messages.str.lower().tolist()
+        features = []
+        for i, (message, masked) in enumerate(zip(lowered, self.templates.mask_many(lowered))):
+            feature = {'severity': 'error' if is_error[i] else 'info'}
+            feature.update(self._template_features(message, masked))
+            feature['message_length'] = int(message_length[i])
+            features.append(feature)
+
+        # Logs of one cached shape share their keyword list, so encode each list once
+        encoded = {}
+        for feature in features:
+            if id(feature['keywords']) not in encoded:
+                encoded[id(feature['keywords'])] = self.history.encode_keywords(feature)
+        keyword_ids, keyword_hits = zip(*[encoded[id(feature['keywords'])] for feature in features])
+
+        columns = {
+            'keyword_ids': np.array(keyword_ids, dtype=np.int32),
+            'keyword_hits': np.array(keyword_hits, dtype=np.int16),
+            'message_length': message_length,
+            'token_count': np.array([f['token_count'] for f in features], dtype=np.int64),
+            'is_error': is_error,
+            'keyword_count': np.array([len(f['keywords']) for f in features], dtype=np.int64),
+            'first_keyword_hits': np.array(
+                [next(iter(f['keyword_counts'].values()), 0) for f in features],
+                dtype=np.int64
+            ),
+            'template_id': np.array([f['template_id'] for f in features], dtype=np.int64),
+            'template_new': np.array([f['template_new'] for f in features], dtype=bool),
+            'template_rare': np.array([f['template_rare'] for f in features], dtype=bool)
+        }
+        return features, columns
+
+    def _score_batch(self, columns):
+        """Compute the raw, baseline independent anomaly scores of a batch"""
+        message_length = columns['message_length']
+
+        scores = np.zeros(len(message_length))
+        scores += np.where(columns['is_error'], 0.5, 0.0)
+        scores += np.where(message_length > 500, 0.2, 0.0)
+        scores += np.where(self._keyword_repetition(columns, slice(None)), 0.2, 0.0)
+        scores += np.where(columns['template_new'], 0.3, 0.0)
+        scores += np.where(columns['template_rare'], 0.1, 0.0)
+        return scores
+
+    def _keyword_repetition(self, columns, index):
+        """Flag logs dominated by a single, heavily repeated keyword"""
+        return (columns['keyword_count'][index] == 1) & (columns['first_keyword_hits'][index] > 10)
+
+    def _batch_reasons(self, columns, outliers, baseline_reasons):
+        """Build the reasons list of every log of a scored batch"""
+        flags = [
+            (columns['is_error'], 'Error pattern detected'),
+            (columns['message_length'] > 500, 'Unusual message length'),
+            (self._keyword_repetition(columns, slice(None)), 'Unusual keyword repetition'),
+            (columns['template_new'], 'New log template'),
+            (columns['template_rare'], 'Rare log template')
+        ]
+        if outliers is not None:
+            flags.append((outliers, 'Model outlier'))
+        reasons = [[] for _ in baseline_reasons]
+        for flag, reason in flags:
+            for i in np.flatnonzero(flag).tolist():
+                reasons[i].append(reason)
+        for log_reasons, baseline in zip(reasons, baseline_reasons):
+            log_reasons += baseline
+        return reasons
+
+    def _batch_records(self, batch, features, columns):
+        """Build the history rows of a batch; score and detected are filled in once scored"""
+        records = np.zeros(len(batch), dtype=self.history.data.dtype)
+        records['timestamp'] = [parse_timestamp(log.get('timestamp')) for log in batch]
+        records['message_length'] = columns['message_length']
+        records['token_count'] = columns['token_count']
+        records['severity'] = columns['is_error']
+        records['sentiment'] = [SENTIMENT_CODES.get(f['sentiment'], 0) for f in features]
+        records['source_id'] = [self.history.sources.intern(log.get('source')) for log in batch]
+        records['template_id'] = columns['template_id']
+        records['keyword_ids'] = columns['keyword_ids']
+        records['keyword_hits'] = columns['keyword_hits']
+        return records
+
+    def _extract_features(self, log_data):
+        """Extract features from a log entry"""
+        message = log_data.get('message', '')
+
+        features = {'severity': 'error' if self.matcher.is_error(message) else 'info'}
+        features.update(self._template_features(message.lower()))
+        features['message_length'] = len(message)
+        return features
+
+    def _template_features(self, message, masked=None):
+        """Token and template features of a lowercased message"""
+        template, token_features, is_new = self.templates.match(message, masked)
+
+        features = dict(token_features)
+        features['template_id'] = template.template_id
+        features['template_new'] = is_new and self.templates.warmed_up
+        features['template_rare'] = not is_new and self.templates.is_rare(template)
+        return features
+
+    def _detect_anomalies(self, features, log_data):
+        """Detect anomalies in the log entry"""
+        anomaly_score = 0.0
+        reasons = []
+
+        # Check for known error patterns
+        if features['severity'] == 'error':
+            anomaly_score += 0.5
+            reasons.append('Error pattern detected')
+
+        # Check message length (unusually long messages might indicate problems)
+        if features['message_length'] > 500:
+            anomaly_score += 0.2
+            reasons.append('Unusual message length')
+
+        # Check for unusual frequency of keywords
+        if len(features['keywords']) == 1 and list(features['keyword_counts'].values())[0] > 10:
+            anomaly_score += 0.2
+            reasons.append('Unusual keyword repetition')
+
+        # Message shapes that have never or hardly ever been seen
+        if features['template_new']:
+            anomaly_score += 0.3
+            reasons.append('New log template')
+        if features['template_rare']:
+            anomaly_score += 0.1
+            reasons.append('Rare log template')
+
+        # Unusual for the trained model, if one is enabled
+        if self.model and self.model.model:
+            row = self.history.make_record(
+                log_data.get('timestamp'), features, {'detected': False, 'score': 0.0},
+                log_data.get('source')
+            )
+            if self.model.outliers(np.array([row], dtype=self.history.data.dtype))[0]:
+                anomaly_score += self.model.weight
+                reasons.append('Model outlier')
+
+        # Compare with the baseline of this log's source or level
+        baseline_score, baseline_reasons = self._score_baseline(
+            features['message_length'], features['token_count'], features['severity'] == 'error',
+            log_data.get('source'), self._log_level(log_data)
+        )
+        anomaly_score += baseline_score
+        reasons.extend(baseline_reasons)
+        return {
+            'score': min(anomaly_score, 1.0),
+            'detected': anomaly_score >= self.threshold,
+            'reasons': reasons
+        }
+
+    def _count_level(self, code):
+        if code == 0:
+            self.level_counts['error'] += 1
+        elif code == 1:
+            self.level_counts['warning'] += 1
+        elif code == 2:
+            self.level_counts['info'] += 1
+
+    def _log_level(self, log_data):
+        """Declared level of a log entry, if any"""
+        return log_data.get('level', log_data.get('type'))
+
+    def _score_baseline(self, message_length, token_count, is_error, source, level):
+        """
+        Score a log against its baseline, then add it to the baselines
+
+        Returns:
+            tuple: Score to add and the reasons for it
+        """
+        score = 0.0
+        reasons = []
+
+        stats = self.baseline.select(source, level)
+        if stats is not None:
+            # Check if message length deviates significantly from baseline
+            z_score = stats.get(self.score_window, 'message_length').z_score(message_length)
+            if z_score is not None and z_score > 3:
+                score += 3
+                reasons.append('Message length statistical anomaly')
+
+            z_score = stats.get(self.score_window, 'token_count').z_score(token_count)
+            if z_score is not None and z_score > 3:
+                score += 0.2
+                reasons.append('Token count statistical anomaly')
+
+            # Errors arriving much faster than usual for this source
+            recent_rate = stats.get(self.rate_window, 'error_rate').mean
+            usual_rate = stats.get(self.score_window, 'error_rate').mean
+            if is_error and recent_rate - usual_rate >= self.error_rate_spike:
+                score += 0.2
+                reasons.append('Error rate spike')
+
+        self.baseline.update({
+            'message_length': message_length,
+            'token_count': token_count,
+            'error_rate': 1.0 if is_error else 0.0
+        }, source, level)
+
+        return score, reasons
+
+    def _score_baseline_batch(self, columns, sources, levels):
+        """
+        Score a batch against the baselines and add it to them, as _score_baseline
+        does log by log
+
+        Returns:
+            tuple: Array of scores to add and the reasons list of each log
+        """
+        message_length, token_count = columns['message_length'], columns['token_count']
+        is_error = columns['is_error']
+        selected = self.baseline.update_batch({
+            'message_length': message_length,
+            'token_count': token_count,
+            'error_rate': np.where(is_error, 1.0, 0.0)
+        }, sources, levels)
+        if selected is None:
+            # Too many new sources or levels to replay without evicting
+            scored = [
+                self._score_baseline(length, tokens, error, source, level)
+                for length, tokens, error, source, level in zip(
+                    message_length.tolist(), token_count.tolist(), is_error.tolist(), sources, levels)
+            ]
+            return np.array([score for score, _ in scored], dtype=float), [reasons for _, reasons in scored]
+
+        found, stats = selected
+        with np.errstate(divide='ignore', invalid='ignore'):
+            flags = []
+            for metric, values in (('message_length', message_length), ('token_count', token_count)):
+                mean, std = stats[(self.score_window, metric)]
+                flags.append(found & (std > 0) & (np.abs(values - mean) / std > 3))
+        recent_rate = stats[(self.rate_window, 'error_rate')][0]
+        usual_rate = stats[(self.score_window, 'error_rate')][0]
+        flags.append(found & is_error & (recent_rate - usual_rate >= self.error_rate_spike))
+
+        scores = np.zeros(len(sources))
+        reasons = [[] for _ in sources]
+        for flag, score, reason in zip(flags, (3, 0.2, 0.2), (
+                'Message length statistical anomaly', 'Token count statistical anomaly',
+                'Error rate spike')):
+            scores += np.where(flag, score, 0.0)
+            for i in np.flatnonzero(flag).tolist():
+                reasons[i].append(reason)
+        return scores, reasons
+
+    def _detect_patterns(self, timestamp, log_data, features):
+        """Count a log in the pattern engine and report the pattern it belongs to"""
+        counts = features['keyword_counts']
+        return self.patterns.observe(
+            timestamp,
+            log_data.get('source'),
+            self._log_level(log_data) or features['severity'],
+            features['severity'] == 'error',
+            features['template_id'],
+            [(keyword, counts[keyword]) for keyword in features['keywords']]
+        )
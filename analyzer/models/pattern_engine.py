@@ -0,0 +1,723 @@
+import math
+import zlib
+import numpy as np
+
+# Rolling windows, in seconds of log time
+DEFAULT_WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+
+
+def factorize(keys):
+    """Dense integer codes of a list of hashable keys, and the distinct keys in code order"""
+    ids = {}
+    codes = np.fromiter((ids.setdefault(key, len(ids)) for key in keys), dtype=np.int64, count=len(keys))
+    return codes, list(ids)
+
+
+def running_sums(codes, weights):
+    """For each position, the total weight of the positions up to it with the same code"""
+    order = np.argsort(codes, kind='stable')
+    ordered = codes[order]
+    totals = np.cumsum(weights[order], dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], ordered[1:] != ordered[:-1]]))
+    sums = np.empty_like(totals)
+    sums[order] = totals - np.repeat(np.concatenate([[0], totals])[starts],
+                                     np.diff(np.append(starts, len(ordered))))
+    return sums
+
+
+def sum_below(codes, index, weights, query_codes, query_index):
+    """For each query, the total weight of the entries with its code and an index below its index"""
+    if len(codes) == 0:
+        return np.zeros(len(query_codes), dtype=np.int64)
+    low = index.min()
+    width = int(index.max() - low) + 2
+    keys = codes * width + (index - low)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    cumulative = np.concatenate([[0], np.cumsum(weights[order], dtype=np.int64)])
+    first = np.searchsorted(keys, query_codes * width)
+    end = np.searchsorted(keys, query_codes * width + np.clip(query_index - low, 0, width - 1))
+    return cumulative[end] - cumulative[first]
+
+
+class BatchKeys:
+    """
+    One key per log of a batch, sorted once by key and by key and bucket, so
+    running counts per key take a cumulative sum and counts below a bucket a
+    binary search, whatever subset of the logs is asked about
+    """
+
+    def __init__(self, keys, index, counted):
+        self.codes, self.keys = factorize(keys)
+        self.ids = {key: code for code, key in enumerate(self.keys)}
+        self.counted = counted & (self.codes != self.ids.get(None, -1)) # Logs with a key to count
+        self.order = np.argsort(self.codes, kind='stable')
+        ordered = self.codes[self.order]
+        starts = np.flatnonzero(np.concatenate([[True], ordered[1:] != ordered[:-1]]))
+        self.group_start = np.repeat(starts, np.diff(np.append(starts, len(ordered))))
+        self.index = index
+        self.low = index.min()
+        self.width = int(index.max() - self.low) + 2
+        self.key_base = self.codes * self.width
+        self.by_bucket = None # Sorted on first use by below()
+
+    def running(self, mask):
+        """For each log, how many logs up to it have its key and are in mask"""
+        totals = np.cumsum(mask[self.order], dtype=np.int64)
+        counts = np.empty_like(totals)
+        counts[self.order] = totals - np.concatenate([[0], totals])[self.group_start]
+        return counts
+
+    def below(self, mask, index):
+        """For each log, how many logs in mask have its key and a bucket below index"""
+        if self.by_bucket is None:
+            by_bucket = self.key_base + (self.index - self.low)
+            self.by_bucket = np.argsort(by_bucket, kind='stable')
+            self.sorted_buckets = by_bucket[self.by_bucket]
+            self.key_first = np.searchsorted(self.sorted_buckets, self.key_base)
+        cumulative = np.concatenate([[0], np.cumsum(mask[self.by_bucket], dtype=np.int64)])
+        end = np.searchsorted(self.sorted_buckets,
+                              self.key_base + np.clip(index - self.low, 0, self.width - 1))
+        return cumulative[end] - cumulative[self.key_first]
+
+
+class SlidingWindowCounts:
+    """
+    Per-key counts over several rolling windows of log time.
+
+    Time is cut into fixed buckets; each bucket holds the counts of the
+    keys seen in it and every window keeps running totals. Adding a log is
+    O(keys x windows), and each bucket is subtracted from a window's totals
+    exactly once when it slides out, so the cost stays constant however
+    many logs arrive. Windows follow log timestamps rather than the clock,
+    so replaying history gives the same counts as the live run did.
+    """
+
+    def __init__(self, windows=None, bucket_seconds=10):
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.bucket_seconds = bucket_seconds
+        self.spans = {
+            name: max(1, int(round(seconds / bucket_seconds)))
+            for name, seconds in self.windows.items()
+        }
+        self.max_span = max(self.spans.values())
+        self.buckets = {} # bucket index -> {key: count}
+        self.totals = {name: {} for name in self.windows}
+        self.window_start = {} # window -> oldest bucket index still counted
+        self.current = None # Newest bucket index
+        self.first = None # Oldest bucket index ever seen
+        self.coverage = {name: 0 for name in self.windows} # Seconds each window spans so far
+
+    def add(self, timestamp, keys):
+        """
+        Count one log under each of keys
+
+        Returns:
+            bool: False if the log was too old to count or had no timestamp
+        """
+        if timestamp is None or math.isnan(timestamp):
+            return False
+        index = int(timestamp // self.bucket_seconds)
+        if self.current is None:
+            self.current = self.first = index
+            self.window_start = {name: index for name in self.windows}
+            self._update_coverage()
+        elif index > self.current:
+            self._advance(index)
+        elif index <= self.current - self.max_span:
+            return False
+
+        bucket = self.buckets.get(index)
+        if bucket is None:
+            bucket = self.buckets[index] = {}
+        for key in keys:
+            bucket[key] = bucket.get(key, 0) + 1
+        for name, span in self.spans.items():
+            if index > self.current - span:
+                totals = self.totals[name]
+                for key in keys:
+                    totals[key] = totals.get(key, 0) + 1
+        return True
+
+    def add_batch(self, timestamps, columns):
+        """
+        Count a batch of logs, as calling add() on each in order would
+
+        A log's count in a window right after it is added is the count left
+        over from before the batch, less the old buckets that have slid out by
+        then, plus the logs of the batch with the same key in buckets the
+        window still spans. All three come from sorted arrays, so the batch
+        costs a few NumPy calls per window instead of a dict update per key.
+
+        Args:
+            timestamps (list): Log times in epoch seconds (NaN if unknown)
+            columns (list): (keys, windows) pairs, keys holding one key per log
+                (None for no key) and windows the windows to report counts in
+
+        Returns:
+            tuple: (counted, counts, coverage) with counted what add() would
+                return per log, counts[column][window] the count of each log's
+                key right after adding it and coverage[window] the seconds the
+                window spanned then; None if a log falls before the first
+                bucket ever seen, which is left to add()
+        """
+        timestamps = np.asarray(timestamps, dtype=float)
+        valid = ~np.isnan(timestamps)
+        if not np.isfinite(timestamps[valid]).all():
+            return None
+        if not valid.any():
+            zeros = np.zeros(len(timestamps), dtype=np.int64)
+            return (valid, [{name: zeros for name in windows} for _, windows in columns],
+                    {name: zeros for name in self.windows})
+        current, first = self.current, self.first
+        if current is None:
+            current = first = int(timestamps[np.argmax(valid)] // self.bucket_seconds)
+        # Logs without a time sit in the current bucket, but are never counted
+        index = np.full(len(timestamps), current, dtype=np.int64)
+        index[valid] = timestamps[valid] // self.bucket_seconds
+        latest = np.maximum.accumulate(np.maximum(index, current))
+        counted = valid & (index > latest - self.max_span)
+        if (counted & (index < first)).any():
+            return None
+
+        encoded = [BatchKeys(keys, index, counted) for keys, _ in columns]
+        final = int(latest[-1])
+        counts = [{} for _ in columns]
+        coverage = {}
+        for name, span in self.spans.items():
+            start = latest - span + 1
+            coverage[name] = np.minimum(span, latest - first + 1) * self.bucket_seconds
+            wanted = [i for i, (_, windows) in enumerate(columns) if name in windows]
+            if not wanted:
+                continue
+
+            # Old buckets that slide out of the window during the batch
+            old_start = self.window_start.get(name, first)
+            expired = {i: [] for i in wanted}
+            for bucket_index in sorted(i for i in self.buckets if old_start <= i < final - span + 1):
+                for key, count in self.buckets[bucket_index].items():
+                    for i in wanted:
+                        code = encoded[i].ids.get(key)
+                        if code is not None:
+                            expired[i].append((code, bucket_index, count))
+
+            totals = self.totals[name]
+            for i in wanted:
+                column = encoded[i]
+                before = np.array([totals.get(key, 0) for key in column.keys], dtype=np.int64)[column.codes]
+                if expired[i]:
+                    expired_codes, expired_index, expired_counts = map(np.array, zip(*expired[i]))
+                    before -= sum_below(expired_codes, expired_index, expired_counts, column.codes, start)
+                # Logs older than the window when they arrive never enter its totals
+                eligible = column.counted & (index >= start)
+                counts[i][name] = before + column.running(eligible)
+                if (index[eligible] < final - span + 1).any():
+                    counts[i][name] -= column.below(eligible, start)
+
+        if counted.any():
+            if self.current is None:
+                self.current = self.first = first
+                self.window_start = {name: first for name in self.windows}
+                self._update_coverage()
+            if final > self.current:
+                self._advance(final)
+            cutoff = final - self.max_span + 1
+            for column in encoded:
+                codes, distinct = column.codes, column.keys
+                kept = column.counted & (index >= cutoff)
+                pairs, pair_counts = np.unique(
+                    (index[kept] - cutoff) * len(distinct) + codes[kept], return_counts=True)
+                for pair, count in zip(pairs.tolist(), pair_counts.tolist()):
+                    bucket = self.buckets.setdefault(cutoff + pair // len(distinct), {})
+                    key = distinct[pair % len(distinct)]
+                    bucket[key] = bucket.get(key, 0) + count
+                for name, span in self.spans.items():
+                    totals = self.totals[name]
+                    added = np.bincount(codes[column.counted & (index > final - span)],
+                                        minlength=len(distinct))
+                    for code in np.flatnonzero(added).tolist():
+                        key = distinct[code]
+                        totals[key] = totals.get(key, 0) + int(added[code])
+        return counted, counts, coverage
+
+    def _advance(self, index):
+        """Move the newest bucket forward, expiring what falls out of each window"""
+        for name, span in self.spans.items():
+            start = index - span + 1
+            old_start = self.window_start[name]
+            if start <= old_start:
+                continue
+            if start - old_start <= len(self.buckets):
+                expired = range(old_start, start)
+            else:
+                # Long gap in the logs: only look at buckets that exist
+                expired = sorted(i for i in self.buckets if old_start <= i < start)
+            totals = self.totals[name]
+            for i in expired:
+                bucket = self.buckets.get(i)
+                if not bucket:
+                    continue
+                for key, count in bucket.items():
+                    remaining = totals.get(key, 0) - count
+                    if remaining > 0:
+                        totals[key] = remaining
+                    else:
+                        totals.pop(key, None)
+            self.window_start[name] = start
+
+        cutoff = index - self.max_span + 1
+        for i in [i for i in self.buckets if i < cutoff]:
+            del self.buckets[i]
+        self.current = index
+        self._update_coverage()
+
+    def _update_coverage(self):
+        elapsed = self.current - self.first + 1
+        for name, span in self.spans.items():
+            self.coverage[name] = min(span, elapsed) * self.bucket_seconds
+
+    def count(self, window, key):
+        """Count of a key in a window"""
+        return self.totals[window].get(key, 0)
+
+    def covered(self, window):
+        """Seconds of log time a window currently spans"""
+        return self.coverage[window]
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch: approximate counts of unbounded keys in fixed memory
+
+    Estimates never undercount and overcount by at most about
+    e / width of the total with probability 1 - exp(-depth).
+    """
+
+    def __init__(self, width=2048, depth=4, column_cache_size=10000):
+        self.width = width
+        self.depth = depth
+        self.table = [[0] * width for _ in range(depth)]
+        self.columns = {} # key -> column per row, so hashing happens once per key
+        self.column_cache_size = column_cache_size
+
+    def _columns(self, key):
+        columns = self.columns.get(key)
+        if columns is None:
+            # Double hashing from two stable CRCs, so sketches survive restarts
+            data = key.encode('utf-8')
+            h1 = zlib.crc32(data)
+            h2 = zlib.crc32(data, 0x9e3779b9) | 1
+            columns = tuple((h1 + row * h2) % self.width for row in range(self.depth))
+            if len(self.columns) >= self.column_cache_size:
+                self.columns.clear()
+            self.columns[key] = columns
+        return columns
+
+    def add(self, key, count=1):
+        """Add to a key's count and return its new estimate"""
+        estimate = None
+        for row, column in zip(self.table, self._columns(key)):
+            value = row[column] + count
+            row[column] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def add_many(self, keys, counts):
+        """
+        Add to many keys' counts in order, as add() would one at a time
+
+        Returns:
+            ndarray: Estimate of each key right after its add
+        """
+        codes, distinct = factorize(keys)
+        counts = np.asarray(counts, dtype=np.int64)
+        running = running_sums(codes, counts)
+        key_totals = np.bincount(codes, weights=counts, minlength=len(distinct))
+        columns = np.array([self._columns(key) for key in distinct], dtype=np.int64).reshape(-1, self.depth)
+        estimates = None
+        for row, column in zip(self.table, columns.T):
+            touched, cells = np.unique(column, return_inverse=True)
+            touched = touched.tolist()
+            start = np.array([row[i] for i in touched], dtype=np.int64)
+            if len(touched) == len(distinct):
+                values = start[cells][codes] + running
+            else:
+                # Keys of this batch share a cell of this row, so their counts add up
+                values = start[cells[codes]] + running_sums(cells[codes], counts)
+            estimates = values if estimates is None else np.minimum(estimates, values)
+            added = np.bincount(cells, weights=key_totals, minlength=len(touched)).astype(np.int64)
+            for i, value in zip(touched, (start + added).tolist()):
+                row[i] = value
+        return estimates
+
+    def estimate(self, key):
+        return min(row[column] for row, column in zip(self.table, self._columns(key)))
+
+    def halve(self, times=1):
+        """Decay all counts by half, `times` times over"""
+        self.table = [[value >> times for value in row] for row in self.table]
+
+
+class HeavyHitters:
+    """
+    Top-k keys by Count-Min estimate
+
+    Counts decay by half every `decay_seconds` of log time, so the ranking
+    follows what is frequent now rather than since startup.
+    """
+
+    def __init__(self, k=10, width=2048, depth=4, decay_seconds=3600):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.top = {} # key -> estimate
+        self.min_key = None
+        self.decay_seconds = decay_seconds
+        self.decay_at = None
+        self.total = 0 # Hits ever added, not decayed
+
+    def add(self, key, count, timestamp):
+        """Count a key and keep the top-k up to date"""
+        self._tick(timestamp)
+        self.total += count
+        self._offer(key, self.sketch.add(key, count))
+
+    def add_batch(self, keys, counts, timestamps, marks=()):
+        """
+        Count many keys in order, as add() would one at a time
+
+        Between decays the sketch takes the keys all at once with
+        CountMinSketch.add_many; only the top-k upkeep goes key by key.
+
+        Args:
+            marks (list): Positions right after which most_common(2) is wanted
+
+        Returns:
+            list: most_common(2) right after each marked key, in order
+        """
+        times = np.asarray(timestamps, dtype=float)
+        marks = set(marks)
+        leaders = []
+        position = 0
+        while position < len(keys):
+            self._tick(timestamps[position])
+            # Run up to the next key that starts or moves the decay clock
+            if self.decay_at is None:
+                later = np.flatnonzero(~np.isnan(times[position + 1:]))
+            else:
+                later = np.flatnonzero(times[position + 1:] >= self.decay_at)
+            end = position + 1 + int(later[0]) if len(later) else len(keys)
+            estimates = self.sketch.add_many(keys[position:end], counts[position:end])
+            for i, estimate in enumerate(estimates.tolist(), position):
+                self.total += counts[i]
+                self._offer(keys[i], estimate)
+                if i in marks:
+                    leaders.append(self.most_common(2))
+            position = end
+        return leaders
+
+    def _tick(self, timestamp):
+        """Start the decay clock on the first timestamp, and decay once it is due"""
+        if timestamp is not None and not math.isnan(timestamp):
+            if self.decay_at is None:
+                self.decay_at = timestamp + self.decay_seconds
+            elif timestamp >= self.decay_at:
+                self._decay(timestamp)
+
+    def _offer(self, key, estimate):
+        """Update the top-k with a key's new estimate"""
+        top = self.top
+        if key in top:
+            top[key] = estimate
+            if key == self.min_key:
+                self.min_key = min(top, key=top.get)
+        elif len(top) < self.k:
+            top[key] = estimate
+            if self.min_key is None or estimate < top[self.min_key]:
+                self.min_key = key
+        elif estimate > top[self.min_key]:
+            del top[self.min_key]
+            top[key] = estimate
+            self.min_key = min(top, key=top.get)
+
+    def _decay(self, timestamp):
+        periods = int((timestamp - self.decay_at) // self.decay_seconds) + 1
+        shift = min(periods, 64)
+        self.sketch.halve(shift)
+        self.top = {key: value >> shift for key, value in self.top.items()}
+        self.min_key = min(self.top, key=self.top.get) if self.top else None
+        self.decay_at += periods * self.decay_seconds
+
+    def leader(self):
+        """The most frequent key and its estimate, or (None, 0)"""
+        if not self.top:
+            return None, 0
+        key = max(self.top, key=self.top.get)
+        return key, self.top[key]
+
+    def most_common(self, n=None):
+        ranked = sorted(self.top.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n] if n else ranked
+
+
+class PatternEngine:
+    """
+    Stream-wide pattern detection in constant time per log.
+
+    Logs are counted in rolling 1m/5m/1h windows by source, severity and
+    template, and their keywords feed a Count-Min sketch with top-k heavy
+    hitter tracking. Each log is then checked against the keys it touched:
+
+    - error_burst: most of a source's logs in the last minute are errors
+    - rate_spike: a template or source runs far above its hourly rate
+    - dominant_keyword: one keyword has just pulled well ahead of all others
+    """
+
+    def __init__(self, windows=None, bucket_seconds=10, burst_min_errors=20, burst_share=0.5,
+                 spike_windows=('1m', '5m'), baseline_window='1h', spike_factor=5.0,
+                 spike_min_count=20, spike_min_history=300, keyword_top_k=10,
+                 keyword_warmup=1000, keyword_decay_seconds=3600, dominance_ratio=2.0,
+                 keyword_check_every=50):
+        self.counts = SlidingWindowCounts(windows, bucket_seconds)
+        self.burst_window = min(self.counts.windows, key=self.counts.windows.get)
+        self.burst_min_errors = burst_min_errors
+        self.burst_share = burst_share
+        self.spike_windows = [w for w in spike_windows if w in self.counts.windows]
+        # A key's count in the widest window bounds its count in the others
+        self.widest_spike_window = max(self.spike_windows, key=self.counts.windows.get)
+        self.baseline_window = baseline_window
+        self.spike_factor = spike_factor
+        self.spike_min_count = spike_min_count
+        self.spike_min_history = spike_min_history # Seconds of baseline needed before spikes count
+        self.keywords = HeavyHitters(keyword_top_k, decay_seconds=keyword_decay_seconds)
+        self.keyword_warmup = keyword_warmup
+        self.dominance_ratio = dominance_ratio # Lead over the runner-up that makes a keyword dominant
+        self.dominant_keyword = None
+        self.keyword_check_every = keyword_check_every # Logs between dominance checks
+        self.logs_since_check = 0
+
+    def observe(self, timestamp, source, level, is_error, template_id, keywords):
+        """
+        Count one log and report the pattern it is part of, if any
+
+        Args:
+            timestamp (float): Log time in epoch seconds (NaN if unknown)
+            source (str): Log source
+            level (str): Declared or derived severity
+            is_error (bool): Whether the log matched an error pattern
+            template_id (int): TemplateMiner id, -1 if unknown
+            keywords (list): (keyword, hits) pairs
+
+        Returns:
+            dict: Pattern result in the LogAnalyzer 'patterns' format
+        """
+        source_key = ('source', source)
+        template_key = ('template', template_id)
+        keys = [source_key, ('severity', level), template_key]
+        if is_error:
+            keys.append(('source_errors', source))
+        counted = self.counts.add(timestamp, keys)
+
+        newly_dominant = None
+        for keyword, hits in keywords:
+            self.keywords.add(keyword, hits, timestamp)
+        self.logs_since_check += 1
+        if (keywords and self.logs_since_check >= self.keyword_check_every
+                and self.keywords.total >= self.keyword_warmup):
+            self.logs_since_check = 0
+            dominant = self._dominant_keyword(self.keywords.most_common(2))
+            if dominant != self.dominant_keyword:
+                newly_dominant = dominant
+                self.dominant_keyword = dominant
+
+        if counted:
+            if is_error:
+                pattern = self._error_burst(source)
+                if pattern:
+                    return pattern
+            for key, label in ((template_key, 'template'), (source_key, 'source')):
+                pattern = self._rate_spike(key, label)
+                if pattern:
+                    return pattern
+
+        if newly_dominant is not None:
+            return self._dominance_result(newly_dominant, self.keywords.top[newly_dominant])
+        return {'detected': False}
+
+    def observe_batch(self, timestamps, sources, levels, is_error, template_ids, keywords):
+        """
+        Count a batch of logs and report the pattern of each, as observe() would one by one
+
+        Window counts come from SlidingWindowCounts.add_batch and the burst
+        and spike checks run on whole arrays; only the keyword heavy hitters
+        are still fed log by log.
+
+        Args:
+            Lists of the arguments of observe(), one entry per log
+
+        Returns:
+            list: Pattern results in the LogAnalyzer 'patterns' format
+        """
+        source_keys = [('source', source) for source in sources]
+        template_keys = [('template', template_id) for template_id in template_ids]
+        spike_windows = set(self.spike_windows) | {self.baseline_window}
+        added = self.counts.add_batch(timestamps, [
+            (source_keys, spike_windows | {self.burst_window}),
+            ([('severity', level) for level in levels], ()),
+            (template_keys, spike_windows),
+            ([('source_errors', source) if error else None for source, error in zip(sources, is_error)],
+             (self.burst_window,))
+        ])
+        if added is None:
+            return [self.observe(*log) for log in zip(timestamps, sources, levels, is_error,
+                                                      template_ids, keywords)]
+        counted, (source_counts, _, template_counts, error_counts), coverage = added
+        newly_dominant = self._observe_keywords_batch(timestamps, keywords)
+
+        errors = error_counts[self.burst_window]
+        totals = source_counts[self.burst_window]
+        found = (counted & np.asarray(is_error, dtype=bool) & (errors >= self.burst_min_errors)
+                 & (errors >= self.burst_share * totals))
+        patterns = [{'detected': False}] * len(timestamps)
+        for i in np.flatnonzero(found).tolist():
+            patterns[i] = self._burst_result(sources[i], int(errors[i]), int(totals[i]))
+        # Templates before sources, and neither over an error burst
+        for keys, counts, label in ((template_keys, template_counts, 'template'),
+                                    (source_keys, source_counts, 'source')):
+            spike_window, expected = self._rate_spikes(counted, counts, coverage)
+            spiking = (spike_window >= 0) & ~found
+            for i in np.flatnonzero(spiking).tolist():
+                window = self.spike_windows[spike_window[i]]
+                patterns[i] = self._spike_result(keys[i], label, window, int(counts[window][i]),
+                                                 float(expected[i]))
+            found |= spiking
+        for i, (keyword, estimate) in newly_dominant.items():
+            if not found[i]:
+                patterns[i] = self._dominance_result(keyword, estimate)
+        return patterns
+
+    def _observe_keywords_batch(self, timestamps, keywords):
+        """
+        Feed a batch's keywords to the heavy hitters, checking for a newly dominant
+        keyword after the same logs observe() would
+
+        Returns:
+            dict: Position of each log a keyword became dominant at, to the keyword and its estimate
+        """
+        keys, hits, times, marks, checked = [], [], [], [], []
+        total = self.keywords.total
+        for i, (timestamp, log_keywords) in enumerate(zip(timestamps, keywords)):
+            for keyword, count in log_keywords:
+                keys.append(keyword)
+                hits.append(count)
+                times.append(timestamp)
+                total += count
+            self.logs_since_check += 1
+            if (log_keywords and self.logs_since_check >= self.keyword_check_every
+                    and total >= self.keyword_warmup):
+                self.logs_since_check = 0
+                marks.append(len(keys) - 1)
+                checked.append(i)
+
+        newly_dominant = {}
+        for i, ranked in zip(checked, self.keywords.add_batch(keys, hits, times, marks)):
+            dominant = self._dominant_keyword(ranked)
+            if dominant != self.dominant_keyword:
+                self.dominant_keyword = dominant
+                if dominant is not None:
+                    newly_dominant[i] = (dominant, ranked[0][1])
+        return newly_dominant
+
+    def _dominance_result(self, keyword, estimate):
+        return {
+            'detected': True,
+            'type': 'dominant_keyword',
+            'description': f'Keyword "{keyword}" now dominates recent logs '
+                           f'(~{estimate} occurrences, over {self.dominance_ratio:g}x any other)'
+        }
+
+    def _dominant_keyword(self, ranked):
+        """The top keyword of most_common(2) if it leads the runner-up by dominance_ratio, else None"""
+        if not ranked:
+            return None
+        if len(ranked) == 1 or ranked[0][1] >= self.dominance_ratio * ranked[1][1]:
+            return ranked[0][0]
+        return None
+
+    def _error_burst(self, source):
+        window = self.burst_window
+        errors = self.counts.count(window, ('source_errors', source))
+        if errors < self.burst_min_errors:
+            return None
+        total = self.counts.count(window, ('source', source))
+        if errors < self.burst_share * total:
+            return None
+        return self._burst_result(source, errors, total)
+
+    def _burst_result(self, source, errors, total):
+        window = self.burst_window
+        return {
+            'detected': True,
+            'type': 'error_burst',
+            'window': window,
+            'description': f'{errors} of {total} logs from {source or "unknown source"} '
+                           f'in the last {window} are errors'
+        }
+
+    def _rate_spike(self, key, label):
+        totals = self.counts.totals
+        if totals[self.widest_spike_window].get(key, 0) < self.spike_min_count:
+            return None
+        coverage = self.counts.coverage
+        baseline_seconds = coverage[self.baseline_window]
+        if baseline_seconds < self.spike_min_history:
+            return None
+        baseline_count = totals[self.baseline_window].get(key, 0)
+        for window in self.spike_windows:
+            count = totals[window].get(key, 0)
+            if count < self.spike_min_count:
+                continue
+            window_seconds = coverage[window]
+            # Rate over the rest of the baseline window, so the spike does not hide itself
+            rest_seconds = baseline_seconds - window_seconds
+            if rest_seconds <= 0:
+                continue
+            expected = (baseline_count - count) / rest_seconds * window_seconds
+            if count >= self.spike_factor * max(expected, 1.0):
+                return self._spike_result(key, label, window, count, expected)
+        return None
+
+    def _rate_spikes(self, counted, counts, coverage):
+        """
+        _rate_spike over a batch, from one column of SlidingWindowCounts.add_batch
+
+        Returns:
+            tuple: Index into spike_windows of the window each log spikes in (-1
+                for none) and its expected count there
+        """
+        baseline_seconds = coverage[self.baseline_window]
+        baseline_count = counts[self.baseline_window]
+        candidate = (counted & (counts[self.widest_spike_window] >= self.spike_min_count)
+                     & (baseline_seconds >= self.spike_min_history))
+        spike_window = np.full(len(counted), -1)
+        expected = np.zeros(len(counted))
+        for i, window in enumerate(self.spike_windows):
+            count = counts[window]
+            window_seconds = coverage[window]
+            rest_seconds = baseline_seconds - window_seconds
+            with np.errstate(divide='ignore', invalid='ignore'):
+                window_expected = (baseline_count - count) / rest_seconds * window_seconds
+            spiking = (candidate & (spike_window < 0) & (count >= self.spike_min_count) & (rest_seconds > 0)
+                       & (count >= self.spike_factor * np.maximum(window_expected, 1.0)))
+            spike_window[spiking] = i
+            expected[spiking] = window_expected[spiking]
+        return spike_window, expected
+
+    def _spike_result(self, key, label, window, count, expected):
+        return {
+            'detected': True,
+            'type': 'rate_spike',
+            'window': window,
+            'description': f'{label} {key[1]} logged {count} times in the last {window}, '
+                           f'{count / max(expected, 1.0):.1f}x its {self.baseline_window} rate'
+        }
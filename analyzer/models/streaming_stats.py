@@ -0,0 +1,294 @@
+import math
+from collections import OrderedDict
+import numpy as np
+
+# Forgetting factor per window; 1.0 keeps every sample (plain Welford)
+DEFAULT_WINDOWS = {'fast': 0.95, 'slow': 0.999}
+DEFAULT_METRICS = ('message_length', 'token_count', 'error_rate')
+
+
+def decayed_cumsum(values, decay, initial):
+    """
+    Running sums y[k] = decay * y[k - 1] + values[k] down the rows of a 2-D array
+
+    Each column decays by its own factor and starts from its `initial`
+    value. Rows are summed in blocks as decay-weighted prefix sums, with
+    blocks short enough that decay ** -block cannot overflow.
+    """
+    count = len(values)
+    out = np.empty_like(values)
+    slowest = -math.log(min(decay.min(), 1.0)) if decay.size else 0.0
+    block = count if slowest == 0 else max(1, min(count, int(50 / slowest)))
+    powers = decay ** np.arange(1, block + 1)[:, None]
+    carry = initial
+    for start in range(0, count, block):
+        chunk = values[start:start + block]
+        scale = powers[:len(chunk)]
+        out[start:start + block] = scale * (carry + np.cumsum(chunk / scale, axis=0))
+        carry = out[start + len(chunk) - 1]
+    return out
+
+
+class RunningStats:
+    """
+    Exponentially weighted mean and variance with O(1) updates.
+
+    Uses West's weighted form of Welford's algorithm: every update first
+    scales the accumulated weight by `decay`, so older samples fade out with
+    an effective window of about 1 / (1 - decay) samples. With decay=1.0 this
+    is the exact population mean and variance.
+    """
+
+    __slots__ = ('decay', 'weight', 'mean', 'm2', 'count')
+
+    def __init__(self, decay=1.0):
+        self.decay = decay
+        self.weight = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.count = 0
+
+    def update(self, value):
+        """Add a sample"""
+        self.weight = self.weight * self.decay + 1.0
+        delta = value - self.mean
+        self.mean += delta / self.weight
+        self.m2 = self.m2 * self.decay + delta * (value - self.mean)
+        self.count += 1
+
+    @property
+    def variance(self):
+        return self.m2 / self.weight if self.weight > 0 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(max(self.variance, 0.0))
+
+    def z_score(self, value):
+        """Distance of value from the mean in standard deviations, None if undefined"""
+        std = self.std
+        if std <= 0:
+            return None
+        return abs(value - self.mean) / std
+
+    def to_dict(self):
+        return {'mean': self.mean, 'std': self.std, 'count': self.count}
+
+
+class MultiWindowStats:
+    """RunningStats for several metrics over several decay windows"""
+
+    __slots__ = ('windows', 'count')
+
+    def __init__(self, windows=None, metrics=DEFAULT_METRICS):
+        windows = windows or DEFAULT_WINDOWS
+        self.windows = {
+            name: {metric: RunningStats(decay) for metric in metrics}
+            for name, decay in windows.items()
+        }
+        self.count = 0
+
+    def update(self, values):
+        """
+        Add one sample per metric
+
+        Args:
+            values (dict): Metric name to value
+        """
+        for stats in self.windows.values():
+            for metric, value in values.items():
+                stats[metric].update(value)
+        self.count += 1
+
+    def get(self, window, metric):
+        return self.windows[window][metric]
+
+    def to_dict(self):
+        return {
+            name: {metric: stats.to_dict() for metric, stats in window.items()}
+            for name, window in self.windows.items()
+        }
+
+
+class BaselineTracker:
+    """
+    Streaming baselines keyed by log source and log level.
+
+    Each source and level gets its own MultiWindowStats next to a global
+    one, so a chatty source does not skew the baseline of a quiet one. The
+    number of tracked sources and levels is capped; the least recently seen
+    key is evicted when a new one arrives, which keeps memory bounded no
+    matter how many sources show up.
+    """
+
+    def __init__(self, windows=None, metrics=DEFAULT_METRICS, min_samples=30,
+                 max_sources=1024, max_levels=64):
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.metrics = tuple(metrics)
+        self.min_samples = min_samples
+        self.limits = {'source': max_sources, 'level': max_levels}
+        self.columns = [(window, metric) for window in self.windows for metric in self.metrics]
+        self.global_stats = self._new_stats()
+        self.keyed = {'source': OrderedDict(), 'level': OrderedDict()}
+
+    def _new_stats(self):
+        return MultiWindowStats(self.windows, self.metrics)
+
+    def _lookup(self, dimension, key, create=False):
+        """Find the stats of a source or level, refreshing its LRU position"""
+        if key is None:
+            return None
+        table = self.keyed[dimension]
+        stats = table.get(key)
+        if stats is not None:
+            table.move_to_end(key)
+        elif create:
+            stats = table[key] = self._new_stats()
+            if len(table) > self.limits[dimension]:
+                table.popitem(last=False)
+        return stats
+
+    def select(self, source=None, level=None):
+        """
+        Pick the most specific warmed-up baseline for a log
+
+        Falls back from the source baseline to the level baseline and then
+        to the global one.
+        """
+        for dimension, key in (('source', source), ('level', level)):
+            stats = self._lookup(dimension, key)
+            if stats is not None and stats.count >= self.min_samples:
+                return stats
+        if self.global_stats.count >= self.min_samples:
+            return self.global_stats
+        return None
+
+    def update(self, values, source=None, level=None):
+        """Add one log's metric values to the global, source and level baselines"""
+        self.global_stats.update(values)
+        for dimension, key in (('source', source), ('level', level)):
+            stats = self._lookup(dimension, key, create=True)
+            if stats is not None:
+                stats.update(values)
+
+    def update_batch(self, values, sources, levels):
+        """
+        Add a batch of logs in order, as select() and update() would one log at a time
+
+        Each source, level and the global baseline replays its share of the
+        batch with decayed_cumsum, which also gives its state before every
+        log, so select() can be answered for the whole batch at once.
+
+        Args:
+            values (dict): Metric name to an array of one value per log
+            sources (list): Source of each log, or None
+            levels (list): Level of each log, or None
+
+        Returns:
+            tuple: (found, stats) where found flags the logs select() finds a
+                baseline for and stats maps (window, metric) to the mean and std
+                arrays of that baseline just before each log, or None if the batch
+                brings in more new keys than fit, so that update() has to evict
+        """
+        groups = {}
+        for dimension, keys in (('source', sources), ('level', levels)):
+            rows = {}
+            for i, key in enumerate(keys):
+                if key is not None:
+                    rows.setdefault(key, []).append(i)
+            table = self.keyed[dimension]
+            if len(table) + sum(key not in table for key in rows) > self.limits[dimension]:
+                return None
+            groups[dimension] = rows
+
+        samples = np.column_stack([
+            np.asarray(values[metric], dtype=float) for _, metric in self.columns
+        ])
+        seen = self.global_stats.count
+        mean, variance = self._replay(self.global_stats, samples)
+        found = np.arange(seen, seen + len(samples)) >= self.min_samples
+
+        # Level baselines take over from the global one, and source baselines from both
+        for dimension in ('level', 'source'):
+            table = self.keyed[dimension]
+            # In order of last use, which leaves the LRU order as update() would
+            for key, rows in sorted(groups[dimension].items(), key=lambda item: item[1][-1]):
+                stats = table.get(key)
+                new = stats is None
+                if new:
+                    stats = table[key] = self._new_stats()
+                else:
+                    table.move_to_end(key)
+                rows = np.array(rows)
+                seen = stats.count
+                key_mean, key_variance = self._replay(stats, samples[rows])
+                warm = np.arange(seen, seen + len(rows)) >= self.min_samples
+                warm[0] &= not new
+                mean[rows[warm]] = key_mean[warm]
+                variance[rows[warm]] = key_variance[warm]
+                found[rows[warm]] = True
+
+        std = np.sqrt(np.maximum(variance, 0.0))
+        return found, {
+            column: (mean[:, i], std[:, i]) for i, column in enumerate(self.columns)
+        }
+
+    def _replay(self, stats, samples):
+        """
+        Add rows of samples to a MultiWindowStats, as calling update() per row would
+
+        Returns:
+            tuple: Mean and variance of every column just before each row
+        """
+        runs = [stats.windows[window][metric] for window, metric in self.columns]
+        decay = np.array([run.decay for run in runs])
+        weight0 = np.array([run.weight for run in runs])
+        mean0 = np.array([run.mean for run in runs])
+        m2_0 = np.array([run.m2 for run in runs])
+
+        weight = decayed_cumsum(np.ones_like(samples), decay, weight0)
+        # Sum around the starting mean, so the running sums stay small
+        mean = np.vstack([mean0, mean0 + decayed_cumsum(samples - mean0, decay, 0 * mean0) / weight])
+        # update() keeps a mean exact and the variance exactly zero while every sample
+        # equals the first; a z-score is only defined once they differ, so do the same
+        constant = np.where(weight0 > 0, mean0, samples[0])
+        unchanged = (m2_0 == 0) & np.logical_and.accumulate(samples == constant, axis=0)
+        mean[1:] = np.where(unchanged, constant, mean[1:])
+        delta = samples - mean[:-1]
+        # delta * (value - new mean) of update(), which is never negative
+        m2 = np.vstack([m2_0, decayed_cumsum(delta * delta * (1.0 - 1.0 / weight), decay, m2_0)])
+        weight = np.vstack([weight0, weight])
+        variance = np.divide(m2, weight, out=np.zeros_like(m2), where=weight > 0)
+
+        for i, run in enumerate(runs):
+            run.weight, run.mean, run.m2 = weight[-1, i].item(), mean[-1, i].item(), m2[-1, i].item()
+            run.count += len(samples)
+        stats.count += len(samples)
+        return mean[:-1], variance[:-1]
+
+    def snapshot(self):
+        """Picklable copy of the learned baselines"""
+        return {
+            'windows': self.windows,
+            'metrics': self.metrics,
+            'global_stats': self.global_stats,
+            'keyed': self.keyed
+        }
+
+    def restore(self, state):
+        """Load baselines saved by snapshot() if they were learned with the same settings"""
+        if state['windows'] != self.windows or tuple(state['metrics']) != self.metrics:
+            raise ValueError("Saved baselines use different windows or metrics")
+        self.global_stats = state['global_stats']
+        self.keyed = state['keyed']
+        for dimension, table in self.keyed.items():
+            while len(table) > self.limits[dimension]:
+                table.popitem(last=False)
+
+    def to_dict(self):
+        """Summary of all baselines, for logging and inspection"""
+        return {
+            'global': self.global_stats.to_dict(),
+            'sources': {key: stats.to_dict() for key, stats in self.keyed['source'].items()},
+            'levels': {key: stats.to_dict() for key, stats in self.keyed['level'].items()}
+        }
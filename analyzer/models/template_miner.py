@@ -0,0 +1,184 @@
+import re
+from collections import OrderedDict
+
+# Variable parts of a message, masked in this order
+MASKS = [
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b'), '<UUID>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}\b'), '<IP>'),
+    (re.compile(r'\b0x[0-9a-f]+\b'), '<HEX>'),
+    (re.compile(r'\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{6,}\b'), '<HEX>'),
+    (re.compile(r'\d+'), '<NUM>')
+]
+
+WILDCARD = '<*>'
+
+
+class LogTemplate:
+    """A cluster of messages sharing one shape"""
+
+    __slots__ = ('template_id', 'tokens', 'count')
+
+    def __init__(self, template_id, tokens):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = 0
+
+    @property
+    def text(self):
+        return ' '.join(self.tokens)
+
+
+class TemplateMiner:
+    """
+    Online log template miner in the style of Drain.
+
+    Messages are masked (UUIDs, IPs, hex ids and numbers), split into
+    tokens and grouped by token count and first token. Within a group a
+    message joins the most similar template if enough positions agree,
+    turning the positions that differ into wildcards; otherwise it starts a
+    new template.
+
+    Token features are computed once per masked message shape and kept in a
+    bounded LRU cache, so repeated shapes such as "API request completed
+    (ID: 886)" skip tokenization entirely. Masked parts never contain
+    letters-only words, so they cannot change keywords or sentiment.
+    """
+
+    def __init__(self, feature_extractor, similarity_threshold=0.5, max_templates=5000,
+                 cache_size=10000, warmup=100, rare_ratio=0.001):
+        self.feature_extractor = feature_extractor
+        self.similarity_threshold = similarity_threshold
+        self.max_templates = max_templates
+        self.cache_size = cache_size
+        self.warmup = warmup # Logs seen before new/rare templates count as signals
+        self.rare_ratio = rare_ratio
+        self.templates = OrderedDict() # id -> LogTemplate, least recently used first
+        self.groups = {} # (token count, first token) -> [LogTemplate]
+        self.cache = OrderedDict() # masked message -> (LogTemplate, token features)
+        self.next_id = 0
+        self.total = 0
+        self.cache_hits = 0
+
+    def mask(self, message):
+        """Replace the variable parts of a lowercased message"""
+        for pattern, replacement in MASKS:
+            message = pattern.sub(replacement, message)
+        return message
+
+    def mask_many(self, messages):
+        """
+        mask() for a list of messages, with one pass of each pattern over all of them
+
+        Messages are joined on NUL, which no mask matches across.
+        """
+        text = '\0'.join(messages)
+        if text.count('\0') != len(messages) - 1:
+            return [self.mask(message) for message in messages]
+        for pattern, replacement in MASKS:
+            text = pattern.sub(replacement, text)
+        return text.split('\0')
+
+    def match(self, message, masked=None):
+        """
+        Assign a lowercased message to a template
+
+        Args:
+            message (str): Lowercased message
+            masked (str): The message already passed through mask(), if at hand
+
+        Returns:
+            tuple: The LogTemplate, the message's token features and whether
+                the template was created by this message
+        """
+        self.total += 1
+        if masked is None:
+            masked = self.mask(message)
+
+        # A literal '<' could collide with a mask, so such messages bypass the cache
+        cacheable = '<' not in message
+        cached = self.cache.get(masked) if cacheable else None
+        if cached is not None and cached[0].template_id in self.templates:
+            self.cache.move_to_end(masked)
+            self.cache_hits += 1
+            template, features = cached
+            is_new = False
+        else:
+            template, is_new = self._cluster(masked.split())
+            features = self.feature_extractor(message)
+            if cacheable:
+                self.cache[masked] = (template, features)
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+        template.count += 1
+        self.templates.move_to_end(template.template_id)
+        return template, features, is_new
+
+    def snapshot(self):
+        """Picklable copy of the learned templates and the feature cache"""
+        return {
+            'templates': self.templates,
+            'groups': self.groups,
+            'cache': self.cache,
+            'next_id': self.next_id,
+            'total': self.total,
+            'cache_hits': self.cache_hits
+        }
+
+    def restore(self, state):
+        """Load state saved by snapshot()"""
+        self.templates = state['templates']
+        self.groups = state['groups']
+        self.cache = state['cache']
+        self.next_id = state['next_id']
+        self.total = state['total']
+        self.cache_hits = state['cache_hits']
+
+    @property
+    def warmed_up(self):
+        """Whether enough logs were seen for new or rare templates to mean anything"""
+        return self.total > self.warmup
+
+    def is_rare(self, template):
+        """Whether a template makes up only a tiny share of the stream"""
+        return self.warmed_up and template.count / self.total < self.rare_ratio
+
+    def _cluster(self, tokens):
+        """Find or create the template for a masked token list"""
+        key = (len(tokens), tokens[0] if tokens else '')
+        group = self.groups.setdefault(key, [])
+
+        best, best_similarity = None, -1.0
+        for template in group:
+            similarity = self._similarity(template.tokens, tokens)
+            if similarity > best_similarity:
+                best, best_similarity = template, similarity
+
+        if best is not None and best_similarity >= self.similarity_threshold:
+            best.tokens = [
+                token if token == other else WILDCARD
+                for token, other in zip(best.tokens, tokens)
+            ]
+            return best, False
+
+        template = LogTemplate(self.next_id, tokens)
+        self.next_id += 1
+        self.templates[template.template_id] = template
+        group.append(template)
+
+        # Bound memory by dropping the least recently matched template
+        if len(self.templates) > self.max_templates:
+            _, evicted = self.templates.popitem(last=False)
+            evicted_key = (len(evicted.tokens), evicted.tokens[0] if evicted.tokens else '')
+            self.groups[evicted_key].remove(evicted)
+            if not self.groups[evicted_key]:
+                del self.groups[evicted_key]
+
+        return template, True
+
+    def _similarity(self, template_tokens, tokens):
+        """Share of positions where the template agrees with the tokens"""
+        if not tokens:
+            return 1.0
+        same = sum(1 for a, b in zip(template_tokens, tokens) if a == b or a == WILDCARD)
+        return same / len(tokens)
@@ -0,0 +1,192 @@
+import math
+import bisect
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger('log_analyzer.metrics')
+
+# Seconds, from 10 microseconds (one log) to 10 seconds (a slow fetch or POST)
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count, either incremented or read from a callback"""
+
+    def __init__(self, func=None):
+        self.value = 0
+        self.func = func
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def get(self):
+        return self.func() if self.func else self.value
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observations
+
+    Each histogram is meant to be written from a single thread, so
+    observe() takes no lock.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text exposition format"""
+
+    TYPES = {Counter: 'counter', Gauge: 'gauge', Histogram: 'histogram'}
+
+    def __init__(self, prefix='log_analyzer'):
+        self.prefix = prefix
+        self.families = {} # name -> (type, help, {labels: metric})
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, factory):
+        name = f"{self.prefix}_{name}" if self.prefix else name
+        key = tuple(sorted((labels or {}).items()))
+        with self.lock:
+            kind, _, children = self.families.setdefault(name, (cls, help_text, {}))
+            if kind is not cls:
+                raise ValueError(f"Metric {name} is already registered as a {self.TYPES[kind]}")
+            if key not in children:
+                children[key] = factory()
+            return children[key]
+
+    def counter(self, name, help_text, labels=None, func=None):
+        return self._get(Counter, name, help_text, labels, lambda: Counter(func))
+
+    def gauge(self, name, help_text, labels=None, func=None):
+        return self._get(Gauge, name, help_text, labels, lambda: Gauge(func))
+
+    def histogram(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, lambda: Histogram(buckets))
+
+    def render(self):
+        """All metrics as Prometheus text"""
+        lines = []
+        with self.lock:
+            families = [(name, kind, help_text, list(children.items()))
+                        for name, (kind, help_text, children) in self.families.items()]
+
+        for name, kind, help_text, children in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {self.TYPES[kind]}")
+            for labels, metric in children:
+                if kind is Histogram:
+                    cumulative = 0
+                    for bound, count in zip(metric.bounds + (math.inf,), list(metric.counts)):
+                        cumulative += count
+                        bucket_labels = _format_labels(labels + (('le', _format_value(bound)),))
+                        lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.get())}")
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimings:
+    """One latency histogram per processing stage, sharing a metric name"""
+
+    def __init__(self, registry, name, help_text, stages):
+        self.histograms = {
+            stage: registry.histogram(name, help_text, labels={'stage': stage})
+            for stage in stages
+        }
+
+    def record(self, stage, seconds):
+        self.histograms[stage].observe(seconds)
+
+
+class MetricsServer:
+    """
+    Small HTTP server exposing a registry
+
+    GET /metrics returns Prometheus text. When a profiler is attached,
+    GET /profile?seconds=N samples for N seconds and returns collapsed
+    stacks ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=9464, profiler=None):
+        self.registry = registry
+        self.profiler = profiler
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/metrics':
+                    self._reply(200, server.registry.render(), 'text/plain; version=0.0.4')
+                elif url.path == '/profile' and server.profiler is not None:
+                    try:
+                        seconds = float(parse_qs(url.query).get('seconds', ['10'])[0])
+                    except ValueError:
+                        return self._reply(400, 'seconds must be a number\n')
+                    self._reply(200, server.profiler.profile_for(min(seconds, 300)))
+                else:
+                    self._reply(404, 'Not found\n')
+
+            def _reply(self, status, body, content_type='text/plain'):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_port
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server',
+                                       daemon=True)
+        self.thread.start()
+        logger.info(f"Serving metrics on port {self.port}")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
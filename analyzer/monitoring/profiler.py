@@ -0,0 +1,85 @@
+import sys
+import time
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of all other threads
+
+    Every `interval` seconds a background thread reads sys._current_frames()
+    and counts each stack. Nothing is hooked into the profiled code, so the
+    cost is one stack walk per thread per sample. Stacks are reported in the
+    collapsed format ("thread;outer;...;inner count") read by flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def start(self):
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.thread:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None and len(frames) < self.max_depth:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                sampled.append(';'.join(reversed(frames)))
+            with self.lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+
+    def collapsed(self):
+        """Samples so far in collapsed stack format"""
+        with self.lock:
+            items = sorted(self.stacks.items())
+        return ''.join(f"{stack} {count}\n" for stack, count in items)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+
+    def profile_for(self, seconds):
+        """Sample for a while and return the collapsed stacks of just that period"""
+        profiler = SamplingProfiler(self.interval, self.max_depth)
+        profiler.start()
+        time.sleep(seconds)
+        profiler.stop()
+        return profiler.collapsed()
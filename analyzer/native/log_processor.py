@@ -0,0 +1,263 @@
+import os
+import re
+import ctypes
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger('log_analyzer.native')
+
+DEFAULT_LIBRARY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'processor', 'build', 'liblogprocessor.so'
+)
+
+# Level codes of processor/include/log_processor.h
+LEVEL_CODES = {'error': 0, 'warning': 1, 'warn': 1, 'info': 2}
+
+# The C processor keeps at most this many entries before shifting its store
+MAX_ENTRIES = 10000
+
+
+class LogEntry(ctypes.Structure):
+    _fields_ = [
+        ('id', ctypes.c_char_p),
+        ('timestamp', ctypes.c_char_p),
+        ('message', ctypes.c_char_p),
+        ('source', ctypes.c_char_p),
+        ('level', ctypes.c_int)
+    ]
+
+
+class LogStats(ctypes.Structure):
+    _fields_ = [
+        ('error_count', ctypes.c_int),
+        ('warning_count', ctypes.c_int),
+        ('info_count', ctypes.c_int),
+        ('avg_message_length', ctypes.c_double),
+        ('unique_sources', ctypes.c_int)
+    ]
+
+
+# The same layout as a NumPy dtype, so a whole LogEntry array is filled with
+# a few vectorized assignments instead of one ctypes attribute set per field
+ENTRY_DTYPE = np.dtype([
+    ('id', np.uintp),
+    ('timestamp', np.uintp),
+    ('message', np.uintp),
+    ('source', np.uintp),
+    ('level', np.intc)
+], align=True)
+
+
+def log_level_code(log):
+    """Level code of a log's declared level, -1 if it has none the processor counts"""
+    level = log.get('level', log.get('type'))
+    return LEVEL_CODES.get(str(level).lower(), -1) if level else -1
+
+
+def empty_stats():
+    return {'error_count': 0, 'warning_count': 0, 'info_count': 0,
+            'avg_message_length': 0.0, 'unique_sources': 0}
+
+
+class EncodedBatch:
+    """
+    A batch laid out for the C processor.
+
+    Every string goes into one NUL separated ASCII buffer, encoded in a
+    single call, and the LogEntry array is a NumPy structured array of
+    pointers into that buffer. Entry ids are batch positions, so search
+    results map straight back to logs. Messages are lowercased in the
+    buffer for case-insensitive search. Timestamps are not needed and all
+    point at an empty string.
+    """
+
+    def __init__(self, data, entries):
+        self.data = data # Keeps the buffer alive while entries point into it
+        self.entries = entries
+
+    @classmethod
+    def encode(cls, messages, sources, levels):
+        """
+        Encode a batch, or return None if it is empty, has non-string fields, is not plain
+        ASCII or holds NUL characters
+
+        Args:
+            messages (list): Message strings
+            sources (list): Source strings or None
+            levels (list): Level codes
+        """
+        count = len(messages)
+        if count == 0:
+            return None
+        present = [source for source in sources if source is not None]
+        try:
+            text = '\0'.join(['', '\0'.join(map(str, range(count))), *messages, *present, ''])
+        except TypeError:
+            return None
+        if not text.isascii():
+            return None
+        data = bytearray(text.encode('ascii'))
+
+        # Every string starts right after a NUL; a NUL inside a message shows
+        # up as an extra separator, and C would cut that message short anyway
+        offsets = 1 + np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0)[:-1]
+        if len(offsets) != 2 * count + len(present):
+            return None
+        first, last = offsets[count], offsets[2 * count] if present else len(data)
+        data[first:last] = data[first:last].lower()
+        base = ctypes.addressof(ctypes.c_char.from_buffer(data))
+        starts = base + offsets
+
+        entries = np.zeros(count, dtype=ENTRY_DTYPE)
+        entries['id'] = starts[:count]
+        entries['timestamp'] = base
+        entries['message'] = starts[count:2 * count]
+        if len(present) == count:
+            entries['source'] = starts[2 * count:]
+        else:
+            has_source = np.fromiter((source is not None for source in sources), dtype=bool, count=count)
+            entries['source'][has_source] = starts[2 * count:]
+        entries['level'] = levels
+        return cls(data, entries)
+
+
+class PythonLogProcessor:
+    """Pure Python batch counting and substring search, used when the library is absent"""
+
+    native = False
+
+    def scan(self, messages, sources, levels, patterns):
+        """
+        Count levels and sources of a batch and find messages containing any pattern
+
+        Args:
+            messages (list): Message strings
+            sources (list): Source strings or None
+            levels (list): Level codes (LEVEL_CODES, -1 for none)
+            patterns (list): Literal substrings, matched ignoring case
+
+        Returns:
+            tuple: (stats dict shaped like LogStats, boolean NumPy array of matches)
+        """
+        stats = empty_stats()
+        for code, key in ((0, 'error_count'), (1, 'warning_count'), (2, 'info_count')):
+            stats[key] = levels.count(code)
+        if messages:
+            stats['avg_message_length'] = sum(map(len, messages)) / len(messages)
+        stats['unique_sources'] = len({source for source in sources if source is not None})
+
+        if not patterns:
+            return stats, np.zeros(len(messages), dtype=bool)
+        search = re.compile('|'.join(re.escape(pattern) for pattern in patterns), re.IGNORECASE).search
+        text = '\0'.join(messages)
+        if (text.isascii() and all(pattern.isascii() for pattern in patterns)
+                and text.count('\0') == len(messages) - 1):
+            # Plain ASCII folds case by lowercasing, which is far cheaper than an IGNORECASE search
+            search = re.compile('|'.join(re.escape(pattern.lower()) for pattern in patterns)).search
+            messages = text.lower().split('\0')
+        matches = np.fromiter((search(message) is not None for message in messages),
+                              dtype=bool, count=len(messages))
+        return stats, matches
+
+
+class NativeLogProcessor(PythonLogProcessor):
+    """
+    ctypes binding to processor/build/liblogprocessor.so.
+
+    The library keeps one global store, so each batch resets it, loads the
+    batch with one process_log_entries call, reads the counters back with
+    get_log_stats and runs search_log once per pattern. Distinct sources
+    are counted in Python, since the library's source table holds at most
+    1024 entries. Calls are serialized by a lock. Batches smaller than
+    `min_batch`, where setting up the call costs more than it saves, and
+    batches that are not plain ASCII, which the C string functions would
+    count and match differently, are handled by the Python implementation
+    instead.
+    """
+
+    native = True
+    lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_LIBRARY, min_batch=64):
+        self.path = path
+        self.min_batch = min_batch
+        lib = ctypes.CDLL(path)
+        lib.init_log_processor.restype = ctypes.c_int
+        lib.init_log_processor.argtypes = []
+        lib.clean_up_processor.restype = None
+        lib.clean_up_processor.argtypes = []
+        lib.process_log_entries.restype = ctypes.c_int
+        lib.process_log_entries.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        lib.get_log_stats.restype = ctypes.c_int
+        lib.get_log_stats.argtypes = [ctypes.POINTER(LogStats)]
+        lib.search_log.restype = ctypes.c_int
+        lib.search_log.argtypes = [ctypes.c_char_p, ctypes.c_void_p, ctypes.c_size_t]
+        self.lib = lib
+        # search_log hands back strdup'ed ids that the caller frees
+        self.free = ctypes.CDLL(None).free
+        self.free.argtypes = [ctypes.c_void_p]
+        self.free.restype = None
+        if ENTRY_DTYPE.itemsize != ctypes.sizeof(LogEntry):
+            raise OSError("LogEntry layout does not match this platform")
+
+    @classmethod
+    def load(cls, path=DEFAULT_LIBRARY, min_batch=64):
+        """The native processor, or the Python one if the library cannot be loaded"""
+        try:
+            return cls(path, min_batch)
+        except (OSError, AttributeError) as e:
+            logger.info(f"Native log processor unavailable, using Python: {str(e)}")
+            return PythonLogProcessor()
+
+    def scan(self, messages, sources, levels, patterns):
+        """See PythonLogProcessor.scan"""
+        if len(messages) < self.min_batch or not all(pattern.isascii() for pattern in patterns):
+            return super().scan(messages, sources, levels, patterns)
+        batch = EncodedBatch.encode(messages, sources, levels)
+        if batch is None:
+            return super().scan(messages, sources, levels, patterns)
+
+        stats = empty_stats()
+        matches = np.zeros(len(messages), dtype=bool)
+        encoded_patterns = [pattern.lower().encode('ascii') for pattern in patterns]
+
+        with self.lock:
+            for start in range(0, len(messages), MAX_ENTRIES):
+                chunk = batch.entries[start:start + MAX_ENTRIES]
+                chunk_stats = self._scan_chunk(chunk, encoded_patterns, matches)
+                for key in ('error_count', 'warning_count', 'info_count'):
+                    stats[key] += chunk_stats[key]
+                stats['avg_message_length'] += chunk_stats['avg_message_length'] * len(chunk)
+        if messages:
+            stats['avg_message_length'] /= len(messages)
+        # The C source table is per chunk and stops counting at 1024 sources
+        stats['unique_sources'] = len({source for source in sources if source is not None})
+        return stats, matches
+
+    def _scan_chunk(self, entries, patterns, matches):
+        lib = self.lib
+        lib.clean_up_processor()
+        if lib.init_log_processor() != 0:
+            raise RuntimeError("Failed to initialize the native log processor")
+        lib.process_log_entries(entries.ctypes.data, len(entries))
+
+        stats = LogStats()
+        lib.get_log_stats(ctypes.byref(stats))
+
+        # Two views of one result array: the ids as bytes, and the pointers to free
+        pointers = (ctypes.c_void_p * len(entries))()
+        ids = (ctypes.c_char_p * len(entries)).from_buffer(pointers)
+        free = self.free
+        for pattern in patterns:
+            found = lib.search_log(pattern, pointers, len(entries))
+            if found:
+                matches[np.array(ids[:found], dtype=np.int64)] = True
+                for pointer in pointers[:found]:
+                    free(pointer)
+        return {field: getattr(stats, field) for field, _ in LogStats._fields_}
+
+    def close(self):
+        with self.lock:
+            self.lib.clean_up_processor()
@@ -0,0 +1,177 @@
+import zlib
+import signal
+import logging
+import multiprocessing
+from models.log_analyzer import LogAnalyzer
+
+logger = logging.getLogger('log_analyzer.pool')
+
+
+def shard_for(log, shards):
+    """Stable shard index of a log, by its source"""
+    source = log.get('source') if isinstance(log, dict) else None
+    return zlib.crc32(str(source or '').encode('utf-8')) % shards
+
+
+def _serve_shard(conn, analyzer_options):
+    """Worker process: analyze (sequence, batch) requests from the pipe until told to stop"""
+    # Shutdown is driven by the parent, not by Ctrl-C reaching the whole group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    log_analyzer = LogAnalyzer(**analyzer_options)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        sequence, logs = request
+        try:
+            results = log_analyzer.process_batch(logs)
+        except Exception as e:
+            results = [{'error': f'Analysis failed: {str(e)}'}] * len(logs)
+        conn.send((sequence, results))
+    conn.close()
+
+
+class ShardedAnalyzer:
+    """
+    LogAnalyzer spread over several processes.
+
+    Logs are routed to a worker process by a stable hash of their source, so
+    each worker owns the history, baselines and templates of its sources and
+    sees their logs in order. A batch is split into one sub-batch per shard,
+    every sub-batch is sent before any answer is read so the workers run
+    concurrently, and results are put back in the original order. Each
+    sub-batch crosses the process boundary as a single pickled message.
+
+    Pattern detection only sees the logs of the shard's own sources.
+
+    Every sub-batch carries the batch's sequence number and answers are
+    matched on it. If a worker dies, the answers of the other shards are
+    still read, the dead worker's logs get an error result and it is
+    replaced by a new process with a fresh LogAnalyzer, so its sources
+    start learning again from scratch.
+    """
+
+    def __init__(self, workers=None, **analyzer_options):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.analyzer_options = analyzer_options
+        self.processed_count = 0
+        self.restart_count = 0
+        self.sequence = 0
+        self.connections = [None] * self.workers
+        self.processes = [None] * self.workers
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"Started {self.workers} analyzer processes")
+
+    def _spawn(self, index):
+        """Start the worker process of a shard with a new pipe"""
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_serve_shard,
+            args=(child_conn, self.analyzer_options),
+            name=f'analyzer-shard-{index}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.connections[index] = parent_conn
+        self.processes[index] = process
+
+    def _restart(self, index):
+        """Replace a failed shard's worker process"""
+        process = self.processes[index]
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=5)
+        self.connections[index].close()
+        self._spawn(index)
+        self.restart_count += 1
+        logger.warning(f"Restarted analyzer shard {index} (exit code {process.exitcode})")
+
+    def instrument(self, registry):
+        """Expose the analyzed log count (stage timings stay inside the workers)"""
+        registry.counter('analyzed_logs_total', 'Logs analyzed', func=lambda: self.processed_count)
+        registry.gauge('analyzer_processes', 'Analyzer worker processes', func=lambda: self.workers)
+        registry.counter('analyzer_process_restarts_total', 'Analyzer worker processes replaced after failing',
+                         func=lambda: self.restart_count)
+
+    def process_batch(self, logs):
+        """
+        Analyze a batch of logs across the worker processes
+
+        Returns:
+            list: One analysis result per log, in input order
+        """
+        shards = [[] for _ in range(self.workers)]
+        positions = [[] for _ in range(self.workers)]
+        for position, log in enumerate(logs):
+            shard = shard_for(log, self.workers)
+            shards[shard].append(log)
+            positions[shard].append(position)
+
+        self.sequence += 1
+        sent, failed = [], []
+        for shard in range(self.workers):
+            if not shards[shard]:
+                continue
+            try:
+                self.connections[shard].send((self.sequence, shards[shard]))
+                sent.append(shard)
+            except (OSError, ValueError) as e:
+                logger.error(f"Analyzer shard {shard} did not take its batch: {str(e)}")
+                failed.append(shard)
+
+        # Read every shard that was sent to, even after one fails, so no
+        # answer is left in a pipe for the next batch
+        results = [None] * len(logs)
+        for shard in sent:
+            try:
+                shard_results = self._receive(shard)
+            except (EOFError, OSError) as e:
+                logger.error(f"Analyzer shard {shard} failed: {str(e) or type(e).__name__}")
+                failed.append(shard)
+                continue
+            for position, result in zip(positions[shard], shard_results):
+                results[position] = result
+
+        for shard in failed:
+            for position in positions[shard]:
+                results[position] = {'error': f'Analysis failed: analyzer shard {shard} stopped'}
+            self._restart(shard)
+
+        self.processed_count += len(logs)
+        return results
+
+    def _receive(self, shard):
+        """Results of the current batch from a shard, skipping answers to earlier ones"""
+        while True:
+            sequence, results = self.connections[shard].recv()
+            if sequence == self.sequence:
+                return results
+            logger.warning(f"Discarding a stale answer from analyzer shard {shard}")
+
+    def process_log(self, log):
+        """Analyze a single log on its shard"""
+        return self.process_batch([log])[0]
+
+    def close(self):
+        """Stop the worker processes"""
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
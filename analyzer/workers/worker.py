@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import logging
+import socketserver
+from threading import Lock
+from models.log_analyzer import LogAnalyzer
+
+logger = logging.getLogger('log_analyzer.worker')
+
+
+class AnalyzerWorker:
+    """
+    Long-lived analyzer that answers newline-delimited JSON requests.
+
+    Each request is a single line holding either one log or a batch:
+
+        {"id": "42", "log": {"message": "...", "source": "..."}}
+        {"id": "43", "logs": [{...}, {...}]}
+
+    and is answered with exactly one line carrying the same id:
+
+        {"id": "42", "result": {...}}
+        {"id": "43", "results": [{...}, {...}]}
+        {"id": "44", "error": "..."}
+
+    The id is echoed untouched so a client talking to several workers (or
+    several connections to one socket worker) can match answers that come
+    back out of order.
+    """
+
+    def __init__(self, log_analyzer=None):
+        self.log_analyzer = log_analyzer or LogAnalyzer()
+        self.lock = Lock()
+        self.request_count = 0
+
+    def handle_request(self, request):
+        """
+        Analyze a decoded request
+
+        Args:
+            request (dict): Request envelope with an 'id' and 'log' or 'logs'
+
+        Returns:
+            dict: Response envelope
+        """
+        if not isinstance(request, dict):
+            return {'id': None, 'error': 'Request must be a JSON object'}
+
+        request_id = request.get('id')
+
+        if 'logs' in request:
+            logs = request['logs']
+            if not isinstance(logs, list):
+                return {'id': request_id, 'error': "'logs' must be a list"}
+            with self.lock:
+                results = self.log_analyzer.process_batch(logs)
+                self.request_count += 1
+            return {'id': request_id, 'results': results}
+
+        if 'log' in request:
+            with self.lock:
+                result = self.log_analyzer.process_log(request['log'])
+                self.request_count += 1
+            return {'id': request_id, 'result': result}
+
+        return {'id': request_id, 'error': "Request needs a 'log' or 'logs' field"}
+
+    def handle_line(self, line):
+        """Analyze one raw request line and return the encoded response line"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {'id': None, 'error': f'Invalid JSON: {str(e)}'}
+        else:
+            try:
+                response = self.handle_request(request)
+            except Exception as e:
+                logger.exception("Worker failed to analyze request")
+                request_id = request.get('id') if isinstance(request, dict) else None
+                response = {'id': request_id, 'error': str(e)}
+
+        return json.dumps(response, default=str) + '\n'
+
+    def serve_stdio(self, stdin=None, stdout=None):
+        """Serve requests from stdin until it is closed"""
+        stdin = stdin or sys.stdin
+        stdout = stdout or sys.stdout
+
+        logger.info("Analyzer worker ready on stdio (pid %s)", os.getpid())
+        for line in stdin:
+            if not line.strip():
+                continue
+            stdout.write(self.handle_line(line))
+            stdout.flush()
+        logger.info("Analyzer worker stdin closed after %s requests", self.request_count)
+
+    def serve_socket(self, path):
+        """Serve requests on a local Unix domain socket until interrupted"""
+        worker = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode('utf-8')
+                    if not line.strip():
+                        continue
+                    self.wfile.write(worker.handle_line(line).encode('utf-8'))
+                    self.wfile.flush()
+
+        if os.path.exists(path):
+            os.unlink(path)
+
+        server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+        server.daemon_threads = True
+        logger.info("Analyzer worker listening on %s (pid %s)", path, os.getpid())
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Received shutdown signal. Stopping analyzer worker...")
+        finally:
+            server.server_close()
+            if os.path.exists(path):
+                os.unlink(path)
@@ -26,11 +26,23 @@ router.get('/', async (req, res) => {
     }
 });
 
-// Route to receive new alert
+// Route to receive new alerts (a single alert or a batch)
 router.post('/', async (req, res) => {
     try {
         const alertData = req.body;
 
+        if (Array.isArray(alertData)) {
+            for (const alert of alertData) {
+                logger.info(`Received new alert: ${JSON.stringify(alert)}`);
+            }
+
+            return res.status(200).json({
+                success: true,
+                message: `${alertData.length} alerts received`,
+                ids: alertData.map(alert => alert.id)
+            });
+        }
+
         logger.info(`Received new alert: ${JSON.stringify(alertData)}`);
 
         res.status(200).json({
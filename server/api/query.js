@@ -1,5 +1,5 @@
 import express from 'express';
-import { queryLogs, getLogStats } from '../ingestion/processor.js';
+import { queryLogs, getLogStats, serverEpoch } from '../ingestion/processor.js';
 import { createLogger } from '../utils/logger.js';
 
 const router = express.Router();
@@ -9,11 +9,17 @@ const logger = createLogger('query-api');
 router.get('/recent', async (req, res) => {
     try {
         const limit = parseInt(req.query.limit) || 10;
-        const logs = await queryLogs({ limit });
+        // Optional cursors: logs that arrived after sequence number `after_seq`
+        // in arrival order, or logs at or after `since`, oldest first with order=asc
+        const afterSeq = req.query.after_seq !== undefined ? parseInt(req.query.after_seq) || 0 : undefined;
+        const from = req.query.since ? new Date(req.query.since) : undefined;
+        const order = req.query.order === 'asc' ? 'asc' : 'desc';
+        const logs = await queryLogs({ limit, from, order, afterSeq });
 
         res.status(200).json({
             success: true,
             count: logs.length,
+            epoch: serverEpoch,
             logs
         })
     } catch (error) {
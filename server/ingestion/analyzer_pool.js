@@ -0,0 +1,184 @@
+import path from 'path';
+import readline from 'readline';
+import { fileURLToPath } from 'url';
+import { spawn } from 'child_process';
+import { createLogger } from '../utils/logger.js';
+
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+
+const logger = createLogger('analyzer-pool');
+
+const ANALYZER_DIR = path.join(__dirname, '../../analyzer');
+const POOL_SIZE = parseInt(process.env.ANALYZER_POOL_SIZE) || 2;
+const REQUEST_TIMEOUT_MS = parseInt(process.env.ANALYZER_TIMEOUT_MS) || 10000;
+// Restart delay after a worker exits, doubled while it keeps crashing soon after starting
+const MIN_RESTART_DELAY_MS = 100;
+const MAX_RESTART_DELAY_MS = 30000;
+const STABLE_UPTIME_MS = 10000;
+
+/**
+ * A single long-lived `python3 main.py --worker` process
+ */
+class AnalyzerWorker {
+    constructor(index) {
+        this.index = index;
+        this.pending = new Map();
+        this.restartDelay = MIN_RESTART_DELAY_MS;
+        this.restartTimer = null;
+        this.start();
+    }
+
+    start() {
+        this.restartTimer = null;
+        this.startedAt = Date.now();
+        this.process = spawn('python3', ['main.py', '--worker'], { cwd: ANALYZER_DIR });
+
+        const lines = readline.createInterface({ input: this.process.stdout });
+        lines.on('line', (line) => this.handleLine(line));
+
+        this.process.stderr.on('data', (data) => {
+            logger.debug(`Analyzer worker ${this.index}: ${data.toString().trim()}`);
+        });
+
+        // Writing to a worker that just died fails with EPIPE; without a
+        // listener that error would take down the whole server
+        this.process.stdin.on('error', (error) => {
+            logger.error(`Analyzer worker ${this.index} stdin error: ${error.message}`);
+            this.failPending(new Error(`Analyzer worker unavailable: ${error.message}`));
+        });
+
+        this.process.on('exit', (code) => {
+            logger.warn(`Analyzer worker ${this.index} exited with code ${code}`);
+            this.failPending(new Error(`Analyzer worker exited with code ${code}`));
+            this.scheduleRestart();
+        });
+
+        this.process.on('error', (error) => {
+            logger.error(`Failed to start analyzer worker ${this.index}: ${error.message}`);
+            this.failPending(new Error(`Analyzer worker failed to start: ${error.message}`));
+            this.scheduleRestart();
+        });
+    }
+
+    scheduleRestart() {
+        if (this.closed || this.restartTimer) {
+            return;
+        }
+        if (Date.now() - this.startedAt >= STABLE_UPTIME_MS) {
+            this.restartDelay = MIN_RESTART_DELAY_MS;
+        }
+        logger.info(`Restarting analyzer worker ${this.index} in ${this.restartDelay} ms`);
+        this.restartTimer = setTimeout(() => this.start(), this.restartDelay);
+        this.restartDelay = Math.min(this.restartDelay * 2, MAX_RESTART_DELAY_MS);
+    }
+
+    handleLine(line) {
+        let response;
+        try {
+            response = JSON.parse(line);
+        } catch (e) {
+            logger.error(`Error parsing analyzer worker output: ${e.message}`);
+            return;
+        }
+
+        const request = this.pending.get(response.id);
+        if (!request) {
+            return;
+        }
+        this.pending.delete(response.id);
+        clearTimeout(request.timer);
+
+        if (response.error) {
+            request.reject(new Error(response.error));
+        } else {
+            request.resolve(response.results || response.result);
+        }
+    }
+
+    send(id, payload) {
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error(`Analyzer request ${id} timed out`));
+            }, REQUEST_TIMEOUT_MS);
+
+            this.pending.set(id, { resolve, reject, timer });
+            this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+        });
+    }
+
+    failPending(error) {
+        for (const request of this.pending.values()) {
+            clearTimeout(request.timer);
+            request.reject(error);
+        }
+        this.pending.clear();
+    }
+
+    close() {
+        this.closed = true;
+        clearTimeout(this.restartTimer);
+        this.process.stdin.end();
+    }
+}
+
+/**
+ * Pool of analyzer workers.
+ *
+ * Logs are routed by source so each worker keeps the history and baseline
+ * for the sources it owns.
+ */
+export class AnalyzerPool {
+    constructor(size = POOL_SIZE) {
+        this.workers = Array.from({ length: size }, (_, i) => new AnalyzerWorker(i));
+        this.nextId = 0;
+    }
+
+    pickWorker(source = '') {
+        let hash = 5381;
+        for (let i = 0; i < source.length; i++) {
+            hash = ((hash << 5) + hash + source.charCodeAt(i)) >>> 0;
+        }
+        return this.workers[hash % this.workers.length];
+    }
+
+    /**
+     * Analyze a single log
+     * @param {Object} logData - Log entry
+     * @returns {Promise<Object>} - Analysis result
+     */
+    analyze(logData) {
+        const id = String(this.nextId++);
+        return this.pickWorker(logData.source).send(id, { log: logData });
+    }
+
+    /**
+     * Analyze a batch of logs from the same source
+     * @param {Array<Object>} logs - Log entries
+     * @returns {Promise<Array<Object>>} - Analysis results in input order
+     */
+    analyzeBatch(logs) {
+        const id = String(this.nextId++);
+        const source = logs.length > 0 ? logs[0].source : '';
+        return this.pickWorker(source).send(id, { logs });
+    }
+
+    close() {
+        this.workers.forEach(worker => worker.close());
+    }
+}
+
+let pool = null;
+
+/**
+ * Get the shared analyzer pool, starting it on first use
+ * @returns {AnalyzerPool}
+ */
+export const getAnalyzerPool = () => {
+    if (!pool) {
+        logger.info(`Starting ${POOL_SIZE} analyzer workers`);
+        pool = new AnalyzerPool();
+        process.on('exit', () => pool.close());
+    }
+    return pool;
+};
@@ -2,9 +2,9 @@ import { v4 as uuid4 } from 'uuid';
 import fs from 'fs/promises';
 import path from 'path';
 import { fileURLToPath } from 'url';
-import { spawn } from 'child_process';
 import { createLogger } from '../utils/logger.js';
 import * as cProcessor from './c_processor.js';
+import { getAnalyzerPool } from './analyzer_pool.js';
 
 const __dirname = path.dirname(fileURLToPath(import.meta.url));
 
@@ -13,6 +13,12 @@ const logger = createLogger('log-processor');
 const recentLogs = [];
 const MAX_RECENT_LOGS = 1000;
 
+// Every stored log gets the next sequence number, so readers can page by
+// arrival order whatever timestamps the clients sent. The epoch changes on
+// every start, telling readers that sequence numbers began again.
+export const serverEpoch = uuid4();
+let lastSeq = 0;
+
 // In-memory storage for alerts
 const alerts = [];
 
@@ -49,8 +55,9 @@ export const processLog = async (logData) => {
         logData.timestamp = new Date().toISOString();
     }
 
-    // Add the ID to the log data
+    // Add the ID and arrival sequence number to the log data
     logData.id = logId;
+    logData.seq = ++lastSeq;
 
     // Add timestamp if not present
     if (!logData.timestamp) {
@@ -94,14 +101,14 @@ export const processLog = async (logData) => {
     const analysisResult = await analyzeLogWithPython(logData);
 
     // Create an alert if the anomaly scroe if high enough
-    if (analysisResult.anomalyScore > 0.7) {
+    if (analysisResult.anomaly_score > 0.7) {
         const alert = {
             id: uuid4(),
             logId,
             timestamp: new Date().toISOString(),
             message: `Anomaly detected in log ${logId}`,
-            severity: analysisResult.anomalyScore > 0.9 ? 'High' : 'medium',
-            anomalyScore: analysisResult.anomalyScore,
+            severity: analysisResult.anomaly_score > 0.9 ? 'High' : 'medium',
+            anomalyScore: analysisResult.anomaly_score,
             acknowledge: false
         };
 
@@ -125,7 +132,12 @@ export const processLog = async (logData) => {
  */
 
 export const queryLogs = async (options = {}) => {
-    const { limit = 10, query, from, to } = options;
+    const { limit = 10, query, from, to, order = 'desc', afterSeq } = options;
+
+    // Paging by arrival: recentLogs is already in sequence order
+    if (afterSeq !== undefined) {
+        return recentLogs.filter(log => log.seq > afterSeq).slice(0, limit);
+    }
 
     // Filter logs based on criteria
     let filteredLogs = [...recentLogs];
@@ -149,9 +161,10 @@ export const queryLogs = async (options = {}) => {
         );
     }
 
-    // Sort by timestamp descending (newest first)
+    // Sort by timestamp descending (newest first) unless asked for oldest first
+    const direction = order === 'asc' ? -1 : 1;
     filteredLogs.sort((a, b) =>
-        new Date(b.timestamp) - new Date(a.timestamp)
+        direction * (new Date(b.timestamp) - new Date(a.timestamp))
     )
 
     // Return limit results
@@ -290,37 +303,6 @@ const getSeverity = (logData) => {
  */
 
 const analyzeLogWithPython = (logData) => {
-    return new Promise((resolve, reject) => {
-      const pythonProcess = spawn('python3', [path.join(__dirname, '../../analyzer/main.py'), JSON.stringify(logData)]);
-      
-      let output = '';
-      let errorOutput = '';
-      
-      pythonProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-      
-      pythonProcess.stderr.on('data', (data) => {
-        errorOutput += data.toString();
-      });
-      
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          logger.error(`Python process exited with code ${code}: ${errorOutput}`);
-          return reject(new Error(`Python process exited with code ${code}`));
-        }
-        try {
-          const result = JSON.parse(output);
-          resolve(result);
-        } catch (e) {
-          logger.error(`Error parsing Python script output: ${e.message}`);
-          reject(new Error('Error parsing Python script output'));
-        }
-      });
-      
-      pythonProcess.on('error', (error) => {
-        logger.error(`Failed to start Python process: ${error.message}`);
-        reject(new Error('Failed to start Python process'));
-      });
-    });
-  };
\ No newline at end of file
+    // Long-lived workers avoid starting a Python interpreter per log
+    return getAnalyzerPool().analyze(logData);
+};